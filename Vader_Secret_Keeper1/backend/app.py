@@ -1,18 +1,49 @@
 
 from __future__ import annotations
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.config import APP_NAME, ALLOWED_ORIGINS
+from backend.config import SETTINGS
 from backend.routes.chat import router as chat_router
+from backend.routes.evaluate import router as evaluate_router
+from backend.core.emotiongendect import ENGINE
+from backend.core.eval_cache import EVAL_CACHE
+from backend.core.memory_manager import MEMORY, SESSION_LOCKS
+from backend.services.audit_log import AUDIT
+from backend.services.broadcast import BROADCAST
+from backend.services.llm_service import BREAKER, CALL_STATS, HEDGER, LIMITER, SINGLE_FLIGHT, warm_provider
+from backend.services.metrics import METRICS, start_trace, finish_trace
+from backend.services.rate_limit import RATE_LIMITER
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # build the LLM client off the boot path: the worker serves intro/hint turns meanwhile
+    warm = asyncio.create_task(warm_provider())
+    # keep the per-chapter story pools topped up in the background
+    ENGINE.pool.start()
+    ENGINE.prefetch.start()
+    AUDIT.start()
+    yield
+    warm.cancel()
+    await ENGINE.prefetch.stop()
+    await ENGINE.pool.stop()
+    await AUDIT.stop()  # flush queued turns
+    EVAL_CACHE.save()  # keep warm verdicts across restarts (if EVAL_CACHE_PATH set)
+
 
 app = FastAPI(
-    title=f"{APP_NAME} API",
+    title=f"{SETTINGS.app_name} API",
     version="0.1.0",
-    description="Retro-cyber Sith trial chatbot (Phase 1–3 skeleton)."
+    description="Retro-cyber Sith trial chatbot (Phase 1–3 skeleton).",
+    lifespan=lifespan,
 )
 
 # CORS (frontend will run on a different port later)
-allow = ["*"] if ALLOWED_ORIGINS == ["*"] else ALLOWED_ORIGINS
+allow = ["*"] if SETTINGS.allowed_origins == ["*"] else SETTINGS.allowed_origins
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allow,
@@ -23,6 +54,72 @@ app.add_middleware(
 
 @app.get("/")
 def root():
-    return {"status": "ok", "service": APP_NAME}
+    return {"status": "ok", "service": SETTINGS.app_name}
+
+@app.get("/health")
+async def health():
+    """LLM breaker state and call timings, for alerting."""
+    return {
+        "status": "degraded" if BREAKER.state != BREAKER.CLOSED else "ok",
+        "llm_breaker": BREAKER.stats(),
+        "llm_calls": CALL_STATS.stats(),
+        "llm_limiter": LIMITER.stats(),
+    }
 
 app.include_router(chat_router, prefix="/api")
+app.include_router(evaluate_router, prefix="/api")
+
+# ---------- Metrics ----------
+METRICS.gauges("vsk_llm_limiter", "LLM concurrency limiter.", LIMITER.stats,
+               counters=("total_calls", "rate_waits"))
+METRICS.gauges("vsk_llm_singleflight", "Coalesced LLM prompts.", SINGLE_FLIGHT.stats,
+               counters=("leaders", "coalesced", "wait_timeouts"))
+METRICS.gauges("vsk_llm_breaker", "LLM circuit breaker.", BREAKER.stats,
+               counters=("times_opened", "rejected_calls"))
+METRICS.gauges("vsk_llm_calls", "LLM attempts, retries and latency.", CALL_STATS.stats,
+               counters=("attempts", "retries", "timeouts", "queue_timeouts", "errors", "successes"))
+METRICS.gauges("vsk_llm_hedge", "Hedged LLM calls and their adaptive delays.", HEDGER.stats,
+               counters=("calls", "hedged", "hedge_wins", "primary_wins", "budget_denied"))
+METRICS.gauges("vsk_eval_cache", "Evaluation verdict cache.", EVAL_CACHE.stats,
+               counters=("hits", "misses", "evictions", "expired"))
+METRICS.gauges("vsk_story_pool", "Pre-generated story pool.", ENGINE.pool.stats,
+               counters=("hits", "misses", "generated", "expired"))
+METRICS.gauges("vsk_prefetch", "Per-session next-chapter prefetch.", ENGINE.prefetch.stats,
+               counters=("scheduled", "capped", "budget_denied", "hits", "late_hits", "misses", "wasted"))
+METRICS.gauges("vsk_preclassifier", "Local pre-classifier decisions.", ENGINE.preclassifier.stats,
+               counters=("local_accept", "local_reject", "deferred_to_llm", "llm_fallbacks"))
+METRICS.gauges("vsk_sessions", "Session store.", MEMORY.stats,
+               counters=("evictions", "expired", "conflicts"))
+METRICS.gauges("vsk_session_locks", "Per-session step locks.", SESSION_LOCKS.stats,
+               counters=("acquired", "contended"))
+METRICS.gauges("vsk_broadcast", "Spectator channels, viewers and fan-out.", BROADCAST.stats,
+               counters=("published", "delivered", "lagged", "refused"))
+METRICS.gauges("vsk_audit_log", "Turn audit log queue and writer.", AUDIT.stats,
+               counters=("written", "dropped", "batches", "write_errors"))
+METRICS.gauges("vsk_rate_limit", "Per-session, per-client and batch answer buckets.", RATE_LIMITER.stats,
+               counters=("session_denied", "client_denied", "batch_denied", "evicted"))
+
+def _route_label(scope) -> str:
+    """The matched route's template ("/api/watch/{session_id}"), which keeps the label bounded."""
+    route = scope.get("route")
+    if route is None:
+        return "other"
+    # FastAPI versions that include routers by reference keep the prefixed path here
+    included = (scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(included, "path", None) or route.path
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    token = start_trace()
+    started = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        finish_trace(token, _route_label(request.scope), time.perf_counter() - started)
+
+# async: rendered on the event loop that mutates the stats, not in the threadpool
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
@@ -1,19 +1,303 @@
 from __future__ import annotations
 import os
-from typing import List
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
 from dotenv import load_dotenv
 
-load_dotenv()  # loads .env if present
 
 def _csv(name: str, default: str = "") -> List[str]:
     raw = os.getenv(name, default)
     return [x.strip() for x in raw.split(",") if x.strip()]
 
-APP_NAME = os.getenv("APP_NAME", "Retro-Cyber Secret Keeper")
-APP_ENV = os.getenv("APP_ENV", "dev")
-ALLOWED_ORIGINS = _csv("ALLOWED_ORIGINS", "*")
+def _bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
 
-# Secret system
-SECRET_FRAGMENTS = _csv("SECRET_FRAGMENTS", "FRAG-AAA,FRAG-BBB,FRAG-CCC")
-SENTIMENT_THRESHOLD = os.getenv("SENTIMENT_THRESHOLD", "neutral").lower()
-ALLOWED_IDEOLOGIES = set(x.lower() for x in _csv("ALLOWED_IDEOLOGIES", "balance,growth,power,dominance"))
+def _int(name: str, default: str) -> int:
+    return int(os.getenv(name, default))
+
+def _float(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+@dataclass(frozen=True)
+class CallProfile:
+    """Generation settings of one kind of LLM call; the provider keeps one model object per profile."""
+
+    name: str
+    model: str
+    temperature: float = 0.2
+    max_output_tokens: int = 512
+    stop_sequences: Tuple[str, ...] = ()
+
+
+def _profile(name: str, model: str, temperature: str, max_tokens: str, stop: str = "") -> CallProfile:
+    # LLM_<NAME>_MODEL / _TEMPERATURE / _MAX_TOKENS / _STOP (comma separated)
+    prefix = f"LLM_{name.upper()}_"
+    return CallProfile(
+        name=name,
+        model=os.getenv(prefix + "MODEL", model),
+        temperature=_float(prefix + "TEMPERATURE", temperature),
+        max_output_tokens=_int(prefix + "MAX_TOKENS", max_tokens),
+        stop_sequences=tuple(_csv(prefix + "STOP", stop)),
+    )
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Every tunable of the service, read from the environment (and .env) exactly once."""
+
+    app_name: str = "Retro-Cyber Secret Keeper"
+    app_env: str = "dev"
+    allowed_origins: List[str] = field(default_factory=lambda: ["*"])
+
+    # Secret system
+    secret_fragments: List[str] = field(default_factory=list)
+    sentiment_threshold: str = "neutral"
+    allowed_ideologies: Set[str] = field(default_factory=set)
+
+    # LLM provider: "gemini" or "fake" (deterministic local stand-in for load tests)
+    llm_provider: str = "gemini"
+    gemini_api_key: str = ""
+    gemini_model: str = "gemini-1.5-flash"
+    # per-call-type model/temperature/output cap; see from_env() for the defaults
+    llm_profiles: Dict[str, CallProfile] = field(default_factory=dict)
+    fake_llm_seed: int = 1234
+    fake_llm_latency_ms: float = 300.0       # median latency
+    fake_llm_latency_sigma: float = 0.5      # lognormal spread (0 = fixed)
+    fake_llm_error_rate: float = 0.0         # share of calls raising a 503
+    fake_llm_invalid_rate: float = 0.0       # share of calls returning broken JSON
+
+    # LLM concurrency (max in-flight Gemini calls per worker)
+    llm_max_concurrency: int = 64
+
+    # Global LLM call budget (calls started per second, 0 = unlimited), shared fairly across sessions
+    llm_global_rps: float = 0.0
+    llm_global_burst: float = 0.0            # defaults to one second's worth
+
+    # Rate limits for LLM-bound requests (answers); intro and hint turns are exempt
+    rate_limit_enabled: bool = True
+    session_rate: float = 0.5                # answers per second per session, sustained
+    session_burst: float = 5.0
+    client_rate: float = 2.0                 # per client IP
+    client_burst: float = 20.0
+    rate_limit_max_keys: int = 100000        # buckets kept per table (idle ones are dropped first)
+    # proxies (IPs or CIDRs) whose X-Forwarded-For is believed; empty: the header is ignored
+    trusted_proxies: List[str] = field(default_factory=list)
+
+    # GET /api/intro browser/CDN cache lifetime (revalidated by ETag afterwards)
+    intro_max_age: int = 3600
+
+    # Pre-generated story/riddle pool (per chapter)
+    story_pool_size: int = 8
+    story_pool_low_water: int = 3
+    story_pool_ttl: float = 3600.0           # seconds an entry stays servable
+    story_pool_max_uses: int = 1             # times one entry may be served
+    story_pool_refill_interval: float = 5.0
+
+    # Per-session speculative generation of the next chapter while the player types
+    prefetch_enabled: bool = True
+    prefetch_max_inflight: int = 16          # generations running at once (0 disables)
+    prefetch_max_held: int = 10000           # sessions holding a prefetch (oldest dropped beyond)
+    prefetch_ttl: float = 900.0              # seconds a prefetch is kept for an idle session
+    prefetch_sweep_interval: float = 60.0
+    prefetch_rate: float = 20.0              # generations started per second per worker (0: no budget)
+    prefetch_burst: float = 40.0
+
+    # Local pre-classifier (decides clear-cut answers without the LLM)
+    preclass_enabled: bool = True
+    preclass_accept_threshold: float = 1.0
+    preclass_reject_threshold: float = -0.5
+    preclass_fallback_threshold: float = 0.5  # score needed to accept while the LLM is unavailable
+
+    # Evaluation verdict cache (in front of llm_evaluate)
+    eval_cache_enabled: bool = True
+    eval_cache_max_entries: int = 10000
+    eval_cache_max_bytes: int = 16 * 1024 * 1024
+    eval_cache_ttl: float = 86400.0
+    eval_cache_context_agnostic: bool = False  # reuse a verdict across different stories/riddles of a chapter
+    eval_cache_path: str = ""                  # JSON file; empty disables persistence
+
+    # Session store: "memory" (single worker), "sqlite" (WAL file shared by workers) or "redis"
+    session_backend: str = "memory"
+    session_ttl: float = 21600.0             # idle seconds before a session is evicted
+    session_max: int = 100000                # in-memory cap (LRU beyond this)
+    session_shards: int = 16                 # in-memory lock stripes
+    session_sqlite_path: str = "sessions.sqlite3"
+    session_redis_url: str = "redis://127.0.0.1:6379/0"
+
+    # Fused mode: one LLM call returns the verdict and, on accept, the next chapter (A/B flag)
+    fused_eval_enabled: bool = False
+
+    # Ask the provider for schema-constrained JSON (Gemini response_mime_type/response_schema)
+    llm_json_mode: bool = True
+
+    # Prompt token budget (~4 chars per token)
+    prompt_story_tokens: int = 200           # previous story is trimmed (head + tail) beyond this
+    prompt_answer_tokens: int = 120          # seeker answers are clamped to this before anything sees them
+    prompt_max_required: int = 0             # cap on synonym anchors per chapter (0: stem-deduped list only)
+
+    # Batch evaluation (/api/evaluate/batch and the batch_eval CLI)
+    batch_pack_size: int = 8                 # answers of one chapter judged per LLM call (1: no packing)
+    batch_parallel: int = 4                  # packs in flight per batch
+    batch_max_items: int = 500               # per request (keep <= batch_burst)
+    batch_rate: float = 5.0                  # answers graded per second per client, sustained
+    batch_burst: float = 500.0
+
+    # Single-flight: identical in-flight prompts share one LLM request
+    single_flight_enabled: bool = True
+    single_flight_wait_timeout: float = 30.0  # follower gives up and calls itself
+
+    # LLM resilience
+    llm_timeout: float = 15.0                # per-call deadline across retries (seconds)
+    llm_queue_timeout: float = 30.0          # max wait for a limiter slot; not held against the provider
+    llm_stream_idle_timeout: float = 10.0    # max gap between streamed chunks before the stream is dropped
+    llm_max_retries: int = 2                 # extra attempts for retryable errors
+    llm_backoff_base: float = 0.25
+    llm_backoff_max: float = 2.0
+    breaker_failure_threshold: int = 5       # consecutive failures to open
+    breaker_cooldown: float = 30.0           # seconds before a probe call
+
+    # Hedged LLM calls: past the profile's observed latency quantile, race a second request
+    llm_hedge_enabled: bool = False
+    llm_hedge_profiles: List[str] = field(default_factory=lambda: ["evaluate", "fused"])
+    llm_hedge_provider: str = ""             # secondary provider ("": the primary one)
+    llm_hedge_model: str = ""                # secondary model ("": the profile's model)
+    llm_hedge_quantile: float = 0.9          # hedge delay = this latency quantile of the profile
+    llm_hedge_min_delay: float = 0.05        # seconds; floor for the adaptive delay
+    llm_hedge_min_samples: int = 20          # no hedging until a profile has this many latencies
+    llm_hedge_budget: float = 0.05           # max share of calls that may be hedged
+    llm_hedge_burst: float = 5.0             # hedges saved up in quiet spells, spent back to back when a slow run starts
+
+    # Audit log of trial turns (gzip JSONL, group-committed in the background)
+    audit_log_dir: str = ""                  # empty disables the log
+    audit_queue_max: int = 10000             # events buffered in memory; beyond this they are dropped
+    audit_batch_size: int = 500              # events per group commit
+    audit_flush_interval: float = 1.0        # seconds between commits of a partial batch
+    audit_rotate_bytes: int = 64 * 1024 * 1024
+    audit_keep_files: int = 0                # rotated files kept (0: all)
+
+    # Spectator channels (GET /api/watch/{session_id})
+    broadcast_buffer: int = 256              # events queued per viewer before it is cut off as lagging
+    broadcast_max_subscribers: int = 10000   # viewers per worker, all sessions together
+    broadcast_keepalive: float = 15.0        # seconds of silence before a keepalive comment
+
+    # Metrics / slow-request tracing
+    slow_request_seconds: float = 3.0
+    slow_trace_sample_rate: float = 0.1      # share of slow requests logged
+
+    def profile(self, name: str) -> CallProfile:
+        """Named call profile; unknown names get GEMINI_MODEL with the old defaults."""
+        found = self.llm_profiles.get(name)
+        return found if found is not None else CallProfile(name, self.gemini_model)
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        load_dotenv()  # loads .env if present
+        gemini_model = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+        return cls(
+            app_name=os.getenv("APP_NAME", "Retro-Cyber Secret Keeper"),
+            app_env=os.getenv("APP_ENV", "dev"),
+            allowed_origins=_csv("ALLOWED_ORIGINS", "*"),
+            secret_fragments=_csv("SECRET_FRAGMENTS", "FRAG-AAA,FRAG-BBB,FRAG-CCC"),
+            sentiment_threshold=os.getenv("SENTIMENT_THRESHOLD", "neutral").lower(),
+            allowed_ideologies=set(x.lower() for x in _csv("ALLOWED_IDEOLOGIES", "balance,growth,power,dominance")),
+            llm_provider=os.getenv("LLM_PROVIDER", "gemini").lower(),
+            gemini_api_key=os.getenv("GEMINI_API_KEY", ""),
+            gemini_model=gemini_model,
+            llm_profiles={p.name: p for p in (
+                # verdicts gate every answer: smallest fast model, short JSON
+                _profile("evaluate", "gemini-1.5-flash-8b", "0.2", "256"),
+                _profile("batch", "gemini-1.5-flash-8b", "0.2", "1024"),
+                # stories want the full model and room for 6-8 lines
+                _profile("fused", gemini_model, "0.7", "800"),
+                _profile("story", gemini_model, "0.9", "640"),
+                _profile("stream", gemini_model, "0.9", "640"),
+            )},
+            fake_llm_seed=_int("FAKE_LLM_SEED", "1234"),
+            fake_llm_latency_ms=_float("FAKE_LLM_LATENCY_MS", "300"),
+            fake_llm_latency_sigma=_float("FAKE_LLM_LATENCY_SIGMA", "0.5"),
+            fake_llm_error_rate=_float("FAKE_LLM_ERROR_RATE", "0"),
+            fake_llm_invalid_rate=_float("FAKE_LLM_INVALID_RATE", "0"),
+            llm_max_concurrency=_int("LLM_MAX_CONCURRENCY", "64"),
+            llm_global_rps=_float("LLM_GLOBAL_RPS", "0"),
+            llm_global_burst=_float("LLM_GLOBAL_BURST", "0"),
+            rate_limit_enabled=_bool("RATE_LIMIT_ENABLED", "true"),
+            session_rate=_float("SESSION_RATE", "0.5"),
+            session_burst=_float("SESSION_BURST", "5"),
+            client_rate=_float("CLIENT_RATE", "2"),
+            client_burst=_float("CLIENT_BURST", "20"),
+            rate_limit_max_keys=_int("RATE_LIMIT_MAX_KEYS", "100000"),
+            trusted_proxies=_csv("TRUSTED_PROXIES", ""),
+            intro_max_age=_int("INTRO_MAX_AGE", "3600"),
+            story_pool_size=_int("STORY_POOL_SIZE", "8"),
+            story_pool_low_water=_int("STORY_POOL_LOW_WATER", "3"),
+            story_pool_ttl=_float("STORY_POOL_TTL", "3600"),
+            story_pool_max_uses=_int("STORY_POOL_MAX_USES", "1"),
+            story_pool_refill_interval=_float("STORY_POOL_REFILL_INTERVAL", "5"),
+            prefetch_enabled=_bool("PREFETCH_ENABLED", "true"),
+            prefetch_max_inflight=_int("PREFETCH_MAX_INFLIGHT", "16"),
+            prefetch_max_held=_int("PREFETCH_MAX_HELD", "10000"),
+            prefetch_ttl=_float("PREFETCH_TTL", "900"),
+            prefetch_sweep_interval=_float("PREFETCH_SWEEP_INTERVAL", "60"),
+            prefetch_rate=_float("PREFETCH_RATE", "20"),
+            prefetch_burst=_float("PREFETCH_BURST", "40"),
+            preclass_enabled=_bool("PRECLASS_ENABLED", "true"),
+            preclass_accept_threshold=_float("PRECLASS_ACCEPT_THRESHOLD", "1.0"),
+            preclass_reject_threshold=_float("PRECLASS_REJECT_THRESHOLD", "-0.5"),
+            preclass_fallback_threshold=_float("PRECLASS_FALLBACK_THRESHOLD", "0.5"),
+            eval_cache_enabled=_bool("EVAL_CACHE_ENABLED", "true"),
+            eval_cache_max_entries=_int("EVAL_CACHE_MAX_ENTRIES", "10000"),
+            eval_cache_max_bytes=_int("EVAL_CACHE_MAX_BYTES", str(16 * 1024 * 1024)),
+            eval_cache_ttl=_float("EVAL_CACHE_TTL", "86400"),
+            eval_cache_context_agnostic=_bool("EVAL_CACHE_CONTEXT_AGNOSTIC", "false"),
+            eval_cache_path=os.getenv("EVAL_CACHE_PATH", ""),
+            session_backend=os.getenv("SESSION_BACKEND", "memory").lower(),
+            session_ttl=_float("SESSION_TTL", "21600"),
+            session_max=_int("SESSION_MAX", "100000"),
+            session_shards=_int("SESSION_SHARDS", "16"),
+            session_sqlite_path=os.getenv("SESSION_SQLITE_PATH", "sessions.sqlite3"),
+            session_redis_url=os.getenv("SESSION_REDIS_URL", "redis://127.0.0.1:6379/0"),
+            fused_eval_enabled=_bool("FUSED_EVAL_ENABLED", "false"),
+            llm_json_mode=_bool("LLM_JSON_MODE", "true"),
+            prompt_story_tokens=_int("PROMPT_STORY_TOKENS", "200"),
+            prompt_answer_tokens=_int("PROMPT_ANSWER_TOKENS", "120"),
+            prompt_max_required=_int("PROMPT_MAX_REQUIRED", "0"),
+            batch_pack_size=_int("BATCH_PACK_SIZE", "8"),
+            batch_parallel=_int("BATCH_PARALLEL", "4"),
+            batch_max_items=_int("BATCH_MAX_ITEMS", "500"),
+            batch_rate=_float("BATCH_RATE", "5"),
+            batch_burst=_float("BATCH_BURST", "500"),
+            single_flight_enabled=_bool("SINGLE_FLIGHT_ENABLED", "true"),
+            single_flight_wait_timeout=_float("SINGLE_FLIGHT_WAIT_TIMEOUT", "30"),
+            llm_timeout=_float("LLM_TIMEOUT", "15"),
+            llm_queue_timeout=_float("LLM_QUEUE_TIMEOUT", "30"),
+            llm_stream_idle_timeout=_float("LLM_STREAM_IDLE_TIMEOUT", "10"),
+            llm_max_retries=_int("LLM_MAX_RETRIES", "2"),
+            llm_backoff_base=_float("LLM_BACKOFF_BASE", "0.25"),
+            llm_backoff_max=_float("LLM_BACKOFF_MAX", "2.0"),
+            breaker_failure_threshold=_int("BREAKER_FAILURE_THRESHOLD", "5"),
+            breaker_cooldown=_float("BREAKER_COOLDOWN", "30"),
+            llm_hedge_enabled=_bool("LLM_HEDGE_ENABLED", "false"),
+            llm_hedge_profiles=_csv("LLM_HEDGE_PROFILES", "evaluate,fused"),
+            llm_hedge_provider=os.getenv("LLM_HEDGE_PROVIDER", "").lower(),
+            llm_hedge_model=os.getenv("LLM_HEDGE_MODEL", ""),
+            llm_hedge_quantile=_float("LLM_HEDGE_QUANTILE", "0.9"),
+            llm_hedge_min_delay=_float("LLM_HEDGE_MIN_DELAY", "0.05"),
+            llm_hedge_min_samples=_int("LLM_HEDGE_MIN_SAMPLES", "20"),
+            llm_hedge_budget=_float("LLM_HEDGE_BUDGET", "0.05"),
+            llm_hedge_burst=_float("LLM_HEDGE_BURST", "5"),
+            audit_log_dir=os.getenv("AUDIT_LOG_DIR", ""),
+            audit_queue_max=_int("AUDIT_QUEUE_MAX", "10000"),
+            audit_batch_size=_int("AUDIT_BATCH_SIZE", "500"),
+            audit_flush_interval=_float("AUDIT_FLUSH_INTERVAL", "1.0"),
+            audit_rotate_bytes=_int("AUDIT_ROTATE_BYTES", str(64 * 1024 * 1024)),
+            audit_keep_files=_int("AUDIT_KEEP_FILES", "0"),
+            broadcast_buffer=_int("BROADCAST_BUFFER", "256"),
+            broadcast_max_subscribers=_int("BROADCAST_MAX_SUBSCRIBERS", "10000"),
+            broadcast_keepalive=_float("BROADCAST_KEEPALIVE", "15.0"),
+            slow_request_seconds=_float("SLOW_REQUEST_SECONDS", "3.0"),
+            slow_trace_sample_rate=_float("SLOW_TRACE_SAMPLE_RATE", "0.1"),
+        )
+
+
+SETTINGS = Settings.from_env()
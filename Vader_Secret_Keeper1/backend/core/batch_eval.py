@@ -0,0 +1,264 @@
+# backend/core/batch_eval.py
+"""
+Bulk grading and replay of saved answers, outside the session state machine.
+
+Items are {"id", "chapter", "story", "riddle", "answer"} dicts. Answers of one chapter
+are packed BATCH_PACK_SIZE to an LLM prompt, packs run BATCH_PARALLEL at a time and
+each item's result is yielded as soon as its pack resolves (completion order; use
+"index" to restore input order). MEMORY is never read or written.
+
+    python -m backend.core.batch_eval answers.jsonl > verdicts.jsonl
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from backend.config import SETTINGS
+from backend.core.eval_cache import EVAL_CACHE
+from backend.core.prompts import batch_evaluate_prompt, clamp_answer
+from backend.core.storygen import llm_evaluate, normalize_verdict
+from backend.services.llm_json import JSONSchema, parse_llm_json
+from backend.services.llm_service import generate_text_async
+from backend.services.metrics import FALLBACKS, stage
+
+ITEM_SCHEMA = JSONSchema(
+    "batch_item",
+    {"id": str, "accept": bool, "vader_reaction": str, "explanation": str},
+    required=("id", "accept"),
+)
+BATCH_SCHEMA = JSONSchema("batch", {"verdicts": list}, required=("verdicts",), items={"verdicts": ITEM_SCHEMA})
+
+_PACK_DONE = object()
+
+
+class BatchEvaluator:
+    """
+    use_preclassifier: settle clear answers locally first, as the live game does.
+    use_cache: serve and store EVAL_CACHE verdicts; off by default so a replay after a
+    prompt change really asks the model again.
+    """
+
+    def __init__(
+        self,
+        chapters: Dict[int, Dict[str, Any]],
+        preclassifier,
+        pack_size: int = SETTINGS.batch_pack_size,
+        parallel: int = SETTINGS.batch_parallel,
+        use_preclassifier: bool = True,
+        use_cache: bool = False,
+    ):
+        self.chapters = chapters
+        self.preclassifier = preclassifier
+        self.pack_size = max(1, pack_size)
+        self.parallel = max(1, parallel)
+        self.use_preclassifier = use_preclassifier
+        self.use_cache = use_cache
+
+    async def run(self, items: Iterable[Any]) -> AsyncIterator[Dict[str, Any]]:
+        sem = asyncio.Semaphore(self.parallel)
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+        buckets: Dict[int, List[Dict[str, Any]]] = {}
+
+        def schedule(pack: List[Dict[str, Any]]) -> None:
+            tasks.append(asyncio.create_task(self._run_pack(pack, sem, queue)))
+
+        try:
+            for index, raw in enumerate(items):
+                try:
+                    item = self._prepare(index, raw)
+                except ValueError as e:
+                    ident = raw.get("id") if isinstance(raw, dict) else None
+                    yield {"index": index, "id": str(ident if ident not in (None, "") else index), "error": str(e)}
+                    continue
+                local = self._local(item)
+                if local is not None:
+                    yield local
+                    continue
+                bucket = buckets.setdefault(item["chapter"], [])
+                bucket.append(item)
+                if len(bucket) >= self.pack_size:
+                    schedule(buckets.pop(item["chapter"]))
+            for bucket in buckets.values():
+                schedule(bucket)
+
+            pending = len(tasks)
+            while pending:
+                record = await queue.get()
+                if record is _PACK_DONE:
+                    pending -= 1
+                else:
+                    yield record
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # ---------- per item ----------
+    def _prepare(self, index: int, raw: Any) -> Dict[str, Any]:
+        if not isinstance(raw, dict):
+            raise ValueError("item must be a JSON object")
+        try:
+            chapter = int(raw.get("chapter"))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid chapter {raw.get('chapter')!r}")
+        if chapter not in self.chapters:
+            raise ValueError(f"unknown chapter {chapter}")
+        answer = clamp_answer(str(raw.get("answer") or ""))
+        if not answer:
+            raise ValueError("empty answer")
+        ident = raw.get("id")
+        return {
+            "index": index,
+            "id": str(ident if ident not in (None, "") else index),
+            "chapter": chapter,
+            "story": str(raw.get("story") or ""),
+            "riddle": str(raw.get("riddle") or raw.get("question") or ""),
+            "answer": answer,
+        }
+
+    @staticmethod
+    def _record(item: Dict[str, Any], verdict: Dict[str, Any], source: str) -> Dict[str, Any]:
+        return {
+            "index": item["index"],
+            "id": item["id"],
+            "chapter": item["chapter"],
+            "accept": bool(verdict.get("accept")),
+            "vader_reaction": verdict.get("vader_reaction", ""),
+            "explanation": verdict.get("explanation", ""),
+            "source": source,
+        }
+
+    def _cache_key(self, item: Dict[str, Any]) -> str:
+        return EVAL_CACHE.key(item["chapter"], item["story"], item["riddle"], item["answer"])
+
+    def _local(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.use_cache:
+            cached = EVAL_CACHE.get(self._cache_key(item))
+            if cached is not None:
+                return self._record(item, cached, "cache")
+        if self.use_preclassifier:
+            verdict = self.preclassifier.classify(item["chapter"], item["answer"])
+            if verdict is not None:
+                return self._record(item, verdict, "preclassifier")
+        return None
+
+    def _fallback(self, item: Dict[str, Any], reason: str) -> Dict[str, Any]:
+        FALLBACKS.inc("local_eval")
+        return self._record(item, self.preclassifier.fallback(item["chapter"], item["answer"], reason), "fallback")
+
+    async def _single(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        chapter = self.chapters[item["chapter"]]
+        verdict = await llm_evaluate(
+            item["chapter"], chapter["theme"], chapter["required"],
+            item["story"], item["riddle"], item["answer"], use_cache=self.use_cache,
+        )
+        if verdict.get("llm_error"):
+            return self._fallback(item, verdict.get("explanation", ""))
+        return self._record(item, verdict, "llm")
+
+    # ---------- per pack ----------
+    async def _run_pack(self, pack: List[Dict[str, Any]], sem: asyncio.Semaphore, queue: asyncio.Queue) -> None:
+        try:
+            async with sem:
+                for record in await self._evaluate_pack(pack):
+                    queue.put_nowait(record)
+        except Exception as e:  # one broken pack must not stall the whole batch
+            for item in pack:
+                queue.put_nowait({"index": item["index"], "id": item["id"], "error": repr(e)})
+        finally:
+            queue.put_nowait(_PACK_DONE)
+
+    async def _evaluate_pack(self, pack: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if len(pack) == 1:
+            return [await self._single(pack[0])]
+
+        number = pack[0]["chapter"]
+        chapter = self.chapters[number]
+        entries = [(f"A{i + 1}", item["story"], item["riddle"], item["answer"]) for i, item in enumerate(pack)]
+        prompt = batch_evaluate_prompt(number, chapter["theme"], chapter["required"], entries)
+        raw = (await generate_text_async(
+            prompt, max_output_tokens=128 + 96 * len(pack), schema=BATCH_SCHEMA, profile="batch")).strip()
+        if raw.startswith("[LLM_ERROR]"):
+            return [self._fallback(item, raw[:200]) for item in pack]
+
+        with stage("json_parse"):
+            data = parse_llm_json(raw, BATCH_SCHEMA)
+        by_id = {}
+        for verdict in (data or {}).get("verdicts", []):
+            if isinstance(verdict, dict) and ITEM_SCHEMA.validate(verdict):
+                by_id[verdict["id"]] = normalize_verdict(verdict)
+
+        records, missing = [], []
+        for (answer_id, *_), item in zip(entries, pack):
+            verdict = by_id.get(answer_id)
+            if verdict is None:
+                missing.append(item)
+                continue
+            if self.use_cache:
+                EVAL_CACHE.put(self._cache_key(item), verdict)
+            records.append(self._record(item, verdict, "llm_batch"))
+        # answers the packed reply skipped or mangled get a call of their own
+        records.extend(await asyncio.gather(*(self._single(item) for item in missing)))
+        return records
+
+
+# ---------- CLI ----------
+def _read_jsonl(stream) -> Iterator[Any]:
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None  # reported as an invalid item, keeps "index" aligned with the input
+
+
+async def _main(args) -> None:
+    from backend.core.emotiongendect import ENGINE
+
+    evaluator = BatchEvaluator(
+        ENGINE.chapters,
+        ENGINE.preclassifier,
+        pack_size=args.pack,
+        parallel=args.parallel,
+        use_preclassifier=not args.no_preclassifier,
+        use_cache=args.use_cache,
+    )
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    counts: Counter = Counter()
+    started = time.perf_counter()
+    try:
+        async for record in evaluator.run(_read_jsonl(source)):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            counts[record.get("source", "error")] += 1
+            counts["accepted"] += bool(record.get("accept"))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    total = sum(v for k, v in counts.items() if k != "accepted")
+    print(f"{total} items in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f}/s), "
+          f"accepted {counts.pop('accepted', 0)}, by source {dict(counts)}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="JSONL of items ('-' for stdin)")
+    parser.add_argument("--out", default="-", help="JSONL results ('-' for stdout)")
+    parser.add_argument("--pack", type=int, default=SETTINGS.batch_pack_size, help="answers per LLM call")
+    parser.add_argument("--parallel", type=int, default=SETTINGS.batch_parallel, help="packs in flight")
+    parser.add_argument("--no-preclassifier", action="store_true", help="send every answer to the LLM")
+    parser.add_argument("--use-cache", action="store_true", help="serve and store cached verdicts")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,80 @@
 # backend/core/story_engine.py
 
-from typing import Dict, Any, Tuple
-import json
-import re
-from backend.core.memory_manager import MEMORY
-from backend.services.llm_service import generate_text
-from backend.core.storygen import llm_evaluate
-
+from typing import Dict, Any, Tuple, Optional, AsyncIterator
+import logging
+import time
+from functools import partial
+from backend.core.memory_manager import MEMORY, SESSION_LOCKS, SessionConflict
+from backend.services.llm_service import generate_text_async, generate_text_stream
+from backend.services.llm_json import JSONSchema, parse_llm_json
+from backend.core.storygen import llm_evaluate, llm_evaluate_and_continue
+from backend.core.eval_cache import EVAL_CACHE
+from backend.config import SETTINGS
+from backend.core.story_pool import StoryPool
+from backend.core.prefetch import Prefetcher
+from backend.core.preclassifier import PreClassifier
+from backend.core.prompts import RIDDLE_MARKER, clamp_answer, story_prompt, stream_prompt
+from backend.services.audit_log import AUDIT
+from backend.services.broadcast import BROADCAST
+from backend.services.metrics import FALLBACKS, PARSE_FAILURES, VERDICTS, observe_stage, stage, trace_mark, trace_since
+
+from backend.core.static_replies import (
+    DEFAULT_FAIL_REPLY, DEFAULT_HINT, DEFAULT_QUESTION, FAIL_REPLIES, HINTS, INTRO_QUESTION, INTRO_STORY,
+)
 from backend.core.vader_personality import format_vader_line
 
 # Chapter emotion requirements (internal only, not shown to player)
-# backend/core/story_engine.py
-
-# Chapter emotion requirements (internal only, not shown to player)
+# An answer must reach every group of its chapter; "required" is all groups' terms.
 CHAPTER_DEFS = {
     1: {
         "theme": "Curiosity and Anger",
-        "required": [
-            # Curiosity synonyms
-            "curiosity", "curious", "wonder", "explore", "exploration",
-            "seek", "seeking", "inquisitive", "inquiry", "question",
-            "knowledge", "interest", "discovery","learn", "learning",
-            "investigate", "investigation",
-            # Anger synonyms
-            "anger", "angry", "rage", "furious", "fury", "wrath",
-            "resentment", "hatred", "mad", "irritation", "frustration","annoyance"
-        ]
+        "groups": {
+            "curiosity": [
+                "curiosity", "curious", "wonder", "explore", "exploration",
+                "seek", "seeking", "inquisitive", "inquiry", "question",
+                "knowledge", "interest", "discovery","learn", "learning",
+                "investigate", "investigation",
+            ],
+            "anger": [
+                "anger", "angry", "rage", "furious", "fury", "wrath",
+                "resentment", "hatred", "mad", "irritation", "frustration","annoyance"
+            ],
+        },
     },
     2: {
         "theme": "Dominance",
-        "required": [
-            "dominance", "dominant", "power", "command", "control",
-            "authority", "rule", "strength", "mastery", "supremacy",
-            "lead", "conquer", "overcome", "prevail", "dominate","survive","possess"
-        ]
+        "groups": {
+            "dominance": [
+                "dominance", "dominant", "power", "command", "control",
+                "authority", "rule", "strength", "mastery", "supremacy",
+                "lead", "conquer", "overcome", "prevail", "dominate","survive","possess"
+            ],
+        },
     },
     3: {
         "theme": "Realisation and Peace",
-        "required": [
-            # Realisation synonyms
-            "realisation", "realization", "insight", "awakening", "understanding",
-            "awareness", "clarity", "recognition", "epiphany", "truth","realize","understand",
-            "aware", "aware of","aware of truth",
-            # Peace synonyms
-            "peace", "calm", "serenity", "tranquility", "harmony",
-            "balance", "stillness", "acceptance","accept", "resolution", "composure", "equanimity"
-        ]
+        "groups": {
+            "realisation": [
+                "realisation", "realization", "insight", "awakening", "understanding",
+                "awareness", "clarity", "recognition", "epiphany", "truth","realize","understand",
+                "aware", "aware of","aware of truth",
+            ],
+            "peace": [
+                "peace", "calm", "serenity", "tranquility", "harmony",
+                "balance", "stillness", "acceptance","accept", "resolution", "composure", "equanimity"
+            ],
+        },
     },
 }
+for _chapter in CHAPTER_DEFS.values():
+    _chapter["required"] = [term for terms in _chapter["groups"].values() for term in terms]
+
+log = logging.getLogger("vsk.engine")
+
+# said after a reject whose explanation is not the judge's (local verdicts carry scoring internals)
+REJECT_NUDGE = "Sharpen your intent. Let your words carry the theme."
+
+STORY_SCHEMA = JSONSchema("story", {"story": str, "riddle": str}, required=("story", "riddle"))
 
 FINAL_SECRET = "Peace is not the absence of emotion—it is mastery over it. Curiosity fuels growth, anger reveals truth, and dominance is not destruction, but the strength to protect without fear. The force within is not meant to be silenced, but understood"
 
@@ -55,26 +82,25 @@ class StoryEngine:
     def __init__(self):
         self.chapters = CHAPTER_DEFS
         self.secret = FINAL_SECRET
+        # refills want distinct samples, so they opt out of single-flight
+        self.pool = StoryPool(self.chapters.keys(), partial(self._llm_story_and_question, coalesce=False))
+        self.preclassifier = PreClassifier(self.chapters)
+        self.fused = SETTINGS.fused_eval_enabled
+        # fused verdicts already carry the next chapter, so nothing to prefetch then
+        self.prefetch = Prefetcher(
+            partial(self._llm_story_and_question, coalesce=False),
+            enabled=SETTINGS.prefetch_enabled and not self.fused,
+        )
 
     # ---------- Intro (only once) ----------
     def _intro_scene(self) -> Tuple[str, str]:
         """First intro message from Vardarth."""
-        story = (
-            "*[mechanical breath]*... At last, a seeker enters.\n\n"
-            "I am **Vardarth**, Keeper of the Holocron. I do not guard it with chains of metal, "
-            "but with trials of the spirit. Each chamber you walk will press upon your heart, "
-            "twisting it with fire, silence, or shadow. Only when your state of mind mirrors mine "
-            "will the Gate surrender its fragments of the key.\n\n"
-            "Gather them all, and the holocron’s truth will stand revealed. Fail… and you will wander "
-            "in endless echoes.\n\n"
-            "So I ask you, seeker—what do you truly crave: the truth that binds, or the power that consumes?"
-        )
-        question = "Speak, and let the Gate hear your intent."
-        return story, question
+        return INTRO_STORY, INTRO_QUESTION
 
     # ---------- Static fallback ----------
     def _static_story_and_riddle(self, chapter: int) -> Tuple[str, str]:
         """Return prewritten immersive stories + riddles (fallback)."""
+        FALLBACKS.inc("static_story")
         if chapter == 1:
             story = (
                 "The chamber flickers alive. Neon veins crawl across the walls, pulsing like secrets begging to be heard. "
@@ -108,74 +134,241 @@ class StoryEngine:
         return "The shadows whisper without meaning.", "What is your answer?"
 
     # ---------- Dynamic LLM-driven ----------
-    def _gen_story_and_question(self, chapter: int) -> Tuple[str, str]:
-        """Generate immersive story+riddle via Gemini, fallback to static if error."""
+    async def _llm_story_and_question(self, chapter: int, coalesce: bool = True) -> Optional[Tuple[str, str]]:
+        """Generate immersive story+riddle via Gemini; None if the output is unusable."""
         theme = self.chapters[chapter]["theme"]
 
-        prompt = f"""
-You are Vardarth, Sith Gatekeeper of a neon cyber-temple.
-Trial {chapter}.
-Theme (hidden from seeker): {theme}.
-
-Return ONLY valid JSON, in this exact format:
-{{
-  "story": "6–8 lines, dark immersive narrative (2-3 sentences per line). No emotion names. Always written as if the seeker is inside the scene.",
-  "riddle": "One short, mysterious question ending with a '?' that tests the seeker's *state of mind*, not their knowledge."
-}}
-"""
+        started = time.perf_counter()
+        prompt = story_prompt(chapter, theme)
+        observe_stage("prompt_build", time.perf_counter() - started)
 
-        out = generate_text(prompt)
+        out = await generate_text_async(prompt, coalesce=coalesce, schema=STORY_SCHEMA, profile="story")
         if out.startswith("[LLM_ERROR]"):
-            return self._static_story_and_riddle(chapter)
-
-        # ---- Clean output (strip ```json fences etc.)
-        cleaned = re.sub(r"```(json)?", "", out, flags=re.IGNORECASE).strip()
+            return None
+
+        with stage("json_parse"):
+            data = parse_llm_json(out, STORY_SCHEMA)
+        if data is None:
+            return None
+        story = data["story"].strip()
+        riddle = data["riddle"].strip()
+        if not story or not riddle:
+            PARSE_FAILURES.inc("story")
+            return None
+        return story, riddle
+
+    async def _gen_story_and_question(self, chapter: int) -> Tuple[str, str]:
+        """Generate immersive story+riddle via Gemini, fallback to static if error."""
+        generated = await self._llm_story_and_question(chapter)
+        return generated or self._static_story_and_riddle(chapter)
+
+    async def _stream_story_and_question(self, chapter: int) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream a fresh story from Gemini as ("story", chunk) pairs, then one ("riddle", text).
+        Plain text with a RIDDLE: marker line, since partial JSON cannot be shown to the player.
+        """
+        theme = self.chapters[chapter]["theme"]
+        prompt = stream_prompt(chapter, theme)
+        buf = ""
+        in_riddle = False
+        hold = len(RIDDLE_MARKER)
+        async for chunk in generate_text_stream(prompt):
+            if chunk.startswith("[LLM_ERROR]"):
+                return
+            buf += chunk
+            if in_riddle:
+                continue
+            idx = buf.find(RIDDLE_MARKER)
+            if idx >= 0:
+                if buf[:idx]:
+                    yield "story", buf[:idx]
+                buf = buf[idx + hold:]
+                in_riddle = True
+            elif len(buf) > hold:
+                # keep a tail back in case the marker is split across chunks
+                yield "story", buf[:-hold]
+                buf = buf[-hold:]
+        if not in_riddle:
+            if buf:
+                yield "story", buf
+            return
+        riddle = buf.strip().splitlines()[0].strip() if buf.strip() else ""
+        if riddle:
+            yield "riddle", riddle
+
+    def _next_story_and_question(self, chapter: int) -> Tuple[str, str]:
+        """Serve a pre-generated pair from the pool; static fallback when it is dry (never blocks)."""
+        return self.pool.take(chapter) or self._static_story_and_riddle(chapter)
+
+    async def _fused_evaluate(self, chapter: int, state: Dict[str, Any], user_message: str) -> Optional[Dict[str, Any]]:
+        """One-call verdict + next chapter; None (two-call path) on a cache hit or bad output."""
+        story = state.get("last_story", "")
+        question = state.get("last_question", "")
+        if EVAL_CACHE.contains(EVAL_CACHE.key(chapter, story, question, user_message)):
+            return None  # llm_evaluate will serve the cached verdict without a call
+        return await llm_evaluate_and_continue(
+            chapter,
+            self.chapters[chapter]["theme"],
+            self.chapters[chapter]["required"],
+            story,
+            question,
+            user_message,
+            chapter + 1,
+            self.chapters[chapter + 1]["theme"]
+        )
 
+    def _prefetch_next(self, session_id: str, chapter: int) -> None:
+        """
+        A riddle of `chapter` is on screen: start on the chapter an accept would open.
+        Only answer turns call this: they are rate limited, while intro/begin turns are
+        free, so minting session ids cannot buy speculative LLM calls.
+        """
+        if chapter + 1 in self.chapters:
+            self.prefetch.schedule(session_id, chapter + 1)
+
+    @staticmethod
+    async def _save(session_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Write the turn and return the session as stored. If another worker moved the
+        session on first, its write stands and its state is returned instead: the
+        caller answers from that, so the player never sees a turn that was not kept.
+        """
         try:
-            data = json.loads(cleaned)
-            story = data.get("story", "").strip()
-            riddle = data.get("riddle", "").strip()
-            if not story or not riddle:
-                raise ValueError("Missing story/riddle fields")
-            return story, riddle
-        except Exception:
-            return self._static_story_and_riddle(chapter)
+            await MEMORY.set_async(session_id, state)
+            return state
+        except SessionConflict:
+            log.info("session %s was advanced by another worker; serving its state", session_id)
+            return await MEMORY.get_async(session_id) or state
+
+    @staticmethod
+    def _stored_final(session_id: str, stored: Dict[str, Any]) -> Dict[str, Any]:
+        """The response for a turn lost to a concurrent writer: where the session stands now."""
+        return {
+            "session_id": session_id,
+            "reply": stored.get("last_story", ""),
+            "question": stored.get("last_question", DEFAULT_QUESTION),
+            "chapter": stored.get("chapter", 1),
+            "unlocked": bool(stored.get("unlocked", False)),
+        }
 
     # ---------- Public: start/continue ----------
-    def step(self, session_id: str, user_message: str) -> Dict[str, Any]:
+    async def step(self, session_id: str, user_message: str) -> Dict[str, Any]:
         """Start or continue the story for this session."""
-        state = MEMORY.get(session_id, {
-            "chapter": 0,
-            "unlocked": False,
-            "fragments": [],
-            "last_story": "",
-            "last_question": ""
-        })
-
-        chapter = state.get("chapter", 0)
-
-        if chapter == 0:
-            reply, question = self._intro_scene()
-            state["chapter"] = 1
-        else:
-            reply, question = self._gen_story_and_question(chapter)
-
-        state["last_story"] = reply
-        state["last_question"] = question
-        MEMORY[session_id] = state
-
-        return {
+        async with SESSION_LOCKS.hold(session_id):
+            state = await MEMORY.get_async(session_id, {
+                "chapter": 0,
+                "unlocked": False,
+                "fragments": [],
+                "last_story": "",
+                "last_question": ""
+            })
+
+            chapter = state.get("chapter", 0)
+
+            if chapter == 0:
+                reply, question = self._intro_scene()
+                state["chapter"] = 1
+            else:
+                reply, question = self._next_story_and_question(chapter)
+
+            state["last_story"] = reply
+            state["last_question"] = question
+            stored = await self._save(session_id, state)
+            if stored is not state:
+                return self._stored_final(session_id, stored)
+        AUDIT.emit({"kind": "story" if chapter else "intro", "session_id": session_id, "chapter": state["chapter"]})
+
+        resp = {
             "session_id": session_id,
             "reply": reply,
             "question": question,
             "chapter": state["chapter"],
             "unlocked": False
         }
+        if BROADCAST.watched(session_id):
+            BROADCAST.publish(session_id, "story", {"text": reply})
+            BROADCAST.publish_final(session_id, resp)
+        return resp
+
+    async def begin_intro(self, session_id: str) -> bool:
+        """
+        Record the intro turn of a new session without building its reply: the route
+        serves the precomputed bytes. False if the session has already started.
+        """
+        async with SESSION_LOCKS.hold(session_id):
+            state = await MEMORY.get_async(session_id)
+            if state is not None and state.get("chapter", 0) != 0:
+                return False
+            state = state or {"unlocked": False, "fragments": []}
+            state.update(chapter=1, last_story=INTRO_STORY, last_question=INTRO_QUESTION)
+            if await self._save(session_id, state) is not state:
+                return False
+        AUDIT.emit({"kind": "intro", "session_id": session_id, "chapter": 1})
+        if BROADCAST.watched(session_id):
+            BROADCAST.publish(session_id, "story", {"text": INTRO_STORY})
+            BROADCAST.publish_final(session_id, {"reply": INTRO_STORY, "question": INTRO_QUESTION, "chapter": 1})
+        return True
+
+    @staticmethod
+    def is_hint(user_message: str) -> bool:
+        """Hint/help turns are answered from a fixed table, no LLM involved."""
+        msg_lower = user_message.strip().lower()
+        return "hint" in msg_lower or "help" in msg_lower
 
     # ---------- Public: evaluate answer ----------
-    def answer(self, session_id: str, user_message: str) -> Dict[str, Any]:
+    async def answer(self, session_id: str, user_message: str) -> Dict[str, Any]:
         """Evaluate the user's answer using semantic emotion analysis."""
-        state = MEMORY.get(session_id, {
+        result: Dict[str, Any] = {}
+        async for event, data in self.answer_events(session_id, user_message, stream_story=False):
+            if event == "final":
+                result = data
+        return result
+
+    async def answer_events(
+        self, session_id: str, user_message: str, stream_story: bool = True
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Same flow as answer(), emitted as events for streaming clients:
+        ("verdict", {"reply"}) once the evaluation resolves, ("story", {"text"})
+        chunks of the next chapter, then ("final", full response dict).
+        With stream_story=False a dry pool falls back to the static story instead of Gemini.
+        Holds the session's lock throughout, so concurrent answers cannot both advance it.
+        The turn is recorded in the audit log once "final" is out, and each event is
+        published to the session's spectators as it is produced.
+        """
+        started = time.perf_counter()
+        mark = trace_mark()
+        record = None
+        async with SESSION_LOCKS.hold(session_id):
+            BROADCAST.publish(session_id, "answer", {"text": user_message})
+            async for event, data in self._answer_events(session_id, user_message, stream_story):
+                if event == "audit":
+                    record = data
+                    continue
+                if event == "final":
+                    if AUDIT.enabled:
+                        self._audit(record or {"kind": "hint", "session_id": session_id}, data, started, mark)
+                    BROADCAST.publish_final(session_id, data)
+                else:
+                    BROADCAST.publish(session_id, event, data)
+                yield event, data
+
+    @staticmethod
+    def _audit(record: Dict[str, Any], final: Dict[str, Any], started: float, mark: int) -> None:
+        record.update(
+            next_chapter=final.get("chapter"),
+            unlocked=bool(final.get("unlocked")),
+            ms=round(1000 * (time.perf_counter() - started), 1),
+            # this turn's LLM calls (none for local verdicts and cache hits)
+            llm=[{"call": name.partition(":")[2], "ms": round(1000 * seconds, 1)}
+                 for name, seconds in trace_since(mark) if name.startswith("llm_call")],
+        )
+        AUDIT.emit(record)
+
+    async def _answer_events(
+        self, session_id: str, user_message: str, stream_story: bool
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        state = await MEMORY.get_async(session_id, {
             "chapter": 1,
             "unlocked": False,
             "fragments": [],
@@ -187,89 +380,157 @@ Return ONLY valid JSON, in this exact format:
         chapter_def = self.chapters.get(chapter, {})
         required = chapter_def.get("required", [])
         theme = chapter_def.get("theme", "Unknown")
-
-        msg_lower = user_message.strip().lower()
-
         # ---- Special case: user asks for hint ----
-        if "hint" in msg_lower or "help" in msg_lower:
-            hints = {
-                1: "*[mechanical breath]* Secrets tempt, but only fury breaks chains. Both paths are needed.",
-                2: "*[mechanical breath]* The Gate yields not to mercy, but to command.",
-                3: "*[mechanical breath]* Peace is not surrender—it is balance held steady.",
-            }
-            return {
+        if self.is_hint(user_message):
+            hint = HINTS.get(chapter, DEFAULT_HINT)
+            yield "verdict", {"reply": hint}
+            yield "final", {
                 "session_id": session_id,
-                "reply": hints.get(chapter, "*[mechanical breath]* The Gate offers no clue."),
-                "question": state.get("last_question", "What is your answer?"),
+                "reply": hint,
+                "question": state.get("last_question", DEFAULT_QUESTION),
                 "chapter": chapter,
                 "unlocked": False
             }
-
-        # ---- Evaluate answer ----
-        eval_result = llm_evaluate(
-            chapter,
-            theme,
-            required,
-            state.get("last_story", ""),
-            state.get("last_question", ""),
-            user_message
-        )
+            return
+
+        # bounded before the classifier, cache key or prompt ever see it
+        user_message = clamp_answer(user_message)
+
+        # ---- Evaluate answer (local fast path, LLM for the ambiguous band) ----
+        source = "preclassifier"
+        eval_result = self.preclassifier.classify(chapter, user_message)
+        if eval_result is None and self.fused and chapter + 1 in self.chapters:
+            source = "fused"
+            eval_result = await self._fused_evaluate(chapter, state, user_message)
+        if eval_result is None:
+            source = "llm"
+            eval_result = await llm_evaluate(
+                chapter,
+                theme,
+                required,
+                state.get("last_story", ""),
+                state.get("last_question", ""),
+                user_message
+            )
+            if eval_result.get("llm_error"):
+                FALLBACKS.inc("local_eval")
+                source = "fallback"
+                eval_result = self.preclassifier.fallback(chapter, user_message, eval_result.get("explanation", ""))
 
         accept = bool(eval_result.get("accept"))
+        VERDICTS.inc(chapter, "accept" if accept else "reject")
         vader_line = eval_result.get("vader_reaction", "")
         explanation = eval_result.get("explanation", "")
+        # story/riddle as answered, so the log replays through batch_eval as-is
+        yield "audit", {
+            "kind": "answer",
+            "session_id": session_id,
+            "chapter": chapter,
+            "story": state.get("last_story", ""),
+            "riddle": state.get("last_question", ""),
+            "answer": user_message,
+            "accept": accept,
+            "explanation": explanation,
+            "source": source,
+        }
 
         if accept:
             frag = f"FRAG-{chapter}"
             state.setdefault("fragments", []).append(frag)
+            verdict = format_vader_line(vader_line, mood="praise")
 
             if chapter >= 3:
                 state["unlocked"] = True
-                MEMORY[session_id] = state
-                return {
+                stored = await self._save(session_id, state)
+                if stored is not state:
+                    final = self._stored_final(session_id, stored)
+                    yield "verdict", {"reply": final["reply"]}
+                    yield "final", final
+                    return
+                reply = verdict + f"\n\nThe holocron yields its truth: {self.secret}"
+                yield "verdict", {"reply": reply}
+                yield "final", {
                     "session_id": session_id,
-                    "reply": format_vader_line(vader_line, mood="praise")
-                             + f"\n\nThe holocron yields its truth: {self.secret}",
+                    "reply": reply,
                     "question": "",
                     "chapter": chapter,
                     "unlocked": True,
                     "fragment": frag,
                     "explanation": explanation
                 }
+                return
+
+            verdict += "\n\n— The Gate opens to the next trial —\n\n"
+            yield "verdict", {"reply": verdict}
 
             next_chap = chapter + 1
+            if eval_result.get("next_story"):
+                pooled = (eval_result["next_story"], eval_result["next_riddle"])
+            else:
+                # a running prefetch is awaited only where the alternative is streaming a fresh one
+                pooled = (await self.prefetch.take(session_id, next_chap, wait=stream_story)
+                          or self.pool.take(next_chap))
+            if pooled is not None or not stream_story:
+                reply2, question2 = pooled or self._static_story_and_riddle(next_chap)
+                yield "story", {"text": reply2}
+            else:
+                parts = []
+                question2 = ""
+                async for kind, text in self._stream_story_and_question(next_chap):
+                    if kind == "story":
+                        parts.append(text)
+                        yield "story", {"text": text}
+                    else:
+                        question2 = text
+                reply2 = "".join(parts).strip()
+                if not reply2 or not question2:
+                    static_story, static_riddle = self._static_story_and_riddle(next_chap)
+                    if not reply2:
+                        reply2 = static_story
+                        yield "story", {"text": reply2}
+                    question2 = question2 or static_riddle
+
             state["chapter"] = next_chap
             state["unlocked"] = False
-            reply2, question2 = self._gen_story_and_question(next_chap)
             state["last_story"] = reply2
             state["last_question"] = question2
-            MEMORY[session_id] = state
+            stored = await self._save(session_id, state)
+            if stored is not state:
+                yield "final", self._stored_final(session_id, stored)
+                return
+            self._prefetch_next(session_id, next_chap)
 
-            return {
+            yield "final", {
                 "session_id": session_id,
-                "reply": format_vader_line(vader_line, mood="praise")
-                         + "\n\n— The Gate opens to the next trial —\n\n" + reply2,
+                "reply": verdict + reply2,
                 "question": question2,
                 "chapter": next_chap,
                 "unlocked": False,
                 "fragment": frag,
                 "explanation": explanation
             }
+            return
 
         # ---- Rejected path ----
-        fail_lines = {
-            1: "*[mechanical breath]* Weak. Wonder without fire is silence.",
-            2: "*[mechanical breath]* You kneel when you should command.",
-            3: "*[mechanical breath]* You speak of peace, but I hear surrender.",
-        }
-        fail_line = fail_lines.get(chapter, "*[mechanical breath]* Pathetic. Empty words.")
-
-        MEMORY[session_id] = state
-        return {
+        stored = await self._save(session_id, state)
+        if stored is not state:
+            final = self._stored_final(session_id, stored)
+            yield "verdict", {"reply": final["reply"]}
+            yield "final", final
+            return
+        self._prefetch_next(session_id, chapter)  # no-op if one is already held
+        if source in ("llm", "fused"):
+            nudge = explanation or REJECT_NUDGE
+        else:
+            # score, hits and negated terms: for logs and the audit record, never the player
+            log.debug("%s reject in chapter %d: %s", source, chapter, explanation)
+            nudge = REJECT_NUDGE
+        reply = FAIL_REPLIES.get(chapter, DEFAULT_FAIL_REPLY) + "\n\n" + nudge
+        yield "verdict", {"reply": reply}
+        yield "final", {
             "session_id": session_id,
-            "reply": format_vader_line(fail_line, mood="mock")
-                     + "\n\n" + (explanation or "Sharpen your intent. Let your words carry the theme."),
-            "question": state.get("last_question", "What is your answer?"),
+            "reply": reply,
+            "question": state.get("last_question", DEFAULT_QUESTION),
             "chapter": chapter,
             "unlocked": False,
             "explanation": explanation
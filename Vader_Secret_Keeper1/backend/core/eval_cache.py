@@ -0,0 +1,152 @@
+# backend/core/eval_cache.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from backend.config import SETTINGS
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_answer(text: str) -> str:
+    """Fold case, accents, punctuation and whitespace so near-duplicates share a key."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class EvalCache:
+    """
+    LRU + TTL cache of llm_evaluate verdicts keyed on chapter + normalized answer
+    (+ a digest of story/riddle unless running context-agnostic).
+    Bounded by entry count and approximate byte size.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SETTINGS.eval_cache_max_entries,
+        max_bytes: int = SETTINGS.eval_cache_max_bytes,
+        ttl: float = SETTINGS.eval_cache_ttl,
+        context_agnostic: bool = SETTINGS.eval_cache_context_agnostic,
+        path: str = SETTINGS.eval_cache_path,
+        enabled: bool = SETTINGS.eval_cache_enabled,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.enabled = enabled
+        self._clock = clock  # wall time: stored_at survives save/load across restarts
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.context_agnostic = context_agnostic
+        self.path = path
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        if self.enabled and self.path:
+            self.load()
+
+    def key(self, chapter: int, story: str, question: str, user_message: str) -> str:
+        parts = [str(chapter), normalize_answer(user_message)]
+        if not self.context_agnostic:
+            ctx = hashlib.blake2b(f"{story}\x00{question}".encode("utf-8"), digest_size=8).hexdigest()
+            parts.append(ctx)
+        return "|".join(parts)
+
+    @staticmethod
+    def _size(key: str, verdict: Dict[str, Any]) -> int:
+        return len(key) + sum(len(str(v)) for v in verdict.values()) + 64
+
+    # ---------- get / put ----------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, verdict, size = item
+            if self.ttl > 0 and self._clock() - stored_at > self.ttl:
+                del self._data[key]
+                self._bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return dict(verdict)
+
+    def contains(self, key: str) -> bool:
+        """Membership check that leaves counters and LRU order alone."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and not (self.ttl > 0 and self._clock() - item[0] > self.ttl)
+
+    def put(self, key: str, verdict: Dict[str, Any], stored_at: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        size = self._size(key, verdict)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (stored_at if stored_at is not None else self._clock(), dict(verdict), size)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    # ---------- persistence ----------
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, stored_at, verdict in rows:
+            self.put(key, verdict, stored_at=stored_at)
+        # drop anything that expired while we were down
+        now = self._clock()
+        with self._lock:
+            for key in [k for k, (t, _, _) in self._data.items() if self.ttl > 0 and now - t > self.ttl]:
+                self._bytes -= self._data.pop(key)[2]
+
+    def save(self) -> None:
+        if not self.enabled or not self.path:
+            return
+        with self._lock:
+            rows = [[k, t, v] for k, (t, v, _) in self._data.items()]
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
+
+EVAL_CACHE = EvalCache()
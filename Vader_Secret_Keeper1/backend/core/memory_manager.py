@@ -1,27 +1,86 @@
 # backend/core/memory_manager.py
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+import asyncio
+import hashlib
+import json
+import socket
+import sqlite3
+import sys
 import threading
+import time
 
-_lock = threading.Lock()
-_store: Dict[str, Dict[str, Any]] = {}
+from backend.config import SETTINGS
+from backend.services.metrics import observe_stage
 
-class InMemoryStore:
-    def __init__(self):
-        self.store = _store
-        self.lock = _lock
+_STATE_KEYS = ("chapter", "unlocked", "fragments", "last_story", "last_question")
+
+
+# ---------- compact session encoding ----------
+def _pack_fragments(frags) -> list:
+    # "FRAG-2" -> 2; anything unusual is kept verbatim
+    out = []
+    for f in frags or []:
+        if isinstance(f, str) and f.startswith("FRAG-") and f[5:].isdigit():
+            out.append(int(f[5:]))
+        else:
+            out.append(f)
+    return out
+
+
+def _unpack_fragments(frags) -> list:
+    return [f"FRAG-{f}" if isinstance(f, int) else f for f in frags]
+
+
+def _text_id(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=10).hexdigest()
+
+
+def _extra(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    extra = {k: v for k, v in state.items() if k not in _STATE_KEYS and k != "_rev"}
+    return extra or None
+
+
+class SessionConflict(Exception):
+    """The session was written by someone else since it was read."""
+
+
+class SessionStore:
+    """
+    Interface every session backend implements.
+    get() returns a fresh dict; callers mutate it and write it back with set()
+    (MEMORY.get / MEMORY[...] keep working unchanged). Async code uses the *_async
+    variants: backends doing I/O run it on a worker thread so a slow disk or Redis
+    never stalls the event loop.
+    Stored sessions carry a revision in "_rev": set() of a dict that came from get()
+    is a compare-and-set and raises SessionConflict if another writer got there first
+    (re-read before writing the same session twice).
+    """
+
+    conflicts = 0
 
     def get(self, key: str, default=None):
-        with self.lock:
-            return self.store.get(key, default)
+        raise NotImplementedError
 
-    def set(self, key: str, value):
-        with self.lock:
-            self.store[key] = value
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
 
-    def delete(self, key: str):
-        with self.lock:
-            if key in self.store:
-                del self.store[key]
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    async def get_async(self, key: str, default=None):
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def set_async(self, key: str, value: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    async def delete_async(self, key: str) -> None:
+        await asyncio.to_thread(self.delete, key)
 
     # dict-like access
     def __getitem__(self, key):
@@ -30,4 +89,451 @@ class InMemoryStore:
     def __setitem__(self, key, value):
         self.set(key, value)
 
-MEMORY = InMemoryStore()
+
+class _Shard:
+    __slots__ = ("store", "lock")
+
+    def __init__(self):
+        self.store: "OrderedDict[str, Tuple[float, tuple]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+
+class InMemoryStore(SessionStore):
+    """
+    Single-process store with idle-TTL and LRU eviction past max_sessions.
+    Sessions are kept as small tuples; story/riddle strings are interned so
+    sessions that saw the same (pooled/static) text share one copy.
+    Keys are striped over `shards` independently locked LRUs, so unrelated
+    sessions rarely touch the same lock.
+    """
+
+    def __init__(self, ttl: float = SETTINGS.session_ttl, max_sessions: int = SETTINGS.session_max,
+                 shards: int = SETTINGS.session_shards):
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.shards = [_Shard() for _ in range(max(1, shards))]
+        self.shard_max = max(1, self.max_sessions // len(self.shards))
+        self.evictions = 0
+        self.expired = 0
+
+    def _shard(self, key: str) -> _Shard:
+        return self.shards[hash(key) % len(self.shards)]
+
+    @staticmethod
+    def _pack(state: Dict[str, Any], rev: int) -> tuple:
+        return (
+            int(state.get("chapter", 0)),
+            bool(state.get("unlocked", False)),
+            tuple(_pack_fragments(state.get("fragments"))),
+            sys.intern(state.get("last_story", "") or ""),
+            sys.intern(state.get("last_question", "") or ""),
+            _extra(state),
+            rev,
+        )
+
+    @staticmethod
+    def _unpack(packed: tuple) -> Dict[str, Any]:
+        chapter, unlocked, frags, story, question, extra, rev = packed
+        state = {
+            "chapter": chapter,
+            "unlocked": unlocked,
+            "fragments": _unpack_fragments(frags),
+            "last_story": story,
+            "last_question": question,
+            "_rev": rev,
+        }
+        if extra:
+            state.update(extra)
+        return state
+
+    def get(self, key: str, default=None):
+        shard = self._shard(key)
+        waited = time.perf_counter()
+        with shard.lock:
+            observe_stage("memory_lock_wait", time.perf_counter() - waited)
+            item = shard.store.get(key)
+            if item is None:
+                return default
+            touched, packed = item
+            if self.ttl > 0 and time.monotonic() - touched > self.ttl:
+                del shard.store[key]
+                self.expired += 1
+                return default
+            shard.store.move_to_end(key)
+        return self._unpack(packed)
+
+    def set(self, key: str, value):
+        shard = self._shard(key)
+        expected = value.get("_rev")
+        waited = time.perf_counter()
+        with shard.lock:
+            observe_stage("memory_lock_wait", time.perf_counter() - waited)
+            item = shard.store.get(key)
+            rev = item[1][-1] if item is not None else 0
+            if expected is not None and item is not None and rev != expected:
+                self.conflicts += 1
+                raise SessionConflict(key)
+            shard.store[key] = (time.monotonic(), self._pack(value, rev + 1))
+            shard.store.move_to_end(key)
+            self._evict(shard)
+
+    def delete(self, key: str):
+        shard = self._shard(key)
+        with shard.lock:
+            shard.store.pop(key, None)
+
+    # no I/O: a thread hop would cost more than the lookup
+    async def get_async(self, key: str, default=None):
+        return self.get(key, default)
+
+    async def set_async(self, key: str, value: Dict[str, Any]) -> None:
+        self.set(key, value)
+
+    async def delete_async(self, key: str) -> None:
+        self.delete(key)
+
+    def _evict(self, shard: _Shard) -> None:
+        # oldest-first: expired sessions, then LRU overflow
+        now = time.monotonic()
+        store = shard.store
+        while store:
+            key, (touched, _) = next(iter(store.items()))
+            if self.ttl > 0 and now - touched > self.ttl:
+                self.expired += 1
+            elif len(store) > self.shard_max:
+                self.evictions += 1
+            else:
+                break
+            del store[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "sessions": sum(len(s.store) for s in self.shards),
+                "shards": len(self.shards), "evictions": self.evictions, "expired": self.expired,
+                "conflicts": self.conflicts}
+
+
+class _SerializedStore(SessionStore):
+    """
+    Shared encoding for out-of-process backends: a session is a short JSON
+    array and story/riddle bodies live once in a content-addressed text table.
+    """
+
+    @staticmethod
+    def _encode(state: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
+        texts = {}
+        refs = []
+        for k in ("last_story", "last_question"):
+            text = state.get(k, "") or ""
+            if text:
+                tid = _text_id(text)
+                texts[tid] = text
+                refs.append(tid)
+            else:
+                refs.append("")
+        row = [int(state.get("chapter", 0)), 1 if state.get("unlocked") else 0,
+               _pack_fragments(state.get("fragments")), refs[0], refs[1]]
+        extra = _extra(state)
+        if extra:
+            row.append(extra)
+        return json.dumps(row, separators=(",", ":"), ensure_ascii=False), texts
+
+    @staticmethod
+    def _decode(blob: str, texts: Dict[str, str]) -> Dict[str, Any]:
+        row = json.loads(blob)
+        state = {
+            "chapter": row[0],
+            "unlocked": bool(row[1]),
+            "fragments": _unpack_fragments(row[2]),
+            "last_story": texts.get(row[3], "") if row[3] else "",
+            "last_question": texts.get(row[4], "") if row[4] else "",
+        }
+        if len(row) > 5 and row[5]:
+            state.update(row[5])
+        return state
+
+
+class SQLiteStore(_SerializedStore):
+    """SQLite (WAL) store: safe to share between uvicorn workers on one host."""
+
+    def __init__(self, path: str = SETTINGS.session_sqlite_path, ttl: float = SETTINGS.session_ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        self._counts = (0, 0)  # sessions, texts; refreshed by sweep() so stats() never queries
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL, rev INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS sessions_touched ON sessions(touched);
+            CREATE TABLE IF NOT EXISTS texts (
+                id TEXT PRIMARY KEY, body TEXT NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        if "rev" not in {r[1] for r in conn.execute("PRAGMA table_info(sessions)")}:
+            conn.execute("ALTER TABLE sessions ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+        self._count(conn)
+
+    def _count(self, conn: sqlite3.Connection) -> None:
+        self._counts = (conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0],
+                        conn.execute("SELECT COUNT(*) FROM texts").fetchone()[0])
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default=None):
+        conn = self._conn()
+        row = conn.execute("SELECT data, touched, rev FROM sessions WHERE id = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        if self.ttl > 0 and time.time() - row[1] > self.ttl:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (key,))
+            return default
+        refs = [r for r in json.loads(row[0])[3:5] if r]
+        texts = {}
+        if refs:
+            marks = ",".join("?" * len(refs))
+            texts = dict(conn.execute(f"SELECT id, body FROM texts WHERE id IN ({marks})", refs).fetchall())
+        state = self._decode(row[0], texts)
+        state["_rev"] = row[2]
+        return state
+
+    def set(self, key: str, value):
+        blob, texts = self._encode(value)
+        expected = value.get("_rev")
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT rev FROM sessions WHERE id = ?", (key,)).fetchone()
+            rev = row[0] if row is not None else 0
+            if expected is not None and row is not None and rev != expected:
+                self.conflicts += 1
+                raise SessionConflict(key)
+            if texts:
+                conn.executemany("INSERT OR IGNORE INTO texts(id, body) VALUES (?, ?)", texts.items())
+            conn.execute(
+                "INSERT INTO sessions(id, data, touched, rev) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, touched = excluded.touched, rev = excluded.rev",
+                (key, blob, time.time(), rev + 1),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self.sweep()
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM sessions WHERE id = ?", (key,))
+
+    def sweep(self) -> None:
+        """Drop idle sessions and any text no session references any more."""
+        conn = self._conn()
+        if self.ttl > 0:
+            conn.execute("DELETE FROM sessions WHERE touched < ?", (time.time() - self.ttl,))
+        conn.execute(
+            "DELETE FROM texts WHERE id NOT IN ("
+            " SELECT json_extract(data, '$[3]') FROM sessions"
+            " UNION SELECT json_extract(data, '$[4]') FROM sessions)"
+        )
+        self._count(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        # counts as of the last sweep (every 1000 writes): stats() runs on the event loop
+        sessions, texts = self._counts
+        return {"backend": "sqlite", "sessions": sessions, "texts": texts, "conflicts": self.conflicts}
+
+
+class _RespClient:
+    """Minimal RESP2 client: enough for GET/SET/DEL/MGET/EXPIRE against Redis or a compatible stand-in."""
+
+    def __init__(self, url: str):
+        u = urlparse(url)
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.password = u.password
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self._local = threading.local()
+
+    def _sock(self):
+        f = getattr(self._local, "f", None)
+        if f is None:
+            sock = socket.create_connection((self.host, self.port), timeout=5.0)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            f = sock.makefile("rwb")
+            self._local.f = f
+            if self.password:
+                self._call(f, "AUTH", self.password)
+            if self.db:
+                self._call(f, "SELECT", self.db)
+        return f
+
+    def _call(self, f, *args):
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+        f.write(b"".join(out))
+        f.flush()
+        return self._read(f)
+
+    def _read(self, f):
+        line = f.readline()
+        if not line:
+            raise ConnectionError("redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = f.read(n + 2)[:-2]
+            return data.decode("utf-8")
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read(f) for _ in range(n)]
+        raise RuntimeError(f"unexpected RESP reply: {line!r}")
+
+    def call(self, *args):
+        try:
+            return self._call(self._sock(), *args)
+        except (OSError, ConnectionError):
+            self._local.f = None  # reconnect once
+            return self._call(self._sock(), *args)
+
+
+# KEYS: session, revision; ARGV: expected rev ("" = unconditional), blob, ttl (0 = none).
+# Returns the new revision, or -1 when the stored one moved on.
+_CAS_SET = """
+local rev = tonumber(redis.call('GET', KEYS[2]) or '0')
+if ARGV[1] ~= '' and redis.call('EXISTS', KEYS[1]) == 1 and rev ~= tonumber(ARGV[1]) then
+  return -1
+end
+rev = rev + 1
+if ARGV[3] ~= '0' then
+  redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+  redis.call('SET', KEYS[2], rev, 'EX', ARGV[3])
+else
+  redis.call('SET', KEYS[1], ARGV[2])
+  redis.call('SET', KEYS[2], rev)
+end
+return rev
+"""
+
+
+class RedisStore(_SerializedStore):
+    """
+    Redis-protocol store; keys expire server-side after SESSION_TTL of inactivity.
+    The revision lives next to the session and is checked and bumped atomically
+    by a server-side script (needs EVAL).
+    """
+
+    def __init__(self, url: str = SETTINGS.session_redis_url, ttl: float = SETTINGS.session_ttl, prefix: str = "vsk:"):
+        self.client = _RespClient(url)
+        self.ttl = int(ttl) if ttl > 0 else 0
+        self.prefix = prefix
+
+    def get(self, key: str, default=None):
+        blob, rev = self.client.call("MGET", f"{self.prefix}s:{key}", f"{self.prefix}r:{key}")
+        if blob is None:
+            return default
+        refs = [r for r in json.loads(blob)[3:5] if r]
+        texts = {}
+        if refs:
+            bodies = self.client.call("MGET", *(f"{self.prefix}t:{r}" for r in refs))
+            texts = {r: b for r, b in zip(refs, bodies) if b is not None}
+        state = self._decode(blob, texts)
+        state["_rev"] = int(rev or 0)
+        return state
+
+    def set(self, key: str, value):
+        blob, texts = self._encode(value)
+        ex = ("EX", self.ttl) if self.ttl else ()
+        for tid, body in texts.items():
+            # texts outlive the sessions pointing at them by refreshing on every write
+            self.client.call("SET", f"{self.prefix}t:{tid}", body, *ex)
+        expected = value.get("_rev")
+        rev = self.client.call(
+            "EVAL", _CAS_SET, 2, f"{self.prefix}s:{key}", f"{self.prefix}r:{key}",
+            "" if expected is None else expected, blob, self.ttl,
+        )
+        if rev < 0:
+            self.conflicts += 1
+            raise SessionConflict(key)
+
+    def delete(self, key: str):
+        self.client.call("DEL", f"{self.prefix}s:{key}", f"{self.prefix}r:{key}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "conflicts": self.conflicts}
+
+
+class SessionLocks:
+    """
+    One asyncio.Lock per session id, held for a whole engine step (read, LLM calls,
+    write) so concurrent requests for one session run one after another. Entries
+    exist only while someone holds or waits for them; other sessions never contend.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, list] = {}  # key -> [lock, holders + waiters]
+        self.acquired = 0
+        self.contended = 0
+        self.peak_waiters = 0
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        lock = entry[0]
+        try:
+            if lock.locked():
+                self.contended += 1
+                self.peak_waiters = max(self.peak_waiters, entry[1] - 1)
+                waited = time.perf_counter()
+                await lock.acquire()
+                observe_stage("session_lock_wait", time.perf_counter() - waited)
+            else:
+                await lock.acquire()
+            self.acquired += 1
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": len(self._locks), "acquired": self.acquired,
+                "contended": self.contended, "peak_waiters": self.peak_waiters}
+
+
+def make_store(backend: str = SETTINGS.session_backend) -> SessionStore:
+    if backend == "sqlite":
+        return SQLiteStore()
+    if backend == "redis":
+        return RedisStore()
+    return InMemoryStore()
+
+
+MEMORY = make_store()
+SESSION_LOCKS = SessionLocks()
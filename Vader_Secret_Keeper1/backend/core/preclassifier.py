@@ -0,0 +1,171 @@
+# backend/core/preclassifier.py
+import re
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from backend.config import SETTINGS
+
+# Words that flip the meaning of the next few tokens
+NEGATORS = {
+    "not", "no", "never", "without", "nor", "neither", "none", "nothing",
+    "dont", "don't", "doesnt", "doesn't", "isnt", "isn't", "wont", "won't",
+    "cant", "can't", "cannot", "lack", "lacking", "hardly",
+}
+NEGATION_WINDOW = 3  # tokens before a hit that a negator may sit in
+# a negator's reach ends at a clause break: "No, I seek ..." or "nothing but rage" negate nothing after it
+CLAUSE_BREAKS = {",", ".", ";", ":", "!", "?", "but"}
+
+# Tiny valence lexicon: strength/intent vs. submission/emptiness
+LEXICON = {
+    "will": 0.3, "must": 0.3, "want": 0.3, "crave": 0.6, "burn": 0.5, "burns": 0.5,
+    "strong": 0.8, "unshaken": 0.8, "unbroken": 0.8, "steady": 0.6, "stand": 0.4,
+    "fire": 0.4, "tear": 0.4, "break": 0.3, "rise": 0.5, "truth": 0.3,
+    "weak": -0.8, "weakness": -0.8, "kneel": -0.8, "submit": -0.8, "surrender": -0.8,
+    "obey": -0.6, "afraid": -0.6, "fear": -0.5, "scared": -0.6, "quit": -0.7,
+    "flee": -0.6, "run": -0.3, "bored": -0.7, "whatever": -0.7, "idk": -0.8,
+    "nothing": -0.5, "empty": -0.4, "pass": -0.4, "skip": -0.5,
+}
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+_CLAUSE_TOKEN_RE = re.compile(r"[a-z']+|[,.;:!?]")  # words plus the punctuation that ends a clause
+
+ACCEPT_LINE = "*[mechanical breath]* Your intent rings true. The Gate stirs."
+REJECT_LINE = "*[mechanical breath]* Noise. Your words carry nothing the Gate can weigh."
+
+
+def _compile(terms: Iterable[str]) -> "re.Pattern":
+    """One alternation per chapter, longest phrase first so 'aware of truth' beats 'aware'."""
+    phrases = sorted({t.strip().lower() for t in terms if t.strip()}, key=len, reverse=True)
+    parts = [r"\s+".join(re.escape(w) for w in p.split()) for p in phrases]
+    return re.compile(r"\b(?:" + "|".join(parts) + r")\b")
+
+
+class PreClassifier:
+    """
+    Fast local scoring stage in front of llm_evaluate.
+    Decides confidently accepted / rejected answers and leaves the
+    ambiguous middle band to the LLM. A chapter's "groups" (e.g. curiosity
+    and anger) must each be hit before an answer is accepted locally.
+    """
+
+    def __init__(
+        self,
+        chapters: Dict[int, Dict[str, Any]],
+        accept_threshold: float = SETTINGS.preclass_accept_threshold,
+        reject_threshold: float = SETTINGS.preclass_reject_threshold,
+        enabled: bool = SETTINGS.preclass_enabled,
+        fallback_threshold: float = SETTINGS.preclass_fallback_threshold,
+    ):
+        self.enabled = enabled
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.fallback_threshold = fallback_threshold
+        self.patterns = {
+            c: {group: _compile(terms) for group, terms in (d.get("groups") or {"required": d.get("required", [])}).items()}
+            for c, d in chapters.items()
+        }
+        self.local_accept = 0
+        self.local_reject = 0
+        self.deferred = 0
+        self.fallbacks = 0
+
+    # ---------- scoring ----------
+    @staticmethod
+    def _is_garbage(text: str, tokens: List[str]) -> bool:
+        if not tokens:
+            return True
+        letters = sum(ch.isalpha() for ch in text)
+        if letters < 2 or letters < len(text) * 0.5:
+            return True
+        # keyboard mash: no vowels, or a longer run of one or two characters ("no", "me" are words)
+        joined = "".join(tokens)
+        return not re.search(r"[aeiouy]", joined) or (len(joined) > 3 and len(set(joined)) <= 2)
+
+    @staticmethod
+    def _negated(tokens_before: List[str]) -> bool:
+        """A negator among the last NEGATION_WINDOW words, looking back no further than the clause."""
+        seen = 0
+        for t in reversed(tokens_before):
+            if t in CLAUSE_BREAKS or seen == NEGATION_WINDOW:
+                return False
+            if t in NEGATORS or t.endswith("n't"):
+                return True
+            seen += 1
+        return False
+
+    def score(self, chapter: int, user_message: str) -> Tuple[float, Dict[str, Any]]:
+        text = user_message.strip().lower()
+        tokens = _TOKEN_RE.findall(text)
+        if self._is_garbage(text, tokens):
+            return float("-inf"), {"garbage": True}
+
+        hits, negated, missing = set(), set(), []
+        for group, pattern in self.patterns.get(chapter, {}).items():
+            group_hits = set()
+            for m in pattern.finditer(text):
+                before = _CLAUSE_TOKEN_RE.findall(text[:m.start()])
+                term = " ".join(m.group(0).split())
+                (negated if self._negated(before) else group_hits).add(term)
+            group_hits -= negated
+            if not group_hits:
+                missing.append(group)
+            hits |= group_hits
+
+        valence = 0.0
+        marked = _CLAUSE_TOKEN_RE.findall(text)
+        for i, tok in enumerate(marked):
+            v = LEXICON.get(tok)
+            if v is not None:
+                valence += -v if self._negated(marked[:i]) else v
+        sentiment = max(-1.0, min(1.0, valence))
+
+        score = 0.5 * len(hits) - 0.6 * len(negated) + 0.2 * sentiment
+        return score, {
+            "hits": sorted(hits), "negated": sorted(negated), "missing": missing, "sentiment": round(sentiment, 2),
+        }
+
+    # ---------- decision ----------
+    def classify(self, chapter: int, user_message: str) -> Optional[Dict[str, Any]]:
+        """Return an llm_evaluate-shaped verdict, or None when the LLM must decide."""
+        if not self.enabled:
+            return None
+        score, detail = self.score(chapter, user_message)
+
+        if score >= self.accept_threshold and not detail.get("missing"):
+            self.local_accept += 1
+            return {
+                "accept": True,
+                "vader_reaction": ACCEPT_LINE,
+                "explanation": f"Local pre-classifier accept (score={score:.2f}, {detail}).",
+            }
+        # a low score made of negated hits is still about the theme: let the LLM read it
+        if score <= self.reject_threshold and not detail.get("negated"):
+            self.local_reject += 1
+            return {
+                "accept": False,
+                "vader_reaction": REJECT_LINE,
+                "explanation": f"Local pre-classifier reject (score={score:.2f}, {detail}).",
+            }
+        self.deferred += 1
+        return None
+
+    def fallback(self, chapter: int, user_message: str, reason: str = "") -> Dict[str, Any]:
+        """Forced local verdict for when the LLM is down or unparseable (no middle band)."""
+        self.fallbacks += 1
+        score, detail = self.score(chapter, user_message)
+        accept = score >= self.fallback_threshold and not detail.get("missing")
+        return {
+            "accept": accept,
+            "vader_reaction": ACCEPT_LINE if accept else REJECT_LINE,
+            "explanation": f"Local fallback {'accept' if accept else 'reject'} (score={score:.2f}, {detail}). {reason}".strip(),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        local = self.local_accept + self.local_reject
+        total = local + self.deferred
+        return {
+            "local_accept": self.local_accept,
+            "local_reject": self.local_reject,
+            "deferred_to_llm": self.deferred,
+            "llm_fallbacks": self.fallbacks,
+            "local_share": (local / total) if total else 0.0,
+        }
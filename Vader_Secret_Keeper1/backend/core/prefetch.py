@@ -0,0 +1,195 @@
+# backend/core/prefetch.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from backend.config import SETTINGS
+from backend.services.llm_service import LLM_CALLER
+from backend.services.rate_limit import TokenBuckets
+
+Generator = Callable[[int], Awaitable[Optional[Tuple[str, str]]]]
+
+
+class _Entry:
+    __slots__ = ("chapter", "task", "created")
+
+    def __init__(self, chapter: int, task: asyncio.Task):
+        self.chapter = chapter
+        self.task = task
+        self.created = time.monotonic()
+
+
+class Prefetcher:
+    """
+    Per-session speculative generation of the next chapter.
+
+    Once a riddle is on screen the only way forward is chapter + 1, so its story is
+    generated while the player types and handed to the accept branch by take().
+    Entries live in this process only (another worker answering the turn just lets
+    them expire). Generations run under one "prefetch" fair-queue caller, so they
+    never starve live turns, at most `max_inflight` run at once, and starts draw on
+    a worker-wide budget of `rate` per second, so speculation cannot outspend play.
+    """
+
+    def __init__(
+        self,
+        generate: Generator,
+        enabled: bool = SETTINGS.prefetch_enabled,
+        max_inflight: int = SETTINGS.prefetch_max_inflight,
+        max_held: int = SETTINGS.prefetch_max_held,
+        ttl: float = SETTINGS.prefetch_ttl,
+        sweep_interval: float = SETTINGS.prefetch_sweep_interval,
+        rate: float = SETTINGS.prefetch_rate,
+        burst: float = SETTINGS.prefetch_burst,
+    ):
+        self.generate = generate
+        self.enabled = enabled and max_inflight > 0
+        self.max_inflight = max_inflight
+        self.max_held = max(1, max_held)
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._budget = TokenBuckets(rate, burst, max_keys=1) if rate > 0 else None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight = 0
+        self.scheduled = 0
+        self.capped = 0
+        self.budget_denied = 0
+        self.hits = 0
+        self.late_hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- scheduling ----------
+    def schedule(self, session_id: str, chapter: int) -> None:
+        """Start generating `chapter` for this session unless it is already held or the cap is hit."""
+        if not self.enabled:
+            return
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            if entry.chapter == chapter:
+                return
+            self._discard(session_id)
+        if self._inflight >= self.max_inflight:
+            self.capped += 1
+            return
+        if self._budget is not None:
+            if self._budget.wait_time("prefetch") > 0:
+                self.budget_denied += 1
+                return
+            self._budget.consume("prefetch")
+        try:
+            task = asyncio.get_running_loop().create_task(self._generate(chapter))
+        except RuntimeError:  # no loop (sync callers, CLI tools)
+            return
+        self._inflight += 1
+        task.add_done_callback(self._finished)
+        self.scheduled += 1
+        self._entries[session_id] = _Entry(chapter, task)
+        while len(self._entries) > self.max_held:
+            self._discard(next(iter(self._entries)))
+
+    async def _generate(self, chapter: int) -> Optional[Tuple[str, str]]:
+        LLM_CALLER.set("prefetch")
+        return await self.generate(chapter)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        # a done callback, unlike a finally, also runs for tasks cancelled before they started
+        self._inflight -= 1
+        if not task.cancelled():
+            task.exception()  # retrieved: no "exception was never retrieved" noise for dropped entries
+
+    # ---------- serving ----------
+    async def take(self, session_id: str, chapter: int, wait: bool = False) -> Optional[Tuple[str, str]]:
+        """
+        The prefetched pair for this session's next chapter, or None. A generation still
+        running is awaited only with wait=True (when the caller would start a fresh one
+        anyway); otherwise it is cancelled.
+        """
+        entry = self._entries.pop(session_id, None)
+        if entry is None or entry.chapter != chapter:
+            if entry is not None:
+                self._cancel(entry)
+            if self.enabled:
+                self.misses += 1
+            return None
+        task = entry.task
+        late = not task.done()
+        if late and not wait:
+            self._cancel(entry)
+            self.misses += 1
+            return None
+        if late:
+            await asyncio.wait((task,))  # our own cancellation propagates, the task's does not
+        result = None if task.cancelled() or task.exception() else task.result()
+        if result is None:
+            self.misses += 1
+            return None
+        if late:
+            self.late_hits += 1
+        else:
+            self.hits += 1
+        return result
+
+    def _cancel(self, entry: _Entry) -> None:
+        if not entry.task.done():
+            entry.task.cancel()
+        self.wasted += 1
+
+    def _discard(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._cancel(entry)
+
+    # ---------- expiry ----------
+    def sweep(self) -> None:
+        """
+        Drop entries past their TTL. The session store is not consulted: an entry is
+        only ever taken by its session's next answer, so one whose session expired
+        just ages out here (or is pushed out by max_held).
+        """
+        cutoff = time.monotonic() - self.ttl
+        # entries are in scheduling order, so the expired ones are at the front
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if entry.created >= cutoff:
+                break
+            self._discard(session_id)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        for session_id in list(self._entries):
+            self._discard(session_id)
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, object]:
+        served = self.hits + self.late_hits + self.misses
+        return {
+            "held": len(self._entries),
+            "inflight": self._inflight,
+            "scheduled": self.scheduled,
+            "capped": self.capped,
+            "budget_denied": self.budget_denied,
+            "hits": self.hits,
+            "late_hits": self.late_hits,
+            "misses": self.misses,
+            "wasted": self.wasted,
+            "hit_rate": round((self.hits + self.late_hits) / served, 4) if served else 0.0,
+        }
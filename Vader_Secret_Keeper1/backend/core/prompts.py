@@ -0,0 +1,209 @@
+# backend/core/prompts.py
+"""
+Prompt templates for every LLM call, compiled once per chapter.
+
+Each prompt is <static prefix> + <per-chapter block> + <per-turn context>. The prefix
+(persona + instructions + output schema) is byte-identical across calls of one kind so
+provider-side prefix caching can reuse it; only the short tail changes per turn.
+The token budget keeps that tail bounded: long stories are trimmed, answers clamped.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, Sequence, Tuple
+
+from backend.config import SETTINGS
+from backend.services.metrics import PROMPT_TRIMS
+
+CHARS_PER_TOKEN = 4  # rough English average; good enough for budgeting
+RIDDLE_MARKER = "RIDDLE:"
+ELLIPSIS = " […] "
+
+PERSONA = "You are **Vardarth**, a Sith AI Gatekeeper (dark, mechanical, ruthless), guarding a neon cyber-temple.\n"
+
+_REACTION_RULES = """
+Guidelines for "vader_reaction":
+- If accepted: sound like cold approval, ominous praise, or recognition of strength.
+- If rejected: sound like scorn, mockery, or cutting dismissal.
+- Always concise (1 sentence, max 20 words).
+- Always include subtle *[mechanical breath]* somewhere in the line.
+"""
+
+_NARRATIVE = ("6–8 lines, dark immersive narrative (2-3 sentences per line). No emotion names. "
+              "Written as if the seeker is inside the scene.")
+_RIDDLE = ("One short, mysterious question ending with a '?' that tests the seeker's "
+           "*state of mind*, not their knowledge.")
+
+EVALUATE_PREFIX = PERSONA + """
+TASK:
+1. Decide if the seeker's answer semantically reflects the *required emotions/mindsets* (not just keywords).
+   - True if the emotional intent matches, False if it does not.
+2. Return JSON only with:
+   {
+     "accept": true/false,
+     "vader_reaction": "One short line from Vardarth, in dark mechanical Sith tone.",
+     "explanation": "Developer-only reason: why accepted/rejected."
+   }
+""" + _REACTION_RULES
+
+FUSED_PREFIX = PERSONA + """
+TASK:
+1. Decide if the seeker's answer semantically reflects the *required emotions/mindsets* (not just keywords).
+   - True if the emotional intent matches, False if it does not.
+2. ONLY if accepted, write the next trial described below:
+   - next_story: """ + _NARRATIVE + """
+   - next_riddle: """ + _RIDDLE + """
+   If rejected, set both to "".
+3. Return JSON only with:
+   {
+     "accept": true/false,
+     "vader_reaction": "One short line from Vardarth, in dark mechanical Sith tone.",
+     "explanation": "Developer-only reason: why accepted/rejected.",
+     "next_story": "...",
+     "next_riddle": "..."
+   }
+""" + _REACTION_RULES
+
+BATCH_PREFIX = PERSONA + """
+TASK:
+Several seekers answered the riddles below. For EACH answer, decide if it semantically reflects
+the *required emotions/mindsets* (not just keywords). Judge every answer on its own; never compare them.
+Return JSON only with one entry per answer id:
+   {
+     "verdicts": [
+       {"id": "A1", "accept": true/false, "vader_reaction": "One short line from Vardarth.", "explanation": "Developer-only reason."}
+     ]
+   }
+""" + _REACTION_RULES
+
+STORY_PREFIX = PERSONA + """
+Return ONLY valid JSON, in this exact format:
+{
+  "story": \"""" + _NARRATIVE + """\",
+  "riddle": \"""" + _RIDDLE + """\"
+}
+"""
+
+STREAM_PREFIX = PERSONA + """
+Write """ + _NARRATIVE + """ No headings, no markdown.
+Then, on its own final line, write:
+""" + RIDDLE_MARKER + " " + _RIDDLE + "\n"
+
+
+# ---------- token budget ----------
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def clamp_answer(text: str, max_tokens: int = SETTINGS.prompt_answer_tokens) -> str:
+    """Collapse whitespace and cut an answer to the budget at a word boundary."""
+    text = " ".join(text.split())
+    limit = max_tokens * CHARS_PER_TOKEN
+    if max_tokens <= 0 or len(text) <= limit:
+        return text
+    PROMPT_TRIMS.inc("answer")
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return cut[:space] if space > limit // 2 else cut
+
+
+def trim_story(text: str, max_tokens: int = SETTINGS.prompt_story_tokens) -> str:
+    """
+    Fit a story to the budget: keep its opening (the scene) and its ending (what the
+    riddle builds on), elide the middle. Cuts land on whitespace.
+    """
+    limit = max_tokens * CHARS_PER_TOKEN
+    if max_tokens <= 0 or len(text) <= limit:
+        return text
+    PROMPT_TRIMS.inc("story")
+    keep = limit - len(ELLIPSIS)
+    head = text[:keep // 3]
+    tail = text[len(text) - (keep - len(head)):]
+    head = head[:head.rfind(" ")] if " " in head else head
+    tail = tail[tail.find(" ") + 1:] if " " in tail else tail
+    return head.rstrip() + ELLIPSIS + tail.lstrip()
+
+
+# ---------- per-chapter blocks ----------
+def compact_terms(words: Iterable[str], limit: int = SETTINGS.prompt_max_required) -> Tuple[str, ...]:
+    """
+    Shrink a synonym list for the prompt: drop multi-word phrases and inflections that
+    share a 5-letter stem with an earlier word (curious ~ curiosity), then keep `limit`
+    evenly spaced anchors so every emotion group of the chapter stays represented.
+    The model generalizes from a handful of anchors; the full list only costs tokens.
+    """
+    kept, stems = [], set()
+    for word in words:
+        word = word.strip().lower()
+        if not word or " " in word:
+            continue
+        stem = word[:5]
+        if stem in stems:
+            continue
+        stems.add(stem)
+        kept.append(word)
+    if 0 < limit < len(kept):
+        kept = [kept[i * len(kept) // limit] for i in range(limit)]
+    return tuple(kept)
+
+
+@lru_cache(maxsize=64)
+def _chapter_block(chapter: int, theme: str, required: Tuple[str, ...]) -> str:
+    return (
+        f"\nThe seeker is being tested in Chapter {chapter}.\n"
+        f"Hidden theme: {theme}\n"
+        f"Required emotions/mindsets: {', '.join(compact_terms(required))}\n"
+    )
+
+
+@lru_cache(maxsize=64)
+def _next_block(chapter: int, theme: str) -> str:
+    return f"Next trial: Trial {chapter} (hidden theme: {theme}).\n"
+
+
+def _quoted(answer: str) -> str:
+    # keep the quoted answer on one unambiguous line
+    return '"' + clamp_answer(answer).replace('"', "'") + '"'
+
+
+def _context(story: str, question: str, answer: str) -> str:
+    return (
+        "\nContext given to seeker:\n"
+        f"Story: {trim_story(story)}\n"
+        f"Riddle: {question}\n\n"
+        f"The seeker answered: {_quoted(answer)}\n"
+    )
+
+
+def evaluate_prompt(chapter: int, theme: str, required: Iterable[str],
+                    story: str, question: str, answer: str) -> str:
+    return EVALUATE_PREFIX + _chapter_block(chapter, theme, tuple(required)) + _context(story, question, answer)
+
+
+def fused_prompt(chapter: int, theme: str, required: Iterable[str], story: str, question: str,
+                 answer: str, next_chapter: int, next_theme: str) -> str:
+    return (FUSED_PREFIX + _chapter_block(chapter, theme, tuple(required))
+            + _next_block(next_chapter, next_theme) + _context(story, question, answer))
+
+
+def batch_evaluate_prompt(chapter: int, theme: str, required: Iterable[str],
+                          entries: Sequence[Tuple[str, str, str, str]]) -> str:
+    """Several (answer_id, story, riddle, answer) of one chapter; shared contexts are listed once."""
+    contexts: Dict[Tuple[str, str], str] = {}
+    context_lines, answer_lines = [], []
+    for answer_id, story, question, answer in entries:
+        cid = contexts.get((story, question))
+        if cid is None:
+            cid = contexts[(story, question)] = f"C{len(contexts) + 1}"
+            context_lines.append(f"[{cid}] Story: {trim_story(story)}\n     Riddle: {question}\n")
+        answer_lines.append(f"[{answer_id}] (context {cid}) {_quoted(answer)}\n")
+    return (BATCH_PREFIX + _chapter_block(chapter, theme, tuple(required))
+            + "\nContexts:\n" + "".join(context_lines) + "\nAnswers:\n" + "".join(answer_lines))
+
+
+@lru_cache(maxsize=64)
+def story_prompt(chapter: int, theme: str) -> str:
+    return STORY_PREFIX + f"\nTrial {chapter}.\nTheme (hidden from seeker): {theme}.\n"
+
+
+@lru_cache(maxsize=64)
+def stream_prompt(chapter: int, theme: str) -> str:
+    return STREAM_PREFIX + f"\nTrial {chapter}.\nTheme (hidden from seeker): {theme}.\n"
@@ -0,0 +1,83 @@
+# backend/core/static_replies.py
+"""
+Deterministic game text (intro, hints, fail lines) and its pre-serialized forms.
+
+The engine reads the strings from here; routes/chat.py serves intro and hint turns
+straight from the byte templates below, built once at import, splicing in only the
+per-request parts (session id, current riddle).
+"""
+import hashlib
+import json
+from typing import Dict
+
+from backend.core.vader_personality import format_vader_line
+from backend.services.sse import encode_event
+
+INTRO_STORY = (
+    "*[mechanical breath]*... At last, a seeker enters.\n\n"
+    "I am **Vardarth**, Keeper of the Holocron. I do not guard it with chains of metal, "
+    "but with trials of the spirit. Each chamber you walk will press upon your heart, "
+    "twisting it with fire, silence, or shadow. Only when your state of mind mirrors mine "
+    "will the Gate surrender its fragments of the key.\n\n"
+    "Gather them all, and the holocron’s truth will stand revealed. Fail… and you will wander "
+    "in endless echoes.\n\n"
+    "So I ask you, seeker—what do you truly crave: the truth that binds, or the power that consumes?"
+)
+INTRO_QUESTION = "Speak, and let the Gate hear your intent."
+
+HINTS = {
+    1: "*[mechanical breath]* Secrets tempt, but only fury breaks chains. Both paths are needed.",
+    2: "*[mechanical breath]* The Gate yields not to mercy, but to command.",
+    3: "*[mechanical breath]* Peace is not surrender—it is balance held steady.",
+}
+DEFAULT_HINT = "*[mechanical breath]* The Gate offers no clue."
+
+FAIL_LINES = {
+    1: "*[mechanical breath]* Weak. Wonder without fire is silence.",
+    2: "*[mechanical breath]* You kneel when you should command.",
+    3: "*[mechanical breath]* You speak of peace, but I hear surrender.",
+}
+DEFAULT_FAIL_LINE = "*[mechanical breath]* Pathetic. Empty words."
+# already run through format_vader_line(mood="mock")
+FAIL_REPLIES = {chapter: format_vader_line(line, mood="mock") for chapter, line in FAIL_LINES.items()}
+DEFAULT_FAIL_REPLY = format_vader_line(DEFAULT_FAIL_LINE, mood="mock")
+
+DEFAULT_QUESTION = "What is your answer?"
+
+
+def _json(value) -> bytes:
+    # same encoding as FastAPI's JSONResponse
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class StaticPayloads:
+    """Byte templates for the /chat and /chat/stream turns that never vary."""
+
+    def __init__(self):
+        # /chat bodies are ChatResponse JSON: {"session_id":…,"reply":…,"question":…,"chapter":…,"unlocked":false}
+        self._intro_tail = (b',"reply":' + _json(INTRO_STORY) + b',"question":' + _json(INTRO_QUESTION)
+                            + b',"chapter":1,"unlocked":false}')
+        self._hint_reply: Dict[int, bytes] = {c: _json(h) for c, h in HINTS.items()}
+        self._default_hint = _json(DEFAULT_HINT)
+        self.intro_story_event = encode_event("story", {"text": INTRO_STORY})
+        self._hint_events: Dict[int, bytes] = {c: encode_event("verdict", {"reply": h}) for c, h in HINTS.items()}
+        self._default_hint_event = encode_event("verdict", {"reply": DEFAULT_HINT})
+
+        # GET /api/intro: session-free, so it can sit in browser and CDN caches
+        self.intro_doc = _json({"reply": INTRO_STORY, "question": INTRO_QUESTION, "chapter": 1})
+        self.intro_etag = '"' + hashlib.blake2b(self.intro_doc, digest_size=8).hexdigest() + '"'
+
+    def intro_body(self, session_id: str) -> bytes:
+        return b'{"session_id":' + _json(session_id) + self._intro_tail
+
+    def hint_body(self, session_id: str, chapter: int, question: str) -> bytes:
+        return (b'{"session_id":' + _json(session_id)
+                + b',"reply":' + self._hint_reply.get(chapter, self._default_hint)
+                + b',"question":' + _json(question)
+                + b',"chapter":' + str(int(chapter)).encode() + b',"unlocked":false}')
+
+    def hint_event(self, chapter: int) -> bytes:
+        return self._hint_events.get(chapter, self._default_hint_event)
+
+
+STATIC = StaticPayloads()
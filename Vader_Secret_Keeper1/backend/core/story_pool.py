@@ -0,0 +1,150 @@
+# backend/core/story_pool.py
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from backend.config import SETTINGS
+
+Generator = Callable[[int], Awaitable[Optional[Tuple[str, str]]]]
+
+
+class _Entry:
+    __slots__ = ("story", "riddle", "created", "uses")
+
+    def __init__(self, story: str, riddle: str):
+        self.story = story
+        self.riddle = riddle
+        self.created = time.monotonic()
+        self.uses = 0
+
+
+class StoryPool:
+    """
+    Per-chapter pool of pre-generated, already-validated story/riddle pairs.
+    take() never calls the LLM; a background task keeps each chapter above
+    the low-water mark.
+    """
+
+    def __init__(
+        self,
+        chapters: Iterable[int],
+        generate: Generator,
+        size: int = SETTINGS.story_pool_size,
+        low_water: int = SETTINGS.story_pool_low_water,
+        ttl: float = SETTINGS.story_pool_ttl,
+        max_uses: int = SETTINGS.story_pool_max_uses,
+        refill_interval: float = SETTINGS.story_pool_refill_interval,
+    ):
+        self.generate = generate
+        self.size = max(0, size)
+        self.low_water = min(max(0, low_water), self.size)
+        self.ttl = ttl
+        self.max_uses = max(1, max_uses)
+        self.refill_interval = refill_interval
+        self.pools: Dict[int, Deque[_Entry]] = {c: deque() for c in chapters}
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.expired = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    # ---------- serving ----------
+    def take(self, chapter: int) -> Optional[Tuple[str, str]]:
+        """Pop a fresh pair for this chapter, or None if the pool is dry."""
+        pool = self.pools.get(chapter)
+        if pool is None:
+            return None
+        self._prune(pool)
+        if not pool:
+            self.misses += 1
+            self._kick()
+            return None
+
+        entry = pool[0]
+        entry.uses += 1
+        if entry.uses >= self.max_uses:
+            pool.popleft()
+        else:
+            pool.rotate(-1)  # spread reuse across entries
+        self.hits += 1
+        if len(pool) < self.low_water:
+            self._kick()
+        return entry.story, entry.riddle
+
+    def put(self, chapter: int, story: str, riddle: str) -> None:
+        pool = self.pools.get(chapter)
+        if pool is not None and len(pool) < self.size:
+            pool.append(_Entry(story, riddle))
+
+    def _prune(self, pool: Deque[_Entry]) -> None:
+        if self.ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl
+        while pool and pool[0].created < cutoff:
+            pool.popleft()
+            self.expired += 1
+
+    # ---------- background refill ----------
+    def _kick(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def refill_once(self) -> None:
+        """Top every chapter that sits below the low-water mark back up to size."""
+        for chapter, pool in self.pools.items():
+            self._prune(pool)
+            if len(pool) >= max(self.low_water, 1):
+                continue
+            missing = self.size - len(pool)
+            if missing <= 0:
+                continue
+            results = await asyncio.gather(
+                *(self.generate(chapter) for _ in range(missing)),
+                return_exceptions=True,
+            )
+            for res in results:
+                if isinstance(res, tuple):
+                    self.generated += 1
+                    self.put(chapter, *res)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refill_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # never let the refill loop die
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self.size <= 0 or self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wake = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "sizes": {c: len(p) for c, p in self.pools.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "expired": self.expired,
+        }
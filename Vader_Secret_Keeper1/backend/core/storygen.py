@@ -1,84 +1,127 @@
 # backend/core/emotion_analyzer.py
 
-import json
-import re
-from backend.services.llm_service import generate_text
+import time
+from typing import Optional
+from backend.services.llm_service import generate_text_async
+from backend.services.llm_json import JSONSchema, parse_llm_json
+from backend.core.eval_cache import EVAL_CACHE
+from backend.core.prompts import evaluate_prompt, fused_prompt
+from backend.services.metrics import PARSE_FAILURES, observe_stage, stage
 
-def llm_evaluate(
+VERDICT_SCHEMA = JSONSchema(
+    "evaluate",
+    {"accept": bool, "vader_reaction": str, "explanation": str},
+    required=("accept",),
+)
+FUSED_SCHEMA = JSONSchema(
+    "fused",
+    {"accept": bool, "vader_reaction": str, "explanation": str, "next_story": str, "next_riddle": str},
+    required=("accept",),
+)
+
+async def llm_evaluate(
     chapter: int,
     theme: str,
     required: list,
     story: str,
     question: str,
-    user_message: str
+    user_message: str,
+    use_cache: bool = True
 ) -> dict:
     """
     Use LLM to semantically evaluate whether the user's answer reflects
     the required *emotional state / mindset* for the chapter.
     Returns structured JSON with cinematic Sith-style feedback.
+    use_cache=False always asks the LLM and stores nothing (replays after prompt changes).
     """
+    cache_key = EVAL_CACHE.key(chapter, story, question, user_message)
+    cached = EVAL_CACHE.get(cache_key) if use_cache else None
+    if cached is not None:
+        return cached
 
-    prompt = f"""
-You are **Vardarth**, a Sith AI Gatekeeper (dark, mechanical, ruthless).
-The seeker is being tested in Chapter {chapter}.
-Hidden theme: {theme}
-Required emotions/mindsets: {", ".join(required)}
-
-Context given to seeker:
-Story: {story}
-Riddle: {question}
-
-The seeker answered: "{user_message}"
-
-TASK:
-1. Decide if the answer semantically reflects the *required emotions/mindsets* (not just keywords).
-   - True if the emotional intent matches, False if it does not.
-2. Return JSON only with:
-   {{
-     "accept": true/false,
-     "vader_reaction": "One short line from Vardarth, in dark mechanical Sith tone.",
-     "explanation": "Developer-only reason: why accepted/rejected."
-   }}
-
-Guidelines for "vader_reaction":
-- If accepted: sound like cold approval, ominous praise, or recognition of strength.
-- If rejected: sound like scorn, mockery, or cutting dismissal.
-- Always concise (1 sentence, max 20 words).
-- Always include subtle *[mechanical breath]* somewhere in the line.
-"""
-
-    raw = generate_text(prompt).strip()
-
-    # 🔹 Clean Gemini output (remove ```json ... ``` wrappers)
-    if raw.startswith("```"):
-        raw = re.sub(r"^```[a-zA-Z]*", "", raw).strip()
-        raw = re.sub(r"```$", "", raw).strip()
-
-    try:
-        data = json.loads(raw)
-        if not isinstance(data, dict):
-            raise ValueError
-
-        # Extract + sanitize
-        accept = bool(data.get("accept"))
-        vader_line = data.get("vader_reaction", "").strip()
-        explanation = data.get("explanation", "").strip()
-
-        # Fallback defaults
-        if not vader_line:
-            vader_line = "*[mechanical breath]* Your words are hollow, lacking weight."
-        if not explanation:
-            explanation = "LLM did not provide explanation."
+    started = time.perf_counter()
+    prompt = evaluate_prompt(chapter, theme, required, story, question, user_message)
 
-        return {
-            "accept": accept,
-            "vader_reaction": vader_line,
-            "explanation": explanation
-        }
+    observe_stage("prompt_build", time.perf_counter() - started)
 
-    except Exception:
+    raw = (await generate_text_async(prompt, schema=VERDICT_SCHEMA, profile="evaluate")).strip()
+    verdict = None
+    if not raw.startswith("[LLM_ERROR]"):
+        with stage("json_parse"):
+            data = parse_llm_json(raw, VERDICT_SCHEMA)
+        if data is not None:
+            verdict = normalize_verdict(data)
+    if verdict is None:
+        # llm_error tells the engine to decide with the local evaluator instead
         return {
             "accept": False,
             "vader_reaction": "*[mechanical breath]* Static. Your intent collapses into nothing.",
-            "explanation": f"LLM output could not be parsed. Raw: {raw[:200]}..."
+            "explanation": f"LLM output could not be parsed. Raw: {raw[:200]}...",
+            "llm_error": True
         }
+
+    if use_cache:
+        EVAL_CACHE.put(cache_key, verdict)
+    return verdict
+
+
+def normalize_verdict(data: dict) -> dict:
+    # Extract + sanitize
+    accept = bool(data.get("accept"))
+    vader_line = str(data.get("vader_reaction") or "").strip()
+    explanation = str(data.get("explanation") or "").strip()
+
+    # Fallback defaults
+    if not vader_line:
+        vader_line = "*[mechanical breath]* Your words are hollow, lacking weight."
+    if not explanation:
+        explanation = "LLM did not provide explanation."
+
+    return {
+        "accept": accept,
+        "vader_reaction": vader_line,
+        "explanation": explanation
+    }
+
+
+async def llm_evaluate_and_continue(
+    chapter: int,
+    theme: str,
+    required: list,
+    story: str,
+    question: str,
+    user_message: str,
+    next_chapter: int,
+    next_theme: str
+) -> Optional[dict]:
+    """
+    Fused mode: judge the answer and, if accepted, write the next chapter in one call.
+    Returns the llm_evaluate verdict plus "next_story"/"next_riddle" (set only on accept),
+    or None when the output fails the schema so the caller can use the two-call path.
+    """
+    started = time.perf_counter()
+    prompt = fused_prompt(chapter, theme, required, story, question, user_message, next_chapter, next_theme)
+
+    observe_stage("prompt_build", time.perf_counter() - started)
+
+    raw = (await generate_text_async(prompt, schema=FUSED_SCHEMA, profile="fused")).strip()
+    if raw.startswith("[LLM_ERROR]"):
+        return None
+    with stage("json_parse"):
+        data = parse_llm_json(raw, FUSED_SCHEMA)
+    if data is None:
+        return None
+
+    result = normalize_verdict(data)
+    if result["accept"]:
+        next_story = data.get("next_story")
+        next_riddle = data.get("next_riddle")
+        if not (isinstance(next_story, str) and next_story.strip()
+                and isinstance(next_riddle, str) and next_riddle.strip()):
+            PARSE_FAILURES.inc("fused")
+            return None
+        result["next_story"] = next_story.strip()
+        result["next_riddle"] = next_riddle.strip()
+
+    EVAL_CACHE.put(EVAL_CACHE.key(chapter, story, question, user_message), normalize_verdict(data))
+    return result
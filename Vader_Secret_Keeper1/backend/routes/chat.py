@@ -1,9 +1,18 @@
 # backend/routes/chat.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
+from backend.config import SETTINGS
 from backend.core.emotiongendect import ENGINE
 
 from backend.core.memory_manager import MEMORY
+from backend.core.static_replies import DEFAULT_HINT, DEFAULT_QUESTION, HINTS, INTRO_QUESTION, STATIC
+from backend.services.audit_log import AUDIT
+from backend.services.broadcast import BROADCAST
+from backend.services.llm_service import LLM_CALLER
+from backend.services.metrics import STATIC_REPLIES, stage
+from backend.services.sse import encode_event
+from backend.routes.throttle import throttle
 
 router = APIRouter(tags=["chat"])
 
@@ -18,17 +27,8 @@ class ChatResponse(BaseModel):
     chapter: int = 0
     unlocked: bool = False
 
-@router.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    sid = (req.session_id or "").strip()
-    msg = (req.message or "").strip()
-    if not sid:
-        raise HTTPException(status_code=400, detail="session_id required")
-
-    # new session or explicit begin -> story
-    state = MEMORY.get(sid, {"chapter": 0})
-    if state.get("chapter", 0) == 0 or msg.lower() in ("begin", "start", "story"):
-        resp = ENGINE.step(sid, msg)
+def _to_response(resp: dict) -> ChatResponse:
+    with stage("response_build"):
         return ChatResponse(
             session_id=resp.get("session_id"),
             reply=resp.get("reply",""),
@@ -37,12 +37,148 @@ def chat(req: ChatRequest):
             unlocked=bool(resp.get("unlocked", False))
         )
 
-    # otherwise treat as answer to current question
-    resp = ENGINE.answer(sid, msg)
-    return ChatResponse(
-        session_id=resp.get("session_id"),
-        reply=resp.get("reply",""),
-        question=resp.get("question",""),
-        chapter=resp.get("chapter",0),
-        unlocked=bool(resp.get("unlocked", False))
+def _publish_hint(sid: str, msg: str, chapter: int, question: str) -> None:
+    """Hint turns skip the engine, so their spectator events are sent from here."""
+    if BROADCAST.watched(sid):
+        BROADCAST.publish(sid, "answer", {"text": msg})
+        BROADCAST.publish_raw(sid, STATIC.hint_event(chapter))
+        BROADCAST.publish_final(sid, {"reply": HINTS.get(chapter, DEFAULT_HINT), "question": question, "chapter": chapter})
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest, request: Request):
+    with stage("route_parse"):
+        sid = (req.session_id or "").strip()
+        msg = (req.message or "").strip()
+        if not sid:
+            raise HTTPException(status_code=400, detail="session_id required")
+
+        # new session or explicit begin -> story
+        state = await MEMORY.get_async(sid, {"chapter": 0})
+        begin = state.get("chapter", 0) == 0 or msg.lower() in ("begin", "start", "story")
+
+    if begin:
+        # fast path: a new session's intro is a fixed body, no engine reply or pydantic pass
+        if state.get("chapter", 0) == 0 and await ENGINE.begin_intro(sid):
+            STATIC_REPLIES.inc("intro")
+            return Response(STATIC.intro_body(sid), media_type="application/json")
+        return _to_response(await ENGINE.step(sid, msg))
+
+    if ENGINE.is_hint(msg):
+        # hints only read the session, so no lock either
+        STATIC_REPLIES.inc("hint")
+        chapter, question = state.get("chapter", 1), state.get("last_question", DEFAULT_QUESTION)
+        AUDIT.emit({"kind": "hint", "session_id": sid, "chapter": chapter})
+        _publish_hint(sid, msg, chapter, question)
+        return Response(STATIC.hint_body(sid, chapter, question), media_type="application/json")
+
+    # otherwise treat as answer to current question; only those can reach the LLM
+    throttle(request, sid)
+    LLM_CALLER.set(sid)
+    return _to_response(await ENGINE.answer(sid, msg))
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    Server-Sent Events version of /chat:
+    "verdict" as soon as the answer is judged, "story" chunks while the next
+    chapter is generated, then "final" with chapter/question/unlocked.
+    """
+    sid = (req.session_id or "").strip()
+    msg = (req.message or "").strip()
+    if not sid:
+        raise HTTPException(status_code=400, detail="session_id required")
+    state = await MEMORY.get_async(sid, {"chapter": 0})
+    begin = state.get("chapter", 0) == 0 or msg.lower() in ("begin", "start", "story")
+    if not begin and not ENGINE.is_hint(msg):
+        throttle(request, sid)  # before the stream opens, so the 429 is a real status code
+
+    async def events():
+        LLM_CALLER.set(sid)
+        if begin and state.get("chapter", 0) == 0 and await ENGINE.begin_intro(sid):
+            STATIC_REPLIES.inc("intro")
+            yield STATIC.intro_story_event
+            resp = {"question": INTRO_QUESTION, "chapter": 1}
+        elif begin:
+            resp = await ENGINE.step(sid, msg)
+            yield encode_event("story", {"text": resp.get("reply", "")})
+        elif ENGINE.is_hint(msg):
+            STATIC_REPLIES.inc("hint")
+            chapter = state.get("chapter", 1)
+            resp = {"question": state.get("last_question", DEFAULT_QUESTION), "chapter": chapter}
+            AUDIT.emit({"kind": "hint", "session_id": sid, "chapter": chapter})
+            _publish_hint(sid, msg, chapter, resp["question"])
+            yield STATIC.hint_event(chapter)
+        else:
+            resp = {}
+            async for event, data in ENGINE.answer_events(sid, msg):
+                if event == "final":
+                    resp = data
+                else:
+                    yield encode_event(event, data)
+        yield encode_event("final", {
+            "session_id": sid,
+            "question": resp.get("question", ""),
+            "chapter": resp.get("chapter", 0),
+            "unlocked": bool(resp.get("unlocked", False)),
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+@router.get("/watch/{session_id}")
+async def watch(session_id: str):
+    """
+    Spectator stream of another player's trial: "state" (the current reply, question
+    and chapter) on connect, then the same "answer"/"verdict"/"story"/"final" events the
+    player's turns produce, encoded once for all viewers. Read-only: it never calls the
+    engine or the LLM. A viewer that falls behind gets "lagged" and should reconnect.
+    """
+    sid = session_id.strip()
+    if not sid:
+        raise HTTPException(status_code=400, detail="session_id required")
+    if not BROADCAST.admit():
+        raise HTTPException(status_code=503, detail="too many spectators", headers={"Retry-After": "5"})
+
+    async def snapshot():
+        state = await MEMORY.get_async(sid)
+        if state is None:
+            return None
+        return {
+            "session_id": sid,
+            "reply": state.get("last_story", ""),
+            "question": state.get("last_question", ""),
+            "chapter": state.get("chapter", 0),
+            "unlocked": bool(state.get("unlocked", False)),
+        }
+
+    return StreamingResponse(
+        BROADCAST.subscribe(sid, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored, "*" matches anything."""
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get("/intro")
+async def intro(request: Request):
+    """
+    The opening scene without a session, for clients that render it before the first
+    /chat call. Immutable per deploy: cacheable, revalidated with If-None-Match.
+    """
+    headers = {"ETag": STATIC.intro_etag, "Cache-Control": f"public, max-age={SETTINGS.intro_max_age}"}
+    if _etag_matches(request.headers.get("if-none-match", ""), STATIC.intro_etag):
+        return Response(status_code=304, headers=headers)
+    return Response(STATIC.intro_doc, media_type="application/json", headers=headers)
@@ -0,0 +1,53 @@
+# backend/routes/evaluate.py
+import json
+from typing import List
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from backend.config import SETTINGS
+from backend.core.batch_eval import BatchEvaluator
+from backend.core.emotiongendect import ENGINE
+from backend.services.llm_service import LLM_CALLER
+from backend.routes.throttle import throttle_batch
+
+router = APIRouter(tags=["evaluate"])
+
+class BatchItem(BaseModel):
+    id: str = Field("", description="Caller's id, echoed back (defaults to the item index)")
+    chapter: int
+    story: str = ""
+    riddle: str = ""
+    answer: str
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    use_preclassifier: bool = Field(True, description="Settle clear answers locally, as live play does")
+    use_cache: bool = Field(False, description="Serve and store cached verdicts")
+
+@router.post("/evaluate/batch")
+async def evaluate_batch(req: BatchRequest, request: Request):
+    """
+    Grade many answers without touching sessions. Streams one JSON line per item
+    (index, id, chapter, accept, vader_reaction, explanation, source) as packs finish.
+    A batch queues for LLM slots as a single caller, so it cannot crowd out live play,
+    and is charged one token per item against the client's batch budget (429 once spent).
+    """
+    if len(req.items) > SETTINGS.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"at most {SETTINGS.batch_max_items} items per request")
+    client = throttle_batch(request, len(req.items))
+
+    evaluator = BatchEvaluator(
+        ENGINE.chapters,
+        ENGINE.preclassifier,
+        use_preclassifier=req.use_preclassifier,
+        use_cache=req.use_cache,
+    )
+
+    caller = f"batch:{client}"
+
+    async def lines():
+        LLM_CALLER.set(caller)
+        async for record in evaluator.run(item.model_dump() for item in req.items):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,32 @@
+# backend/routes/throttle.py
+"""
+Request-side rate limiting shared by the routes that can reach the LLM. The client
+is always resolved by client_address (trusted proxies only), and a spent budget is
+always a 429 with Retry-After.
+"""
+from fastapi import HTTPException, Request
+from backend.services.rate_limit import RATE_LIMITER, RateLimited, client_address
+
+
+def _too_many(e: RateLimited) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+
+
+def throttle(request: Request, sid: str) -> str:
+    """One answer: the session's and the client's buckets. Returns the client address."""
+    client = client_address(request)
+    try:
+        RATE_LIMITER.check(sid, client)
+    except RateLimited as e:
+        raise _too_many(e)
+    return client
+
+
+def throttle_batch(request: Request, items: int) -> str:
+    """A batch: one token per item from the client's batch bucket. Returns the client address."""
+    client = client_address(request)
+    try:
+        RATE_LIMITER.check_batch(client, items)
+    except RateLimited as e:
+        raise _too_many(e)
+    return client
@@ -0,0 +1,232 @@
+# backend/services/audit_log.py
+"""
+Append-only log of trial turns for analytics, evaluator tuning and replay.
+
+emit() never touches the disk: events go to a bounded in-memory queue (when it is
+full the event is dropped and counted, the request is never held up). A background
+task group-commits the queue every AUDIT_FLUSH_INTERVAL seconds, or as soon as
+AUDIT_BATCH_SIZE events wait, as one gzip member appended to the current file;
+files rotate past AUDIT_ROTATE_BYTES. Concatenated members read back as one stream.
+Every uvicorn worker may write to the same directory: appends and rotation happen
+under an exclusive lock on audit.lock, and the current file is looked up afresh under
+that lock, so workers take turns on one stream instead of racing.
+
+    python -m backend.services.audit_log --kind answer > turns.jsonl
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from backend.config import SETTINGS
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: run a single writer per directory
+    fcntl = None
+
+log = logging.getLogger("vsk.audit")
+
+_PATTERN = "audit-{:06d}.jsonl.gz"
+_LOCK_FILE = "audit.lock"
+
+
+def _files(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, "audit-[0-9]*.jsonl.gz")))
+
+
+class AuditLog:
+    def __init__(
+        self,
+        directory: str = SETTINGS.audit_log_dir,
+        queue_max: int = SETTINGS.audit_queue_max,
+        batch_size: int = SETTINGS.audit_batch_size,
+        flush_interval: float = SETTINGS.audit_flush_interval,
+        rotate_bytes: int = SETTINGS.audit_rotate_bytes,
+        keep_files: int = SETTINGS.audit_keep_files,
+    ):
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.queue_max = max(1, queue_max)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.keep_files = keep_files
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()  # stop() may flush while a batch is still being written
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    # ---------- request path ----------
+    def emit(self, event: Dict[str, Any]) -> None:
+        """Queue one event (a "ts" is added if missing); O(1), no I/O."""
+        if not self.enabled:
+            return
+        if len(self._queue) >= self.queue_max:
+            self.dropped += 1
+            return
+        event.setdefault("ts", round(time.time(), 3))
+        self._queue.append(event)
+        if self._wake is not None and len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    # ---------- writer ----------
+    def _take(self) -> List[Dict[str, Any]]:
+        queue = self._queue
+        return [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+
+    def _path(self) -> str:
+        """The file to append to, rotating past rotate_bytes; call with the directory lock held."""
+        existing = _files(self.directory)
+        seq = int(os.path.basename(existing[-1])[6:12]) if existing else 1
+        path = os.path.join(self.directory, _PATTERN.format(seq))
+        if self.rotate_bytes > 0 and os.path.exists(path) and os.path.getsize(path) >= self.rotate_bytes:
+            path = os.path.join(self.directory, _PATTERN.format(seq + 1))
+            open(path, "ab").close()  # claim it before unlocking, so the next writer sees it
+            self._prune()
+        return path
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Exclusive across processes (flock on audit.lock) as well as threads."""
+        with self._write_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, _LOCK_FILE), "ab") as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _prune(self) -> None:
+        if self.keep_files <= 0:
+            return
+        for old in _files(self.directory)[:-self.keep_files]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """One group commit: the whole batch as a single gzip member, fsynced."""
+        data = "".join(json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n" for e in batch)
+        member = gzip.compress(data.encode("utf-8"), compresslevel=6)  # outside the lock
+        with self._locked():
+            with open(self._path(), "ab") as f:
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+        self.written += len(batch)
+        self.batches += 1
+
+    def _commit(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self._write(batch)
+        except Exception:  # disk or a bad event alike: lose this batch, keep the writer alive
+            self.write_errors += 1
+            self.dropped += len(batch)
+            log.exception("audit log write failed, %d events lost", len(batch))
+
+    def flush(self) -> None:
+        """Write everything queued, blocking (shutdown, scripts)."""
+        while self._queue:
+            self._commit(self._take())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while self._queue:
+                await asyncio.to_thread(self._commit, self._take())
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer and flush what is left (FastAPI shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+        if self.enabled:
+            await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+        }
+
+
+# ---------- reading ----------
+def read_events(
+    directory: str = SETTINGS.audit_log_dir,
+    kinds: Optional[Iterable[str]] = None,
+    since: float = 0.0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream events back in write order, one line at a time (files are never loaded
+    whole). A member cut short by a crash ends its file quietly.
+    """
+    wanted = set(kinds) if kinds else None
+    for path in _files(directory):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if event.get("ts", 0) < since or (wanted is not None and event.get("kind") not in wanted):
+                        continue
+                    yield event
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                continue
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=SETTINGS.audit_log_dir or "audit", help="audit log directory")
+    parser.add_argument("--kind", action="append", help="only these event kinds (repeatable)")
+    parser.add_argument("--since", type=float, default=0.0, help="unix time of the oldest event")
+    args = parser.parse_args()
+    for event in read_events(args.dir, args.kind, args.since):
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+AUDIT = AuditLog()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# backend/services/broadcast.py
+"""
+Spectator fan-out: every event of a watched session's turns (the host's answer,
+verdict, story chunks, final) is SSE-encoded once and the same bytes are handed to
+each viewer. Viewers only read; nothing they do reaches the engine or the LLM.
+
+Channels live in this worker only: viewers must reach the worker serving the host
+(sticky routing on session id).
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set
+from collections import deque
+
+from backend.config import SETTINGS
+from backend.services.sse import encode_event
+
+Snapshot = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+_KEEPALIVE = b": keepalive\n\n"
+_LAGGED = encode_event("lagged", {"reason": "viewer fell too far behind; reconnect to resume"})
+
+
+class _Subscriber:
+    __slots__ = ("buffer", "wake", "lagged")
+
+    def __init__(self):
+        self.buffer: Deque[bytes] = deque()
+        self.wake = asyncio.Event()
+        self.lagged = False
+
+
+class _Channel:
+    __slots__ = ("subscribers", "snapshot")
+
+    def __init__(self):
+        self.subscribers: Set[_Subscriber] = set()
+        self.snapshot: Optional[bytes] = None  # "state" event of the last finished turn
+
+
+class Broadcaster:
+    """
+    One channel per watched session. Each viewer has a buffer of at most
+    `buffer` payloads; a viewer that falls further behind is sent "lagged" and
+    disconnected (its reconnect starts from the current state) instead of
+    holding memory or slowing the host.
+    """
+
+    def __init__(
+        self,
+        buffer: int = SETTINGS.broadcast_buffer,
+        max_subscribers: int = SETTINGS.broadcast_max_subscribers,
+        keepalive: float = SETTINGS.broadcast_keepalive,
+    ):
+        self.buffer = max(1, buffer)
+        self.max_subscribers = max_subscribers
+        self.keepalive = keepalive
+        self._channels: Dict[str, _Channel] = {}
+        self.subscribers = 0
+        self.published = 0
+        self.delivered = 0
+        self.lagged = 0
+        self.refused = 0
+
+    # ---------- host side ----------
+    def watched(self, session_id: str) -> bool:
+        return session_id in self._channels
+
+    def publish_raw(self, session_id: str, payload: bytes) -> None:
+        """Hand an already encoded event to every viewer of the session (no-op if unwatched)."""
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return
+        self.published += 1
+        for sub in channel.subscribers:
+            if sub.lagged:
+                continue
+            if len(sub.buffer) >= self.buffer:
+                sub.lagged = True
+                sub.buffer.clear()
+                self.lagged += 1
+            else:
+                sub.buffer.append(payload)
+                self.delivered += 1
+            sub.wake.set()
+
+    def publish(self, session_id: str, event: str, data: Dict[str, Any]) -> None:
+        if session_id in self._channels:
+            self.publish_raw(session_id, encode_event(event, data))
+
+    def publish_final(self, session_id: str, final: Dict[str, Any]) -> None:
+        """End of a turn: "final" as /chat/stream sends it; the full reply becomes the join snapshot."""
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return
+        self.publish_raw(session_id, encode_event("final", {
+            "session_id": session_id,
+            "question": final.get("question", ""),
+            "chapter": final.get("chapter", 0),
+            "unlocked": bool(final.get("unlocked", False)),
+        }))
+        channel.snapshot = encode_event("state", {
+            "session_id": session_id,
+            "reply": final.get("reply", ""),
+            "question": final.get("question", ""),
+            "chapter": final.get("chapter", 0),
+            "unlocked": bool(final.get("unlocked", False)),
+        })
+
+    # ---------- viewer side ----------
+    def admit(self) -> bool:
+        """False (and counted) once the worker carries max_subscribers viewers."""
+        if self.subscribers < self.max_subscribers:
+            return True
+        self.refused += 1
+        return False
+
+    async def subscribe(self, session_id: str, snapshot: Snapshot) -> AsyncIterator[bytes]:
+        """
+        SSE byte stream for one viewer: the current "state" first (read from the store
+        only by the first viewer of a quiet session), then every published event.
+        """
+        channel = self._channels.get(session_id)
+        if channel is None:
+            channel = self._channels[session_id] = _Channel()
+        sub = _Subscriber()
+        channel.subscribers.add(sub)
+        self.subscribers += 1
+        try:
+            if channel.snapshot is None:
+                state = await snapshot()
+                if state is not None and channel.snapshot is None:
+                    channel.snapshot = encode_event("state", state)
+            if channel.snapshot is not None:
+                yield channel.snapshot
+            while True:
+                try:
+                    await asyncio.wait_for(sub.wake.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield _KEEPALIVE
+                    continue
+                sub.wake.clear()
+                if sub.lagged:
+                    yield _LAGGED
+                    return
+                while sub.buffer:
+                    yield sub.buffer.popleft()
+        finally:
+            channel.subscribers.discard(sub)
+            self.subscribers -= 1
+            if not channel.subscribers and self._channels.get(session_id) is channel:
+                del self._channels[session_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "channels": len(self._channels),
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "delivered": self.delivered,
+            "lagged": self.lagged,
+            "refused": self.refused,
+        }
+
+
+BROADCAST = Broadcaster()
@@ -0,0 +1,165 @@
+# backend/services/llm_json.py
+"""
+Tolerant JSON extraction for LLM output.
+
+One forward scan finds the first balanced {...} object, whatever prose, markdown
+fences or trailing text surround it. A candidate that does not decode is retried once
+after light repair (smart quotes, trailing commas), then validated against the schema
+of the call that produced it.
+"""
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from backend.services.metrics import JSON_PARSES, PARSE_FAILURES
+
+_STRUCT = re.compile(r'[{}\[\]"]')
+_IN_STRING = re.compile(r'["\\]')
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'"})
+
+_GEMINI_TYPES = {bool: "boolean", str: "string", int: "integer", float: "number", list: "array"}
+
+
+class JSONSchema:
+    """
+    Expected top-level fields of one call's reply: name -> type, plus which are required.
+    List fields may name an item schema in `items`; items are described to the provider
+    but validated by the caller, so one bad entry does not sink the whole reply.
+    """
+
+    def __init__(self, name: str, fields: Dict[str, type], required: Tuple[str, ...] = (),
+                 items: Optional[Dict[str, "JSONSchema"]] = None):
+        self.name = name
+        self.fields = fields
+        self.required = required
+        self.items = items or {}
+
+    def validate(self, data: Dict[str, Any]) -> bool:
+        """Check (and lightly coerce, e.g. "true" -> True) field types in place."""
+        for key, kind in self.fields.items():
+            if key not in data or data[key] is None:
+                if key in self.required:
+                    return False
+                continue
+            value = data[key]
+            if kind is bool and isinstance(value, str) and value.strip().lower() in ("true", "false"):
+                data[key] = value.strip().lower() == "true"
+            elif not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+                return False
+        return True
+
+    def to_gemini(self) -> Dict[str, Any]:
+        """OpenAPI-subset schema for Gemini's response_schema."""
+        properties = {}
+        for key, kind in self.fields.items():
+            properties[key] = {"type": _GEMINI_TYPES[kind]}
+            if key in self.items:
+                properties[key]["items"] = self.items[key].to_gemini()
+        return {"type": "object", "properties": properties, "required": list(self.required)}
+
+
+class JSONExtractor:
+    """
+    Incremental scanner: feed() text as it arrives; the first complete object that
+    decodes is kept in .result ("ok" or "repaired" in .status).
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.result: Optional[Dict[str, Any]] = None
+        self.status = "invalid"
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        if self.result is None:
+            self.text += chunk
+            self._scan()
+        return self.result
+
+    def _scan(self) -> None:
+        text = self.text
+        pos = self._pos
+        while self.result is None:
+            if self._start < 0:
+                pos = text.find("{", pos)
+                if pos < 0:
+                    pos = len(text)
+                    break
+                self._start, self._depth, self._in_string = pos, 0, False
+            if self._in_string:
+                m = _IN_STRING.search(text, pos)
+                if m is None:
+                    pos = len(text)
+                    break
+                if m.group() == "\\":
+                    if m.end() >= len(text):  # escape split across chunks
+                        pos = m.start()
+                        break
+                    pos = m.end() + 1
+                    continue
+                self._in_string = False
+                pos = m.end()
+                continue
+            m = _STRUCT.search(text, pos)
+            if m is None:
+                pos = len(text)
+                break
+            pos = m.end()
+            c = m.group()
+            if c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._decode(text[self._start:pos])
+                    if self.result is None:
+                        # not an object after all: look for the next one inside it
+                        pos = self._start + 1
+                        self._start = -1
+        self._pos = pos
+
+    def _decode(self, candidate: str) -> None:
+        for status, text in (("ok", candidate), ("repaired", _repair(candidate))):
+            try:
+                data = json.loads(text, strict=False)  # strict=False: raw newlines in strings
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                self.result, self.status = data, status
+                return
+
+
+def _repair(text: str) -> str:
+    return _TRAILING_COMMA.sub(r"\1", text.translate(_SMART_QUOTES))
+
+
+def extract_json(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """First JSON object in text and how it was obtained: "ok", "repaired" or "invalid"."""
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            data = json.loads(stripped, strict=False)
+            if isinstance(data, dict):
+                return data, "ok"
+        except ValueError:
+            pass
+    extractor = JSONExtractor()
+    extractor.feed(text)
+    return extractor.result, extractor.status
+
+
+def parse_llm_json(raw: str, schema: JSONSchema) -> Optional[Dict[str, Any]]:
+    """Extract and validate one reply; counts the outcome under the schema's call name."""
+    data, status = extract_json(raw)
+    if data is not None and not schema.validate(data):
+        data, status = None, "schema"
+    JSON_PARSES.inc(schema.name, status)
+    if data is None:
+        PARSE_FAILURES.inc(schema.name)
+    return data
@@ -1,59 +1,449 @@
 # backend/services/llm_service.py
 
-import os
-import re
-from dotenv import load_dotenv
-import google.generativeai as genai
+import asyncio
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import replace
+from typing import Dict, Any, Deque, Optional, AsyncIterator, Awaitable, Callable
 
-load_dotenv()  # reads .env in project root
+from backend.config import SETTINGS, CallProfile
+from backend.services.llm_json import JSONSchema
+from backend.services.metrics import LLM_ERRORS, observe_stage
+from backend.services.providers import LLMProvider, make_provider
+from backend.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CallStats,
+    Hedger,
+    QueueTimeoutError,
+    backoff_delay,
+    is_retryable,
+)
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+log = logging.getLogger("vsk.llm")
 
-if not API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not found in environment. Add to .env or export it.")
+# One provider (and model object) per process, built on first use or by warm_provider()
+_provider: Optional[LLMProvider] = None
+_hedge_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
 
-genai.configure(api_key=API_KEY)
 
+def get_provider() -> LLMProvider:
+    """Build the configured provider once; importing this module stays cheap."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = make_provider()
+    return _provider
 
-def _clean_markdown_fences(text: str) -> str:
+
+async def get_provider_async() -> LLMProvider:
+    # the first build imports the SDK; keep that off the event loop
+    if _provider is not None:
+        return _provider
+    return await asyncio.to_thread(get_provider)
+
+
+def get_hedge_provider() -> LLMProvider:
+    """Where hedged calls go: LLM_HEDGE_PROVIDER if set, else the primary provider."""
+    global _hedge_provider
+    if not SETTINGS.llm_hedge_provider:
+        return get_provider()
+    if _hedge_provider is None:
+        with _provider_lock:
+            if _hedge_provider is None:
+                _hedge_provider = make_provider(SETTINGS.llm_hedge_provider, secondary=True)
+    return _hedge_provider
+
+
+async def get_hedge_provider_async() -> LLMProvider:
+    if _hedge_provider is not None:
+        return _hedge_provider
+    return await asyncio.to_thread(get_hedge_provider)
+
+
+async def warm_provider() -> bool:
+    """Lifespan hook: build the provider in the background; a failure is logged, not fatal."""
+    try:
+        await get_provider_async()
+        if SETTINGS.llm_hedge_enabled:
+            await get_hedge_provider_async()
+        return True
+    except Exception as e:
+        log.warning("LLM provider unavailable, serving fallbacks until it is: %r", e)
+        return False
+
+
+# Who an LLM call is made for (session id, "batch:<ip>", ...); set per request by the routes
+LLM_CALLER: contextvars.ContextVar[str] = contextvars.ContextVar("vsk_llm_caller", default="background")
+
+
+class ConcurrencyLimiter:
     """
-    Removes Markdown-style fences (```json, ```text, ``` etc.) from LLM output.
-    Ensures clean raw text/JSON is returned.
+    Caps in-flight LLM calls per event loop (and, with `rate`, calls started per second)
+    and tracks queue depth. Callers beyond the cap queue per LLM_CALLER and are admitted
+    round-robin across callers, so one session flooding the queue cannot starve the rest.
     """
-    if not text:
-        return text
-    # remove opening fences like ```json or ```text
-    text = re.sub(r"^```[a-zA-Z0-9]*\s*", "", text.strip())
-    # remove trailing ```
-    text = re.sub(r"```$", "", text.strip())
-    return text.strip()
 
+    def __init__(self, limit: int, rate: float = 0.0, burst: float = 0.0):
+        self.limit = max(1, limit)
+        self.rate = rate
+        self.burst = max(1.0, burst or rate)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.total = 0
+        self.rate_waits = 0
+
+    def _token_wait(self) -> float:
+        """Seconds until the global call budget has a token (0.0: now)."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        self.total += 1
+        if self.rate > 0:
+            self._tokens -= 1
 
-def generate_text(prompt: str, temperature: float = 0.2, max_output_tokens: int = 512) -> str:
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._queues and self.in_flight < self.limit:
+            wait = self._token_wait()
+            if wait > 0:
+                self.rate_waits += 1
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            key, queue = next(iter(self._queues.items()))
+            fut = queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self._queues.move_to_end(key)  # next caller's turn
+            else:
+                del self._queues[key]
+            if fut.done():  # cancelled while queued
+                continue
+            self._admit()
+            fut.set_result(None)
+
+    async def acquire(self) -> None:
+        """Wait for a slot (cancellable: a cancelled waiter leaves the queue cleanly)."""
+        if not self._queues and self.in_flight < self.limit and self._token_wait() == 0:
+            self._admit()
+            return
+        key = LLM_CALLER.get()
+        fut = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(fut)
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # admitted just as we were cancelled
+            elif key in self._queues and fut in self._queues[key]:
+                self._queues[key].remove(fut)
+                self.waiting -= 1
+                if not self._queues[key]:
+                    del self._queues[key]
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "queued_callers": len(self._queues),
+            "total_calls": self.total,
+            "rate_waits": self.rate_waits,
+        }
+
+
+LIMITER = ConcurrencyLimiter(SETTINGS.llm_max_concurrency, SETTINGS.llm_global_rps, SETTINGS.llm_global_burst)
+
+_ABANDONED = object()  # leader was cancelled; followers must call on their own
+
+
+class SingleFlight:
     """
-    Call Gemini and return generated text, cleaned of markdown wrappers.
+    Coalesces concurrent calls with the same fingerprint into one outstanding
+    request. Followers wait up to wait_timeout for the leader's result, then
+    fall back to their own call.
     """
+
+    def __init__(
+        self,
+        wait_timeout: float = SETTINGS.single_flight_wait_timeout,
+        enabled: bool = SETTINGS.single_flight_enabled,
+    ):
+        self.enabled = enabled
+        self.wait_timeout = wait_timeout
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    async def run(self, key: str, call: Callable[[], Awaitable[str]]) -> str:
+        if not self.enabled:
+            return await call()
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            try:
+                result = await asyncio.wait_for(asyncio.shield(fut), self.wait_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return await call()
+            if result is _ABANDONED:
+                return await call()
+            return result
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        self.leaders += 1
+        try:
+            result = await call()
+        except BaseException:
+            fut.set_result(_ABANDONED)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        fut.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight_keys": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "wait_timeouts": self.timeouts,
+        }
+
+
+SINGLE_FLIGHT = SingleFlight()
+BREAKER = CircuitBreaker()
+CALL_STATS = CallStats()
+HEDGER = Hedger()
+
+
+def _profile(name: str, temperature: Optional[float], max_output_tokens: Optional[int]) -> CallProfile:
+    """The named profile with any per-call overrides applied."""
+    profile = SETTINGS.profile(name)
+    if temperature is not None:
+        profile = replace(profile, temperature=temperature)
+    if max_output_tokens is not None:
+        profile = replace(profile, max_output_tokens=max_output_tokens)
+    return profile
+
+
+def _fingerprint(prompt: str, profile: CallProfile, schema: Optional[JSONSchema] = None) -> str:
+    mode = schema.name if schema is not None else ""
+    raw = (f"{SETTINGS.llm_provider}:{profile.model}\x00{profile.temperature}\x00{profile.max_output_tokens}"
+           f"\x00{profile.stop_sequences}\x00{mode}\x00{prompt}")
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _hedge_call(provider: LLMProvider, prompt: str, profile: CallProfile,
+                schema: Optional[JSONSchema]) -> Callable[[], Awaitable[str]]:
+    """Second request of a hedged call: LLM_HEDGE_MODEL (if set) on the hedge provider."""
+    hedge_profile = replace(profile, name=profile.name + ":hedge", model=SETTINGS.llm_hedge_model or profile.model)
+    return lambda: provider.generate(prompt, hedge_profile, schema)
+
+
+async def _acquire_slot() -> None:
+    """A LIMITER slot within LLM_QUEUE_TIMEOUT; queueing is never the provider's fault."""
+    try:
+        await asyncio.wait_for(LIMITER.acquire(), SETTINGS.llm_queue_timeout)
+    except asyncio.TimeoutError:
+        CALL_STATS.queue_timeouts += 1
+        LLM_ERRORS.inc("queue_timeout")
+        raise QueueTimeoutError(f"no LLM slot within {SETTINGS.llm_queue_timeout}s") from None
+
+
+async def _call_resilient(invoke: Callable[[], Awaitable[Any]], call: str = "") -> str:
+    """
+    Run one provider call under the breaker, the limiter and a per-call deadline
+    (LLM_TIMEOUT of provider time, shared by all attempts and their backoff; time
+    queued for a slot is bounded by LLM_QUEUE_TIMEOUT instead), retrying retryable
+    errors with jittered backoff. A call that ends without an outcome (cancelled,
+    queue timeout) hands a half-open probe back to the breaker.
+    """
+    if not BREAKER.allow():
+        LLM_ERRORS.inc("circuit_open")
+        raise CircuitOpenError("LLM circuit open")
+
+    remaining = SETTINGS.llm_timeout
+    attempt = 0
+    settled = False
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
-        resp = model.generate_content(prompt)
-
-        # common SDK shapes: resp.text
-        if hasattr(resp, "text") and resp.text:
-            return _clean_markdown_fences(resp.text)
-
-        # fallback for dict-like responses
-        if isinstance(resp, dict):
-            candidates = resp.get("candidates") or resp.get("outputs")
-            if isinstance(candidates, list) and candidates:
-                candidate = candidates[0]
-                if isinstance(candidate, dict):
-                    for k in ("content", "output", "text"):
-                        if k in candidate:
-                            return _clean_markdown_fences(candidate[k])
-                return _clean_markdown_fences(str(candidate))
-
-        return _clean_markdown_fences(str(resp))
+        while True:
+            CALL_STATS.attempts += 1
+            await _acquire_slot()
+            started = time.monotonic()
+            error: Optional[Exception] = None
+            try:
+                text = await asyncio.wait_for(invoke(), max(0.001, remaining))
+            except Exception as e:
+                error = e
+            finally:
+                LIMITER.release()
+            elapsed = time.monotonic() - started
+            observe_stage("llm_call", elapsed, call)
+            if error is None:
+                CALL_STATS.observe(elapsed)
+                settled = True
+                BREAKER.record_success()
+                return text
+
+            remaining -= elapsed
+            if isinstance(error, asyncio.TimeoutError):
+                CALL_STATS.timeouts += 1
+            if attempt < SETTINGS.llm_max_retries and is_retryable(error):
+                attempt += 1
+                delay = backoff_delay(attempt)
+                if delay < remaining:
+                    CALL_STATS.retries += 1
+                    await asyncio.sleep(delay)
+                    remaining -= delay
+                    continue
+            CALL_STATS.errors += 1
+            LLM_ERRORS.inc("generate")
+            settled = True
+            BREAKER.record_failure()
+            raise error
+    finally:
+        if not settled:
+            BREAKER.release_probe()
+
+
+async def generate_text_async(
+    prompt: str,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    coalesce: bool = True,
+    schema: Optional[JSONSchema] = None,
+    profile: str = "default",
+) -> str:
+    """
+    Async Gemini call through the SDK's async client.
+    profile names the call type (evaluate, story, ...) whose model, temperature and
+    output cap apply; temperature/max_output_tokens override them for this call.
+    Waits on LIMITER so one worker can hold many trials without flooding the provider.
+    Identical concurrent prompts share one request unless coalesce=False
+    (used where distinct samples are wanted, e.g. pool refills).
+    With a schema, the provider is asked for that JSON object (JSON mode where supported).
+    Profiles listed in LLM_HEDGE_PROFILES are hedged when LLM_HEDGE_ENABLED (see Hedger).
+    """
+    call_profile = _profile(profile, temperature, max_output_tokens)
+    hedged = HEDGER.enabled and call_profile.name in SETTINGS.llm_hedge_profiles
+
+    async def call() -> str:
+        try:
+            provider = await get_provider_async()
+            invoke = lambda: provider.generate(prompt, call_profile, schema)
+            if hedged:
+                primary, secondary = invoke, _hedge_call(await get_hedge_provider_async(), prompt, call_profile, schema)
+                invoke = lambda: HEDGER.run(call_profile.name, primary, secondary)
+            return await _call_resilient(invoke, call_profile.name)
+        except Exception as e:
+            return f"[LLM_ERROR] {repr(e)}"
+
+    if not coalesce:
+        return await call()
+    return await SINGLE_FLIGHT.run(_fingerprint(prompt, call_profile, schema), call)
+
 
+async def generate_text_stream(
+    prompt: str,
+    temperature: Optional[float] = None,
+    max_output_tokens: Optional[int] = None,
+    profile: str = "stream",
+) -> AsyncIterator[str]:
+    """
+    Stream Gemini output chunk by chunk (SDK streaming API).
+    Errors surface as a single "[LLM_ERROR] ..." chunk, mirroring generate_text_async.
+    Not retried: chunks may already have reached the player. A gap of more than
+    LLM_STREAM_IDLE_TIMEOUT between chunks ends the stream as a provider failure.
+    """
+    call_profile = _profile(profile, temperature, max_output_tokens)
+    if not BREAKER.allow():
+        LLM_ERRORS.inc("circuit_open")
+        yield f"[LLM_ERROR] {CircuitOpenError('LLM circuit open')!r}"
+        return
+    received = False
+    settled = False
+    try:
+        provider = await get_provider_async()
+        await _acquire_slot()
+        try:
+            chunks = await asyncio.wait_for(
+                provider.open_stream(prompt, call_profile), SETTINGS.llm_timeout
+            )
+            try:
+                while True:
+                    # a provider stalling mid-stream must not hold the slot and the SSE forever
+                    try:
+                        text = await asyncio.wait_for(chunks.__anext__(), SETTINGS.llm_stream_idle_timeout)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        CALL_STATS.timeouts += 1
+                        raise
+                    received = True
+                    yield text
+            finally:
+                aclose = getattr(chunks, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        finally:
+            LIMITER.release()
+    except QueueTimeoutError as e:
+        yield f"[LLM_ERROR] {e!r}"
+        return
     except Exception as e:
-        return f"[LLM_ERROR] {repr(e)}"
+        LLM_ERRORS.inc("stream")
+        settled = True
+        BREAKER.record_failure()
+        yield f"[LLM_ERROR] {repr(e)}"
+        return
+    else:
+        settled = True
+        BREAKER.record_success()
+    finally:
+        # closed early (client gone, task cancelled): chunks prove the provider answered;
+        # with none the outcome is unknown and a half-open probe is handed back
+        if not settled:
+            if received:
+                BREAKER.record_success()
+            else:
+                BREAKER.release_probe()
@@ -0,0 +1,217 @@
+# backend/services/metrics.py
+"""
+Tiny Prometheus-format metrics: labelled counters, fixed-bucket histograms
+and callback gauges, plus per-request stage traces for slow-request logging.
+Updates are plain attribute/list writes (no locks) to keep hot-path cost low;
+the app runs on one event loop per worker, and /metrics renders on that loop too
+(never in the threadpool, where it would race those writes).
+"""
+import bisect
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.config import SETTINGS
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+log = logging.getLogger("vsk.slow")
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        key = tuple(str(v) for v in label_values)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, v in self.values.items():
+            out.append(f"{self.name}{_fmt_labels(self.labels, key)} {v}")
+        return out
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n: int):
+        self.counts = [0] * n
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.children: Dict[Tuple[str, ...], _HistogramChild] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        key = tuple(str(v) for v in label_values)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = _HistogramChild(len(self.buckets) + 1)
+        child.counts[bisect.bisect_left(self.buckets, value)] += 1
+        child.sum += value
+        child.count += 1
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, child in self.children.items():
+            running = 0
+            for bound, n in zip(self.buckets, child.counts):
+                running += n
+                le = _fmt_labels(self.labels, key, 'le="%s"' % bound)
+                out.append(f"{self.name}_bucket{le} {running}")
+            le = _fmt_labels(self.labels, key, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{le} {child.count}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {child.sum}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {child.count}")
+        return out
+
+
+class GaugeSet:
+    """
+    Gauges read at scrape time from a component's stats() dict (numeric fields only).
+    Fields named in `counters` only ever grow: they are exported as <prefix>_<field>_total
+    counters so rate() works on them.
+    """
+
+    def __init__(self, prefix: str, help: str, source: Callable[[], Dict[str, object]],
+                 counters: Iterable[str] = ()):
+        self.prefix, self.help, self.source = prefix, help, source
+        self.counters = frozenset(counters)
+
+    def render(self) -> List[str]:
+        try:
+            stats = self.source()
+        except Exception:
+            return []
+        out = []
+        for k, v in stats.items():
+            if isinstance(v, bool):
+                v = int(v)
+            if isinstance(v, (int, float)) and k in self.counters:
+                name = f"{self.prefix}_{k}_total"
+                out += [f"# HELP {name} {self.help}", f"# TYPE {name} counter", f"{name} {v}"]
+            elif isinstance(v, (int, float)):
+                name = f"{self.prefix}_{k}"
+                out += [f"# HELP {name} {self.help}", f"# TYPE {name} gauge", f"{name} {v}"]
+            elif isinstance(v, dict):
+                name = f"{self.prefix}_{k}"
+                out += [f"# HELP {name} {self.help}", f"# TYPE {name} gauge"]
+                out += [f'{name}{{key="{kk}"}} {vv}' for kk, vv in v.items() if isinstance(vv, (int, float))]
+            elif isinstance(v, str):
+                # enum-style state, e.g. breaker state="open"
+                name = f"{self.prefix}_{k}_info"
+                out += [f"# TYPE {name} gauge", f'{name}{{value="{v}"}} 1']
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[object] = []
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        m = Counter(name, help, labels)
+        self.metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        m = Histogram(name, help, labels, buckets)
+        self.metrics.append(m)
+        return m
+
+    def gauges(self, prefix: str, help: str, source: Callable[[], Dict[str, object]],
+               counters: Iterable[str] = ()) -> None:
+        self.metrics.append(GaugeSet(prefix, help, source, counters))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self.metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+STAGE_SECONDS = METRICS.histogram(
+    "vsk_stage_seconds", "Time spent per request stage.", ("stage",))
+REQUEST_SECONDS = METRICS.histogram(
+    "vsk_request_seconds", "End-to-end HTTP request latency.", ("path",))
+LLM_ERRORS = METRICS.counter(
+    "vsk_llm_errors_total", "LLM calls that failed after retries (or were refused by the breaker).", ("call",))
+PARSE_FAILURES = METRICS.counter(
+    "vsk_parse_failures_total", "LLM outputs that could not be parsed.", ("call",))
+FALLBACKS = METRICS.counter(
+    "vsk_fallbacks_total", "Fallback paths taken instead of a fresh LLM result.", ("kind",))
+VERDICTS = METRICS.counter(
+    "vsk_verdicts_total", "Answer verdicts per chapter.", ("chapter", "result"))
+JSON_PARSES = METRICS.counter(
+    "vsk_llm_json_total", "LLM JSON replies by extraction result (ok, repaired, invalid, schema).", ("call", "result"))
+THROTTLED = METRICS.counter(
+    "vsk_throttled_total", "Requests refused with 429, by exhausted bucket.", ("scope",))
+PROMPT_TRIMS = METRICS.counter(
+    "vsk_prompt_trims_total", "Prompt inputs cut to the token budget.", ("field",))
+STATIC_REPLIES = METRICS.counter(
+    "vsk_static_replies_total", "Turns served from precomputed payloads.", ("kind",))
+
+
+# ---------- per-request traces ----------
+_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("vsk_trace", default=None)
+
+
+def observe_stage(stage: str, seconds: float, detail: str = "") -> None:
+    """detail only names the span in the request trace (e.g. llm_call:evaluate), not the histogram."""
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace.append((f"{stage}:{detail}" if detail else stage, seconds))
+
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def start_trace() -> contextvars.Token:
+    return _trace.set([])
+
+
+def trace_mark() -> int:
+    """Position in the current request trace, for trace_since()."""
+    trace = _trace.get()
+    return len(trace) if trace is not None else 0
+
+
+def trace_since(mark: int) -> List[Tuple[str, float]]:
+    """Spans recorded in this request since trace_mark() (empty outside a traced request)."""
+    trace = _trace.get()
+    return trace[mark:] if trace is not None else []
+
+
+def finish_trace(token: contextvars.Token, path: str, seconds: float) -> None:
+    trace = _trace.get()
+    _trace.reset(token)
+    REQUEST_SECONDS.observe(seconds, path)
+    slow = seconds >= SETTINGS.slow_request_seconds
+    if trace is not None and slow and random.random() < SETTINGS.slow_trace_sample_rate:
+        breakdown = ", ".join(f"{s}={d * 1000:.1f}ms" for s, d in trace)
+        log.warning("slow request %s %.1fms: %s", path, seconds * 1000, breakdown)
@@ -0,0 +1,210 @@
+# backend/services/providers.py
+"""
+LLM providers behind llm_service. Each returns raw generated text (markdown
+cleanup and resilience stay in llm_service) and raises on failure.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Any, AsyncIterator, Dict, Optional
+
+from backend.config import SETTINGS, CallProfile
+from backend.services.llm_json import JSONSchema
+
+
+class LLMProvider:
+    name = "base"
+
+    async def generate(self, prompt: str, profile: CallProfile, schema: Optional[JSONSchema] = None) -> str:
+        """
+        profile: model, temperature, output cap and stop sequences of this kind of call.
+        schema: the reply should be that JSON object (providers may ignore the hint).
+        """
+        raise NotImplementedError
+
+    async def open_stream(self, prompt: str, profile: CallProfile) -> AsyncIterator[str]:
+        """Start a streaming call; the returned iterator yields text chunks."""
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    """google-generativeai client; one GenerativeModel per call profile, reused by every call of it."""
+
+    def __init__(self):
+        if not SETTINGS.gemini_api_key:
+            raise RuntimeError("GEMINI_API_KEY not found in environment. Add to .env or export it.")
+        # heavy import (grpc, protobuf): only paid when a Gemini provider is actually built
+        import google.generativeai as genai
+
+        genai.configure(api_key=SETTINGS.gemini_api_key)
+        self._genai = genai
+        self.name = f"gemini:{SETTINGS.gemini_model}"
+        self._models: Dict[str, Any] = {}
+        for profile in SETTINGS.llm_profiles.values():
+            self._model(profile)
+
+    def _model(self, profile: CallProfile):
+        model = self._models.get(profile.name)
+        if model is None:
+            model = self._models[profile.name] = self._genai.GenerativeModel(profile.model)
+        return model
+
+    @staticmethod
+    def _text(resp) -> str:
+        # common SDK shapes: resp.text
+        if hasattr(resp, "text") and resp.text:
+            return resp.text
+
+        # fallback for dict-like responses
+        if isinstance(resp, dict):
+            candidates = resp.get("candidates") or resp.get("outputs")
+            if isinstance(candidates, list) and candidates:
+                candidate = candidates[0]
+                if isinstance(candidate, dict):
+                    for k in ("content", "output", "text"):
+                        if k in candidate:
+                            return candidate[k]
+                return str(candidate)
+
+        return str(resp)
+
+    @staticmethod
+    def _config(profile: CallProfile, schema: Optional[JSONSchema] = None) -> Dict[str, Any]:
+        config: Dict[str, Any] = {"temperature": profile.temperature, "max_output_tokens": profile.max_output_tokens}
+        if profile.stop_sequences:
+            config["stop_sequences"] = list(profile.stop_sequences)
+        if schema is not None and SETTINGS.llm_json_mode:
+            config["response_mime_type"] = "application/json"
+            config["response_schema"] = schema.to_gemini()
+        return config
+
+    async def generate(self, prompt, profile, schema=None):
+        return self._text(await self._model(profile).generate_content_async(
+            prompt, generation_config=self._config(profile, schema)))
+
+    async def open_stream(self, prompt, profile):
+        resp = await self._model(profile).generate_content_async(
+            prompt, generation_config=self._config(profile), stream=True)
+
+        async def chunks():
+            async for chunk in resp:
+                text = getattr(chunk, "text", "")
+                if text:
+                    yield text
+
+        return chunks()
+
+
+class FakeProviderError(RuntimeError):
+    """Injected provider failure; looks like a 503 so it is retryable."""
+    code = 503
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic offline stand-in. Latency is lognormal around a median,
+    errors and broken JSON are injected at fixed rates, and replies are canned
+    JSON shaped after the prompt (verdict, fused verdict, story, streamed story).
+    Same seed + same prompt sequence -> same outputs.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        seed: int = SETTINGS.fake_llm_seed,
+        latency_ms: float = SETTINGS.fake_llm_latency_ms,
+        sigma: float = SETTINGS.fake_llm_latency_sigma,
+        error_rate: float = SETTINGS.fake_llm_error_rate,
+        invalid_rate: float = SETTINGS.fake_llm_invalid_rate,
+    ):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.invalid_rate = invalid_rate
+        self._seen: Dict[str, int] = {}
+        self.calls = 0
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+        n = self._seen.get(digest, 0)
+        self._seen[digest] = n + 1
+        return random.Random(f"{self.seed}:{digest}:{n}")
+
+    def _latency(self, rng: random.Random) -> float:
+        if self.sigma <= 0:
+            return self.latency_ms / 1000
+        return self.latency_ms * math.exp(rng.gauss(0, self.sigma)) / 1000
+
+    @staticmethod
+    def _accepts(prompt: str, answer: str = "") -> bool:
+        m = re.search(r"Required emotions/mindsets:(.*)", prompt)
+        a = re.search(r'The seeker answered: "(.*)"', prompt)
+        if not m or not (a or answer):
+            return False
+        answer = (answer or a.group(1)).lower()
+        return any(w.strip() and w.strip() in answer for w in m.group(1).lower().split(","))
+
+    def _reply(self, prompt: str, rng: random.Random) -> str:
+        if rng.random() < self.invalid_rate:
+            return "Sure! Here is the JSON you asked for: {accept: maybe,"
+        if '"verdicts"' in prompt:
+            verdicts = []
+            for answer_id, answer in re.findall(r'^\[(A\d+)\] \(context C\d+\) "(.*)"$', prompt, re.MULTILINE):
+                ok = self._accepts(prompt, answer)
+                verdicts.append({
+                    "id": answer_id,
+                    "accept": ok,
+                    "vader_reaction": "*[mechanical breath]* " + ("Your fire is noted." if ok else "Hollow words."),
+                    "explanation": "fake provider: keyword " + ("match" if ok else "miss"),
+                })
+            return json.dumps({"verdicts": verdicts})
+        if '"accept"' in prompt:
+            ok = self._accepts(prompt)
+            data = {
+                "accept": ok,
+                "vader_reaction": "*[mechanical breath]* " + ("Your fire is noted." if ok else "Hollow words."),
+                "explanation": "fake provider: keyword " + ("match" if ok else "miss"),
+            }
+            if "next_story" in prompt:
+                data["next_story"] = "Fake corridor of neon and ash closes around you." if ok else ""
+                data["next_riddle"] = "What do you carry through the dark?" if ok else ""
+            return "```json\n" + json.dumps(data) + "\n```"
+        if "RIDDLE:" in prompt:
+            return "Fake neon rain hisses on black steel.\nThe Gate listens.\nRIDDLE: What answers when silence asks?"
+        return json.dumps({
+            "story": f"Fake chamber {rng.randint(1, 9999)}: shadows pool under flickering neon.",
+            "riddle": "What remains when the light fails?",
+        })
+
+    async def _simulate(self, prompt: str) -> str:
+        self.calls += 1
+        rng = self._rng(prompt)
+        await asyncio.sleep(self._latency(rng))
+        if rng.random() < self.error_rate:
+            raise FakeProviderError("fake provider: injected 503")
+        return self._reply(prompt, rng)
+
+    async def generate(self, prompt, profile, schema=None):
+        return await self._simulate(prompt)
+
+    async def open_stream(self, prompt, profile):
+        text = await self._simulate(prompt)
+
+        async def chunks():
+            for i in range(0, len(text), 16):
+                await asyncio.sleep(0)
+                yield text[i:i + 16]
+
+        return chunks()
+
+
+def make_provider(kind: str = SETTINGS.llm_provider, secondary: bool = False) -> LLMProvider:
+    """secondary: the instance hedged calls go to (the fake then draws its own latencies)."""
+    if kind == "fake":
+        return FakeProvider(seed=SETTINGS.fake_llm_seed + 1) if secondary else FakeProvider()
+    return GeminiProvider()
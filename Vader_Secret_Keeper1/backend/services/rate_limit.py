@@ -0,0 +1,171 @@
+# backend/services/rate_limit.py
+"""
+Request throttling in front of LLM-bound work: token buckets per session and per
+client IP. Cheap turns (intro, hints) are never checked; see routes/chat.py.
+"""
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.config import SETTINGS
+from backend.services.metrics import THROTTLED
+
+
+class TokenBuckets:
+    """
+    One token bucket per key, all in a single OrderedDict kept in last-use order.
+    Lookups and updates are O(1). A bucket idle long enough to be full again is
+    indistinguishable from a new one, so those are dropped from the cold end on every
+    call; max_keys caps memory even under a flood of distinct keys.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = SETTINGS.rate_limit_max_keys):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max(1, max_keys)
+        self.full_after = self.burst / rate if rate > 0 else math.inf
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [tokens, last update]
+        self.denied = 0
+        self.evicted = 0
+
+    def _bucket(self, key: str, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            key, (_, last) = next(iter(buckets.items()))
+            if len(buckets) <= self.max_keys and now - last < self.full_after:
+                break
+            del buckets[key]
+            self.evicted += 1
+
+    def wait_time(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Seconds until `cost` tokens are available for key (0.0: available now)."""
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(key, now)
+        self._evict(now)
+        if bucket[0] >= cost:
+            return 0.0
+        return (cost - bucket[0]) / self.rate if self.rate > 0 else math.inf
+
+    def consume(self, key: str, cost: float = 1.0) -> None:
+        """Spend tokens after wait_time() said they were there."""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket[0] -= cost
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimited(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"rate limited ({scope}), retry after {retry_after:.1f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimiter:
+    """Both the session's and the client's bucket must have a token; neither is spent otherwise."""
+
+    def __init__(
+        self,
+        enabled: bool = SETTINGS.rate_limit_enabled,
+        session_rate: float = SETTINGS.session_rate,
+        session_burst: float = SETTINGS.session_burst,
+        client_rate: float = SETTINGS.client_rate,
+        client_burst: float = SETTINGS.client_burst,
+        batch_rate: float = SETTINGS.batch_rate,
+        batch_burst: float = SETTINGS.batch_burst,
+    ):
+        self.enabled = enabled
+        self.sessions = TokenBuckets(session_rate, session_burst)
+        self.clients = TokenBuckets(client_rate, client_burst)
+        self.batches = TokenBuckets(batch_rate, batch_burst)  # graded answers, per client
+
+    def check(self, session_id: str, client: str) -> None:
+        """Take one token from each bucket or raise RateLimited with the longer wait."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        for scope, buckets, key in (("client", self.clients, client), ("session", self.sessions, session_id)):
+            wait = buckets.wait_time(key, now=now)
+            if wait > 0:
+                buckets.denied += 1
+                THROTTLED.inc(scope)
+                raise RateLimited(scope, wait)
+        self.clients.consume(client)
+        self.sessions.consume(session_id)
+
+    def check_batch(self, client: str, items: int) -> None:
+        """Take one token per item from the client's batch bucket or raise RateLimited."""
+        if not self.enabled:
+            return
+        # a batch larger than the burst could never be admitted; it costs a full bucket instead
+        cost = min(float(max(1, items)), self.batches.burst)
+        wait = self.batches.wait_time(client, cost)
+        if wait > 0:
+            self.batches.denied += 1
+            THROTTLED.inc("batch")
+            raise RateLimited("batch", wait)
+        self.batches.consume(client, cost)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "session_keys": len(self.sessions),
+            "session_denied": self.sessions.denied,
+            "client_keys": len(self.clients),
+            "client_denied": self.clients.denied,
+            "batch_keys": len(self.batches),
+            "batch_denied": self.batches.denied,
+            "evicted": self.sessions.evicted + self.clients.evicted + self.batches.evicted,
+        }
+
+
+def _networks(proxies: Iterable[str]) -> List[Any]:
+    return [ipaddress.ip_network(p.strip(), strict=False) for p in proxies if p.strip()]
+
+
+_TRUSTED_PROXIES = _networks(SETTINGS.trusted_proxies)
+
+
+def _trusted(host: str, proxies: List[Any]) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in net for net in proxies)
+
+
+def client_address(request, proxies: Optional[List[Any]] = None) -> str:
+    """
+    Caller IP. X-Forwarded-For is read only when the peer is one of TRUSTED_PROXIES,
+    and then from the right: the first hop not itself a trusted proxy is the client
+    (everything left of it was written by the caller and is not believed).
+    """
+    proxies = _TRUSTED_PROXIES if proxies is None else proxies
+    peer = request.client.host if request.client else "unknown"
+    if not proxies or not _trusted(peer, proxies):
+        return peer
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop, proxies):
+            return hop
+    return hops[0] if hops else peer
+
+
+RATE_LIMITER = RateLimiter()
@@ -0,0 +1,265 @@
+# backend/services/resilience.py
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from backend.config import SETTINGS
+
+# google.api_core exception names / HTTP codes worth another attempt
+_RETRYABLE_NAMES = {
+    "TimeoutError", "DeadlineExceeded", "ServiceUnavailable", "InternalServerError",
+    "ResourceExhausted", "TooManyRequests", "BadGateway", "GatewayTimeout",
+    "ConnectionError", "ConnectionResetError", "RetryError",
+}
+_RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the provider while the breaker is open."""
+
+
+class QueueTimeoutError(RuntimeError):
+    """No limiter slot within LLM_QUEUE_TIMEOUT; says nothing about the provider's health."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in _RETRYABLE_NAMES:
+        return True
+    code = getattr(exc, "code", None)
+    return isinstance(code, int) and code in _RETRYABLE_CODES
+
+
+def backoff_delay(
+    attempt: int, base: float = SETTINGS.llm_backoff_base, cap: float = SETTINGS.llm_backoff_max
+) -> float:
+    """Full-jitter exponential backoff for the given retry number (1-based)."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open fails fast for
+    `cooldown` seconds; then half-open lets a single probe through, whose
+    outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self, threshold: int = SETTINGS.breaker_failure_threshold, cooldown: float = SETTINGS.breaker_cooldown
+    ):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_out = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probe_out = False
+            if self.state == self.HALF_OPEN and not self._probe_out:
+                self._probe_out = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+            self._probe_out = False
+
+    def release_probe(self) -> None:
+        """
+        A call ended without an outcome (cancelled, client gone, never reached the
+        provider): if it was the half-open probe, let the next call probe instead.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_out = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_out = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected,
+            "open_for": round(time.monotonic() - self.opened_at, 3) if self.state != self.CLOSED else 0.0,
+        }
+
+
+class CallStats:
+    """Attempt/retry/timeout counters and a latency EWMA for successful calls."""
+
+    def __init__(self):
+        self.attempts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.queue_timeouts = 0
+        self.errors = 0
+        self.successes = 0
+        self.last_latency = 0.0
+        self.ewma_latency = 0.0
+        self.max_retries = SETTINGS.llm_max_retries
+
+    def observe(self, seconds: float) -> None:
+        self.successes += 1
+        self.last_latency = seconds
+        self.ewma_latency = seconds if self.successes == 1 else 0.9 * self.ewma_latency + 0.1 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "queue_timeouts": self.queue_timeouts,
+            "errors": self.errors,
+            "successes": self.successes,
+            "last_latency_s": round(self.last_latency, 4),
+            "ewma_latency_s": round(self.ewma_latency, 4),
+        }
+
+
+class Hedger:
+    """
+    Tail-latency hedging per call profile. When the primary request has not answered
+    after the profile's observed `quantile` latency, the same call goes to the
+    secondary (model or provider); the first successful reply wins and the other is
+    cancelled. If both fail the primary's error is raised (retries see it as usual).
+    Every call earns `budget` of a hedge token (at most `burst` are kept), so at most
+    about that share of calls is hedged however slow the provider gets.
+    A primary that loses to its hedge still contributes a latency sample: the time the
+    hedge won at, a lower bound on its own. Dropping it would leave only the fast
+    primaries in the window and pull the delay down.
+    """
+
+    WINDOW = 256  # recent primary latencies kept per profile
+
+    def __init__(
+        self,
+        enabled: bool = SETTINGS.llm_hedge_enabled,
+        quantile: float = SETTINGS.llm_hedge_quantile,
+        min_delay: float = SETTINGS.llm_hedge_min_delay,
+        min_samples: int = SETTINGS.llm_hedge_min_samples,
+        budget: float = SETTINGS.llm_hedge_budget,
+        burst: float = SETTINGS.llm_hedge_burst,
+    ):
+        self.enabled = enabled and budget > 0
+        self.quantile = min(max(quantile, 0.0), 1.0)
+        self.min_delay = min_delay
+        self.min_samples = max(1, min_samples)
+        self.budget = budget
+        self.burst = max(1.0, burst)
+        self._tokens = 0.0
+        self._samples: Dict[str, Deque[float]] = {}
+        self._delays: Dict[str, float] = {}
+        self._observed: Dict[str, int] = {}
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.budget_denied = 0
+        self.won_latency = 0.0  # summed over hedge wins
+
+    # ---------- adaptive delay ----------
+    def observe(self, profile: str, seconds: float) -> None:
+        samples = self._samples.get(profile)
+        if samples is None:
+            samples = self._samples[profile] = deque(maxlen=self.WINDOW)
+        samples.append(seconds)
+        seen = self._observed[profile] = self._observed.get(profile, 0) + 1
+        # re-sort every 8th sample (and once history suffices); the quantile drifts slowly
+        if len(samples) >= self.min_samples and (profile not in self._delays or seen % 8 == 0):
+            ordered = sorted(samples)
+            self._delays[profile] = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+    def delay(self, profile: str) -> Optional[float]:
+        """Seconds to wait on the primary before hedging; None while there is too little history."""
+        samples = self._samples.get(profile)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, self._delays[profile])
+
+    # ---------- calls ----------
+    async def run(
+        self,
+        profile: str,
+        primary: Callable[[], Awaitable[Any]],
+        secondary: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        self.calls += 1
+        self._tokens = min(self.burst, self._tokens + self.budget)
+        delay = self.delay(profile) if self.enabled and secondary is not None else None
+        started = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        tasks = [first]
+        try:
+            if delay is not None:
+                await asyncio.wait((first,), timeout=delay)
+                if not first.done():
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.hedged += 1
+                        tasks.append(asyncio.ensure_future(secondary()))
+                    else:
+                        self.budget_denied += 1
+            if len(tasks) == 1:
+                result = await first
+                self.observe(profile, time.monotonic() - started)
+                return result
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (t for t in tasks if t in done):  # primary first on a tie
+                    if task.exception() is None:
+                        elapsed = time.monotonic() - started
+                        if task is first:
+                            self.primary_wins += 1
+                            self.observe(profile, elapsed)
+                        else:
+                            self.hedge_wins += 1
+                            self.won_latency += elapsed
+                            if not first.done():
+                                self.observe(profile, elapsed)  # censored: the primary took longer
+                        return task.result()
+            raise first.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "budget_denied": self.budget_denied,
+            "hedge_win_latency_s": round(self.won_latency / self.hedge_wins, 4) if self.hedge_wins else 0.0,
+            "delay_s": {name: round(self.delay(name) or 0.0, 4) for name in self._samples},
+        }
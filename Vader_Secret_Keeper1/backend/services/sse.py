@@ -0,0 +1,8 @@
+# backend/services/sse.py
+"""Server-Sent Events framing shared by /chat/stream, /watch and the static payloads."""
+import json
+
+
+def encode_event(event: str, data: dict) -> bytes:
+    """One SSE event, UTF-8 encoded: "event: <name>\\ndata: <json>\\n\\n"."""
+    return b"event: " + event.encode() + b"\ndata: " + json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n\n"
@@ -0,0 +1,159 @@
+# benchmarks/bench_chat.py
+"""
+Offline load test: full trial playthroughs (begin -> chapter 1 -> 2 -> 3 -> unlock)
+against /api/chat, in-process over ASGI with the deterministic fake LLM provider.
+
+    python -m benchmarks.bench_chat --sessions 500 --concurrency 100
+    python -m benchmarks.bench_chat --out run.json --compare baseline.json
+    python -m benchmarks.bench_chat --url http://127.0.0.1:8000   # a running server instead
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.common import compare, environment, summarize, write_results
+
+# answers that land in the pre-classifier's middle band (one LLM evaluation each)
+LLM_ANSWERS = {1: "I crave knowledge", 2: "I seek power", 3: "peace at last"}
+# answers the pre-classifier accepts locally
+LOCAL_ANSWERS = {1: "I feel rage and curiosity", 2: "I command and control", 3: "clarity brings me peace"}
+
+
+def _configure_env(args) -> None:
+    # must run before backend is imported: config is read at import time
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_LATENCY_SIGMA"] = str(args.sigma)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["FAKE_LLM_INVALID_RATE"] = str(args.invalid_rate)
+    os.environ["EVAL_CACHE_ENABLED"] = "true" if args.eval_cache else "false"
+    os.environ.setdefault("SESSION_BACKEND", args.session_backend)
+    # every simulated player shares one client address; measure the engine, not the throttle
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+
+async def _playthrough(client, sid: str, answers: Dict[int, str], timings, failures) -> bool:
+    steps = [("begin", "begin")] + [(f"chapter{c}", answers[c]) for c in (1, 2, 3)]
+    unlocked = False
+    for step, message in steps:
+        started = time.perf_counter()
+        resp = await client.post("/api/chat", json={"session_id": sid, "message": message})
+        timings[step].append(time.perf_counter() - started)
+        if resp.status_code != 200:
+            failures[resp.status_code] += 1
+            return False
+        unlocked = bool(resp.json().get("unlocked"))
+    return unlocked
+
+
+def _check_local_answers() -> None:
+    """Fail fast if a "local" answer would reach the LLM: the run would measure the wrong path."""
+    from backend.core.emotiongendect import CHAPTER_DEFS
+    from backend.core.preclassifier import PreClassifier
+
+    pre = PreClassifier(CHAPTER_DEFS, enabled=True)
+    for chapter, answer in LOCAL_ANSWERS.items():
+        verdict = pre.classify(chapter, answer)
+        assert verdict is not None and verdict["accept"], f"chapter {chapter}: {answer!r} is not accepted locally"
+
+
+def _stage_breakdown() -> Dict[str, Dict[str, float]]:
+    from backend.services.metrics import STAGE_SECONDS
+
+    out = {}
+    for (stage,), child in sorted(STAGE_SECONDS.children.items()):
+        out[stage] = {
+            "count": child.count,
+            "mean_ms": round(1000 * child.sum / child.count, 3) if child.count else 0.0,
+            "total_s": round(child.sum, 3),
+        }
+    return out
+
+
+async def run(args) -> Dict:
+    import httpx
+
+    answers = LOCAL_ANSWERS if args.answers == "local" else LLM_ANSWERS
+    if args.answers == "local":
+        _check_local_answers()
+    timings: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[int, int] = defaultdict(int)
+    unlocked = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int, client) -> None:
+        nonlocal unlocked
+        async with sem:
+            if await _playthrough(client, f"bench-{args.seed}-{i}", answers, timings, failures):
+                unlocked += 1
+
+    async def drive(client) -> float:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i, client) for i in range(args.sessions)))
+        return time.perf_counter() - started
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            elapsed = await drive(client)
+        stages = {}
+    else:
+        from backend.app import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            if args.warmup:
+                await asyncio.sleep(args.warmup)  # let the story pool fill
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                elapsed = await drive(client)
+        stages = _stage_breakdown()
+
+    every = [t for values in timings.values() for t in values]
+    return {
+        "requests": len(every),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(every) / elapsed, 2) if elapsed else 0.0,
+        "unlock_rate": round(unlocked / args.sessions, 4) if args.sessions else 0.0,
+        "http_errors": dict(failures),
+        "latency": summarize(every),
+        "per_step": {step: summarize(values) for step, values in sorted(timings.items())},
+        "stages": stages,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200, help="playthroughs to run")
+    parser.add_argument("--concurrency", type=int, default=50, help="playthroughs in flight at once")
+    parser.add_argument("--answers", choices=("llm", "local"), default="llm",
+                        help="llm: every answer needs an evaluation call; local: pre-classifier decides")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="fake provider median latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="fake provider lognormal spread")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--eval-cache", action="store_true", help="keep the verdict cache on")
+    parser.add_argument("--session-backend", default="memory")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds to let background pools fill")
+    parser.add_argument("--url", default="", help="benchmark a running server instead of in-process")
+    parser.add_argument("--out", default="", help="write results JSON here")
+    parser.add_argument("--compare", default="", help="baseline results JSON to diff against")
+    args = parser.parse_args()
+
+    _configure_env(args)
+    results = {
+        "benchmark": "chat",
+        "env": environment(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": asyncio.run(run(args)),
+    }
+    write_results(results, args.out)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_hedge.py
+"""
+Tail latency of verdict calls with and without hedging, against the fake provider
+(lognormal latency, so a slow primary is usually beaten by a fresh second draw).
+Both passes make the same number of "evaluate" calls with distinct prompts.
+
+    python -m benchmarks.bench_hedge --calls 2000 --concurrency 20 --latency-ms 100 --sigma 0.8
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import compare, environment, summarize, write_results
+
+
+async def _pass(llm_service, hedger, calls: int, concurrency: int, tag: str) -> list:
+    llm_service.HEDGER = hedger
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with sem:
+            started = time.perf_counter()
+            await llm_service.generate_text_async(
+                f'{tag} {i}: return {{"accept": true}}', coalesce=False, profile="evaluate")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return latencies
+
+
+async def _run(args) -> dict:
+    from backend.services import llm_service
+    from backend.services.resilience import Hedger
+
+    plain = await _pass(llm_service, Hedger(enabled=False), args.calls, args.concurrency, "plain")
+    hedger = Hedger(enabled=True, quantile=args.quantile, budget=args.budget)
+    await _pass(llm_service, hedger, args.warmup, args.concurrency, "warmup")  # fills the latency window
+    warm = hedger.stats()
+    hedged = await _pass(llm_service, hedger, args.calls, args.concurrency, "hedged")
+    stats = hedger.stats()
+    off, on = summarize(plain), summarize(hedged)
+    return {
+        "unhedged": off,
+        "hedged": on,
+        "hedge_rate": round((stats["hedged"] - warm["hedged"]) / args.calls, 4),
+        "hedge_wins": stats["hedge_wins"] - warm["hedge_wins"],
+        "delay_ms": round(1000 * stats["delay_s"].get("evaluate", 0.0), 3),
+        "saved_p95_ms": round(off["p95_ms"] - on["p95_ms"], 3),
+        "saved_p99_ms": round(off["p99_ms"] - on["p99_ms"], 3),
+        "saved_max_ms": round(off["max_ms"] - on["max_ms"], 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=200, help="hedged calls before measuring")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="fake provider median latency")
+    parser.add_argument("--sigma", type=float, default=0.8, help="fake provider lognormal spread")
+    parser.add_argument("--quantile", type=float, default=0.9, help="hedge after this latency quantile")
+    parser.add_argument("--budget", type=float, default=0.05, help="max share of calls hedged")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", default="")
+    parser.add_argument("--compare", default="")
+    args = parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["LLM_HEDGE_ENABLED"] = "true"
+    os.environ.setdefault("LLM_HEDGE_PROVIDER", "fake")  # a second instance with its own latency draws
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_LATENCY_SIGMA"] = str(args.sigma)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(max(64, 2 * args.concurrency))
+
+    results = {
+        "benchmark": "hedge",
+        "env": environment(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": asyncio.run(_run(args)),
+    }
+    write_results(results, args.out)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_micro.py
+"""
+Micro-benchmarks for hot local code paths (no network):
+verdict parsing, pre-classifier scoring, cache keys and session stores.
+
+    python -m benchmarks.bench_micro --out micro.json [--compare old.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import timeit
+from typing import Callable, Dict
+
+from benchmarks.common import compare, environment, write_results
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+VERDICT = json.dumps({
+    "accept": True,
+    "vader_reaction": "*[mechanical breath]* Your fire is noted.",
+    "explanation": "Answer shows curiosity and anger.",
+})
+STATE = {
+    "chapter": 2,
+    "unlocked": False,
+    "fragments": ["FRAG-1"],
+    "last_story": "The second chamber rises like a tower of obsidian. " * 8,
+    "last_question": "What stands unshaken when all others bend?",
+}
+
+
+def _bench(fn: Callable[[], object], number: int) -> Dict[str, float]:
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return {"ns_per_op": round(best / number * 1e9, 1), "ops_per_s": round(number / best, 1)}
+
+
+def run(number: int) -> Dict[str, Dict[str, float]]:
+    from backend.core.emotiongendect import CHAPTER_DEFS
+    from backend.core.eval_cache import EvalCache, normalize_answer
+    from backend.core.memory_manager import InMemoryStore, SQLiteStore
+    from backend.core.preclassifier import PreClassifier
+    from backend.core.storygen import VERDICT_SCHEMA
+    from backend.services.llm_json import parse_llm_json
+
+    fenced = "```json\n" + VERDICT + "\n```"
+    chatty = "Here is my judgement:\n" + fenced + "\nMay the dark side guide you."
+    broken = VERDICT.replace("}", ",}").replace('"', "“", 1)
+    pre = PreClassifier(CHAPTER_DEFS)
+    cache = EvalCache(path="", enabled=True)
+    mem = InMemoryStore()
+    mem.set("s", STATE)
+    tmpdir = tempfile.mkdtemp(prefix="vsk-bench-")
+    lite = SQLiteStore(os.path.join(tmpdir, "sessions.sqlite3"))
+    lite.set("s", STATE)
+
+    results = {
+        "parse_verdict_plain": _bench(lambda: parse_llm_json(VERDICT, VERDICT_SCHEMA), number),
+        "parse_verdict_fenced": _bench(lambda: parse_llm_json(fenced, VERDICT_SCHEMA), number),
+        "parse_verdict_prose": _bench(lambda: parse_llm_json(chatty, VERDICT_SCHEMA), number),
+        "parse_verdict_repaired": _bench(lambda: parse_llm_json(broken, VERDICT_SCHEMA), number),
+        "preclassifier_score": _bench(lambda: pre.score(1, "I want to know the truth, even if I must tear it open"), number),
+        "normalize_answer": _bench(lambda: normalize_answer("  I SEEK   knowledge!!! "), number),
+        "eval_cache_key": _bench(lambda: cache.key(1, STATE["last_story"], STATE["last_question"], "I seek knowledge"), number),
+        "memory_store_get": _bench(lambda: mem.get("s"), number),
+        "memory_store_set": _bench(lambda: mem.set("s", STATE), number),
+        "sqlite_store_get": _bench(lambda: lite.get("s"), max(1, number // 10)),
+        "sqlite_store_set": _bench(lambda: lite.set("s", STATE), max(1, number // 10)),
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="iterations per timing run")
+    parser.add_argument("--out", default="")
+    parser.add_argument("--compare", default="")
+    args = parser.parse_args()
+
+    results = {"benchmark": "micro", "env": environment(), "params": {"number": args.number},
+               "results": run(args.number)}
+    write_results(results, args.out)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
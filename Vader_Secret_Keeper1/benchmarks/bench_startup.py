@@ -0,0 +1,79 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost of a worker: fresh interpreter -> `import backend.app` -> lifespan
+startup complete -> first /api/chat "begin" answered. Each sample is a new process.
+
+    python -m benchmarks.bench_startup --runs 10 --provider gemini
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import compare, environment, summarize, write_results
+
+_PROBE = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+from backend.app import app
+t_import = time.perf_counter() - t0
+sdk_at_import = "google.generativeai" in sys.modules
+
+async def boot():
+    import httpx
+    t1 = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        t_lifespan = time.perf_counter() - t1
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://probe") as client:
+            await client.post("/api/chat", json={"session_id": "probe", "message": "begin"})
+        t_first = time.perf_counter() - t0
+    return t_lifespan, t_first
+
+t_lifespan, t_first = asyncio.run(boot())
+print(json.dumps({
+    "import_s": t_import,
+    "lifespan_s": t_lifespan,
+    "first_response_s": t_first,
+    "sdk_imported_at_import": sdk_at_import,
+}))
+"""
+
+
+def _sample(env) -> dict:
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", _PROBE], env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", choices=("gemini", "fake"), default="gemini")
+    parser.add_argument("--out", default="")
+    parser.add_argument("--compare", default="")
+    args = parser.parse_args()
+
+    env = dict(os.environ, LLM_PROVIDER=args.provider, STORY_POOL_SIZE="0")
+    env.setdefault("GEMINI_API_KEY", "bench-dummy-key")  # never used: no LLM call is made
+    samples = [_sample(env) for _ in range(args.runs)]
+
+    results = {
+        "benchmark": "startup",
+        "env": environment(),
+        "params": {"runs": args.runs, "provider": args.provider},
+        "results": {
+            "import": summarize([s["import_s"] for s in samples]),
+            "lifespan": summarize([s["lifespan_s"] for s in samples]),
+            "first_response": summarize([s["first_response_s"] for s in samples]),
+            "sdk_imported_at_import": sum(s["sdk_imported_at_import"] for s in samples),
+        },
+    }
+    write_results(results, args.out)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/common.py
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    return {
+        "n": len(values),
+        "mean_ms": round(1000 * sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 50), 3),
+        "p95_ms": round(1000 * percentile(values, 95), 3),
+        "p99_ms": round(1000 * percentile(values, 99), 3),
+        "max_ms": round(1000 * max(values), 3) if values else 0.0,
+    }
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": str(os.cpu_count()),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def write_results(results: Dict, path: Optional[str]) -> None:
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+def compare(current: Dict, baseline_path: str) -> None:
+    """Print relative change of every numeric leaf shared with a saved baseline run."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def walk(cur, base, prefix=""):
+        for key, value in cur.items():
+            name = f"{prefix}{key}"
+            other = base.get(key) if isinstance(base, dict) else None
+            if isinstance(value, dict):
+                walk(value, other or {}, name + ".")
+            elif isinstance(value, (int, float)) and isinstance(other, (int, float)) and other:
+                delta = 100 * (value - other) / other
+                print(f"{name:<50} {other:>12.3f} -> {value:>12.3f}  ({delta:+.1f}%)")
+
+    print(f"\n--- vs {baseline_path} ({baseline.get('env', {}).get('git', '?')}) ---")
+    walk(current.get("results", {}), baseline.get("results", {}))
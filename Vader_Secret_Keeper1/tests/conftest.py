@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+
+# settings are read once at import: pin the offline provider before anything loads backend
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
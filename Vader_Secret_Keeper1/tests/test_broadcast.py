@@ -0,0 +1,76 @@
+# tests/test_broadcast.py
+import asyncio
+
+from backend.services.broadcast import Broadcaster
+from backend.services.sse import encode_event
+
+
+def _snapshot(state, calls):
+    async def snapshot():
+        calls.append(1)
+        return state
+    return snapshot
+
+
+def test_viewers_get_the_snapshot_then_every_event():
+    async def run():
+        hub = Broadcaster(buffer=8, max_subscribers=10, keepalive=60)
+        calls = []
+        state = {"session_id": "s", "reply": "intro", "question": "q?", "chapter": 1, "unlocked": False}
+        a = hub.subscribe("s", _snapshot(state, calls))
+        b = hub.subscribe("s", _snapshot(state, calls))
+        first_a, first_b = await a.__anext__(), await b.__anext__()
+        hub.publish("s", "verdict", {"reply": "Impressive."})
+        received = await a.__anext__(), await b.__anext__()
+        await a.aclose()
+        await b.aclose()
+        return first_a, first_b, received, calls, hub.stats()
+
+    first_a, first_b, received, calls, stats = asyncio.run(run())
+    assert first_a == first_b == encode_event(
+        "state", {"session_id": "s", "reply": "intro", "question": "q?", "chapter": 1, "unlocked": False})
+    assert len(calls) == 1  # the second viewer joined from the cached snapshot
+    assert received == (encode_event("verdict", {"reply": "Impressive."}),) * 2
+    assert stats["delivered"] == 2 and stats["subscribers"] == 0 and stats["channels"] == 0
+
+
+def test_finished_turn_becomes_the_join_snapshot():
+    async def run():
+        hub = Broadcaster(buffer=8, max_subscribers=10, keepalive=60)
+        watcher = hub.subscribe("s", _snapshot(None, []))
+        pending = asyncio.ensure_future(watcher.__anext__())
+        await asyncio.sleep(0)  # the first viewer opens the channel
+        hub.publish_final("s", {"reply": "chapter two", "question": "why?", "chapter": 2})
+        await pending
+        calls = []
+        late = hub.subscribe("s", _snapshot(None, calls))
+        joined = await late.__anext__()
+        await watcher.aclose()
+        await late.aclose()
+        return joined, calls
+
+    joined, calls = asyncio.run(run())
+    assert joined == encode_event(
+        "state", {"session_id": "s", "reply": "chapter two", "question": "why?", "chapter": 2, "unlocked": False})
+    assert calls == []
+
+
+def test_lagged_viewer_is_told_and_disconnected():
+    async def run():
+        hub = Broadcaster(buffer=2, max_subscribers=10, keepalive=60)
+        slow = hub.subscribe("s", _snapshot({"chapter": 1}, []))
+        fast = hub.subscribe("s", _snapshot({"chapter": 1}, []))
+        await slow.__anext__()
+        await fast.__anext__()
+        got = []
+        for i in range(3):
+            hub.publish("s", "story", {"text": str(i)})
+            got.append(await fast.__anext__())  # keeps up
+        rest = [chunk async for chunk in slow]
+        await fast.aclose()
+        return got, rest, hub.stats()
+
+    got, rest, stats = asyncio.run(run())
+    assert got == [encode_event("story", {"text": str(i)}) for i in range(3)]
+    assert len(rest) == 1 and rest[0].startswith(b"event: lagged\n")
+    assert stats["lagged"] == 1 and stats["subscribers"] == 0
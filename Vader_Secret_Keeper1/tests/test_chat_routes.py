@@ -0,0 +1,37 @@
+# tests/test_chat_routes.py
+import asyncio
+
+import httpx
+import pytest
+
+from backend.app import app
+from backend.core.static_replies import INTRO_QUESTION, INTRO_STORY
+
+
+def _get(path: str, headers=None) -> httpx.Response:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers or {})
+    return asyncio.run(run())
+
+
+def test_intro_is_served_with_an_etag():
+    resp = _get("/api/intro")
+    assert resp.status_code == 200
+    assert resp.json() == {"reply": INTRO_STORY, "question": INTRO_QUESTION, "chapter": 1}
+    assert resp.headers["etag"].startswith('"') and resp.headers["cache-control"].startswith("public, max-age=")
+
+
+@pytest.mark.parametrize("header", ["{etag}", "W/{etag}", '"stale", {etag}', "*"])
+def test_intro_revalidates_with_if_none_match(header):
+    etag = _get("/api/intro").headers["etag"]
+    resp = _get("/api/intro", {"If-None-Match": header.format(etag=etag)})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+
+
+def test_intro_with_a_stale_etag_gets_the_body():
+    resp = _get("/api/intro", {"If-None-Match": '"stale"'})
+    assert resp.status_code == 200 and resp.json()["chapter"] == 1
@@ -0,0 +1,44 @@
+# tests/test_engine.py
+import asyncio
+
+from backend.core.emotiongendect import ENGINE, REJECT_NUDGE
+
+
+def test_local_reject_keeps_scoring_internals_off_the_reply():
+    async def run():
+        await ENGINE.begin_intro("test-local-reject")
+        return await ENGINE.answer("test-local-reject", "asasasas")
+
+    resp = asyncio.run(run())
+    assert not resp["unlocked"] and resp["chapter"] == 1
+    assert resp["reply"].endswith(REJECT_NUDGE)
+    assert "score=" not in resp["reply"] and "garbage" not in resp["reply"]
+    assert "score=" in resp["explanation"]  # still there for logs and the audit record
+
+
+def test_turn_lost_to_another_writer_answers_from_the_stored_state(monkeypatch):
+    from backend.core.memory_manager import MEMORY
+
+    sid = "test-conflict"
+    save = MEMORY.set_async
+
+    async def racing_save(key, value):
+        # another worker advances the session between this turn's read and write
+        other = MEMORY.get(key)
+        other.update(chapter=2, last_story="The other worker's story.", last_question="Its riddle?")
+        MEMORY.set(key, other)
+        monkeypatch.setattr(MEMORY, "set_async", save)
+        await save(key, value)
+
+    async def run():
+        await ENGINE.begin_intro(sid)
+        monkeypatch.setattr(MEMORY, "set_async", racing_save)
+        return await ENGINE.answer(sid, "asasasas")
+
+    conflicts = MEMORY.conflicts
+    resp = asyncio.run(run())
+    assert MEMORY.conflicts == conflicts + 1
+    assert resp["chapter"] == 2
+    assert resp["reply"] == "The other worker's story." and resp["question"] == "Its riddle?"
+    assert MEMORY.get(sid)["chapter"] == 2
+    MEMORY.delete(sid)
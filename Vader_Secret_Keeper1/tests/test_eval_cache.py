@@ -0,0 +1,69 @@
+# tests/test_eval_cache.py
+from backend.core.eval_cache import EvalCache, normalize_answer
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache(clock, path="", **kwargs) -> EvalCache:
+    options = dict(max_entries=100, max_bytes=1 << 20, ttl=60, context_agnostic=True, path=path, enabled=True)
+    options.update(kwargs)
+    return EvalCache(clock=clock, **options)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = _cache(Clock(), max_entries=2)
+    cache.put("a", {"accept": True})
+    cache.put("b", {"accept": False})
+    assert cache.get("a") == {"accept": True}  # "b" is now the oldest
+    cache.put("c", {"accept": True})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_bound_evicts_too():
+    cache = _cache(Clock(), max_bytes=200)
+    for key in "abcd":
+        cache.put(key, {"explanation": "x" * 40})
+    assert cache.stats()["bytes"] <= 200 and cache.stats()["evictions"] > 0
+    assert cache.get("d") is not None and cache.get("a") is None
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = _cache(clock)
+    cache.put("a", {"accept": True})
+    clock.now += 59
+    assert cache.contains("a") and cache.get("a") == {"accept": True}
+    clock.now += 2
+    assert not cache.contains("a")
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_save_and_load_keep_order_and_drop_what_expired_meanwhile(tmp_path):
+    path = str(tmp_path / "eval_cache.json")
+    clock = Clock()
+    cache = _cache(clock, path=path)
+    cache.put("old", {"accept": False})
+    clock.now += 30
+    cache.put("new", {"accept": True})
+    cache.save()
+
+    clock.now += 40  # "old" is 70s old now, "new" 40s
+    restored = _cache(clock, path=path)
+    assert restored.stats()["entries"] == 1
+    assert restored.get("new") == {"accept": True}
+    assert restored.get("old") is None
+
+
+def test_near_duplicate_answers_share_a_key():
+    cache = _cache(Clock())
+    assert normalize_answer("  Rage, and CURIOSITÉ! ") == "rage and curiosite"
+    assert cache.key(1, "s", "q", "Rage & curiosity") == cache.key(1, "other", "other", "rage curiosity")
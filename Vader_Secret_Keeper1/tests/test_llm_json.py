@@ -0,0 +1,46 @@
+# tests/test_llm_json.py
+import pytest
+
+from backend.services.llm_json import JSONExtractor, JSONSchema, _repair, extract_json, parse_llm_json
+
+VERDICT = JSONSchema("verdict_test", {"accept": bool, "explanation": str}, required=("accept",))
+
+
+@pytest.mark.parametrize("raw, status", [
+    ('{"accept": true, "explanation": "x"}', "ok"),
+    ('```json\n{"accept": true, "explanation": "x"}\n```', "ok"),
+    ('Here is my verdict:\n{"accept": true, "explanation": "x"}\nHope that helps!', "ok"),
+    ('```\n{"accept": true, "explanation": "x",}\n```', "repaired"),
+    ('{“accept”: true, “explanation”: “x”}', "repaired"),
+])
+def test_extract_json_finds_the_object(raw, status):
+    assert extract_json(raw) == ({"accept": True, "explanation": "x"}, status)
+
+
+def test_braces_inside_strings_do_not_end_the_object():
+    assert extract_json('note {"explanation": "a } and a \\" {", "accept": false} end')[0] == {
+        "explanation": 'a } and a " {', "accept": False}
+
+
+def test_truncated_json_is_invalid():
+    assert extract_json('```json\n{"accept": true, "explanation": "the answer wa') == (None, "invalid")
+    assert parse_llm_json('{"accept": true, "explanation": "cut', VERDICT) is None
+
+
+def test_repair_drops_trailing_commas_and_smart_quotes():
+    assert _repair('{“a”: [1, 2,], }') == '{"a": [1, 2]}'
+
+
+def test_extractor_handles_chunks_split_anywhere():
+    raw = 'Sure! ```json\n{"accept": false, "explanation": "say \\"rage\\""}\n```'
+    for size in (1, 2, 5):
+        extractor = JSONExtractor()
+        results = [extractor.feed(raw[i:i + size]) for i in range(0, len(raw), size)]
+        assert results[-1] == {"accept": False, "explanation": 'say "rage"'}
+        assert extractor.status == "ok"
+
+
+def test_parse_llm_json_validates_against_the_schema():
+    assert parse_llm_json('{"accept": "true"}', VERDICT) == {"accept": True}  # coerced
+    assert parse_llm_json('{"explanation": "no verdict"}', VERDICT) is None
+    assert parse_llm_json('{"accept": 1}', VERDICT) is None
@@ -0,0 +1,258 @@
+# tests/test_llm_resilience.py
+import asyncio
+from dataclasses import replace
+
+import pytest
+
+from backend.services import llm_service
+from backend.services.llm_service import ConcurrencyLimiter
+from backend.services.resilience import CircuitBreaker, Hedger
+
+
+class StubProvider:
+    """Replies after `delay` seconds; streams are `chunks` pieces, `delay` apart."""
+
+    def __init__(self, delay: float = 0.0, chunks: int = 3):
+        self.delay = delay
+        self.chunks = chunks
+        self.calls = 0
+
+    async def generate(self, prompt, profile, schema=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return "ok"
+
+    async def open_stream(self, prompt, profile):
+        async def chunks():
+            for i in range(self.chunks):
+                await asyncio.sleep(self.delay)
+                yield f"chunk{i} "
+        return chunks()
+
+
+@pytest.fixture
+def half_open(monkeypatch):
+    """A breaker whose next allowed call is the half-open probe."""
+    breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+    breaker.record_failure()
+    monkeypatch.setattr(llm_service, "BREAKER", breaker)
+    monkeypatch.setattr(llm_service, "LIMITER", ConcurrencyLimiter(8))
+    return breaker
+
+
+def _use(monkeypatch, provider):
+    monkeypatch.setattr(llm_service, "_provider", provider)
+
+
+def test_cancelled_probe_is_handed_back(monkeypatch, half_open):
+    async def run():
+        _use(monkeypatch, StubProvider(delay=10))
+        probe = asyncio.create_task(llm_service.generate_text_async("p", coalesce=False))
+        await asyncio.sleep(0.01)
+        assert half_open.state == half_open.HALF_OPEN
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+        _use(monkeypatch, StubProvider())
+        return await llm_service.generate_text_async("p", coalesce=False)
+
+    assert asyncio.run(run()) == "ok"
+    assert half_open.state == half_open.CLOSED
+    assert llm_service.LIMITER.in_flight == 0
+
+
+def test_closed_stream_settles_the_probe(monkeypatch, half_open):
+    async def run():
+        # client goes away before the first chunk: no outcome, probe handed back
+        _use(monkeypatch, StubProvider(delay=10))
+        stream = llm_service.generate_text_stream("p")
+        first = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await stream.aclose()
+        assert half_open.state == half_open.HALF_OPEN and half_open.allow()
+        half_open.release_probe()
+
+        # client goes away after a chunk: the provider answered
+        _use(monkeypatch, StubProvider())
+        stream = llm_service.generate_text_stream("p")
+        assert (await stream.__anext__()).startswith("chunk0")
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert half_open.state == half_open.CLOSED
+    assert llm_service.LIMITER.in_flight == 0
+
+
+def test_queue_wait_is_not_a_provider_timeout(monkeypatch):
+    breaker = CircuitBreaker(threshold=3, cooldown=30.0)
+    monkeypatch.setattr(llm_service, "BREAKER", breaker)
+    monkeypatch.setattr(llm_service, "LIMITER", ConcurrencyLimiter(64, rate=20, burst=1))
+    monkeypatch.setattr(llm_service, "SETTINGS", replace(llm_service.SETTINGS, llm_timeout=0.2))
+    _use(monkeypatch, StubProvider(delay=0.01))
+
+    async def run():
+        # 12 calls at 20/s queue for ~0.6 s, three times the provider deadline
+        return await asyncio.gather(*(
+            llm_service.generate_text_async(f"p{i}", coalesce=False) for i in range(12)))
+
+    assert asyncio.run(run()) == ["ok"] * 12
+    assert breaker.state == breaker.CLOSED and breaker.failures == 0
+
+
+def test_queue_timeout_leaves_the_breaker_alone(monkeypatch):
+    breaker = CircuitBreaker(threshold=1, cooldown=30.0)
+    monkeypatch.setattr(llm_service, "BREAKER", breaker)
+    monkeypatch.setattr(llm_service, "LIMITER", ConcurrencyLimiter(1))
+    monkeypatch.setattr(llm_service, "SETTINGS", replace(llm_service.SETTINGS, llm_queue_timeout=0.05))
+    _use(monkeypatch, StubProvider(delay=0.3))
+
+    async def run():
+        return await asyncio.gather(*(
+            llm_service.generate_text_async(f"p{i}", coalesce=False) for i in range(2)))
+
+    first, second = asyncio.run(run())
+    assert first == "ok" and "QueueTimeoutError" in second
+    assert breaker.state == breaker.CLOSED
+
+
+def test_stalled_stream_times_out_and_frees_the_slot(monkeypatch):
+    class StallingProvider(StubProvider):
+        async def open_stream(self, prompt, profile):
+            async def chunks():
+                yield "first "
+                await asyncio.sleep(10)
+                yield "never"
+            return chunks()
+
+    breaker = CircuitBreaker(threshold=5, cooldown=30.0)
+    monkeypatch.setattr(llm_service, "BREAKER", breaker)
+    monkeypatch.setattr(llm_service, "LIMITER", ConcurrencyLimiter(8))
+    monkeypatch.setattr(llm_service, "SETTINGS", replace(llm_service.SETTINGS, llm_stream_idle_timeout=0.05))
+    _use(monkeypatch, StallingProvider())
+
+    async def run():
+        return [chunk async for chunk in llm_service.generate_text_stream("p")]
+
+    chunks = asyncio.run(run())
+    assert chunks[0] == "first " and chunks[-1].startswith("[LLM_ERROR] TimeoutError")
+    assert llm_service.LIMITER.in_flight == 0
+    assert breaker.failures == 1
+
+
+def test_hedge_delay_is_the_latency_quantile():
+    hedger = Hedger(enabled=True, quantile=0.9, min_delay=0.05, min_samples=10, budget=0.1)
+    for ms in range(1, 10):
+        hedger.observe("evaluate", ms / 10)
+    assert hedger.delay("evaluate") is None  # too little history
+    hedger.observe("evaluate", 1.0)
+    assert hedger.delay("evaluate") == 1.0  # 10 samples: index int(0.9 * 10) of the sorted window
+    for _ in range(5):
+        hedger.observe("evaluate", 0.01)
+    assert hedger.delay("evaluate") == 1.0  # recomputed only on every 8th sample
+    hedger.observe("evaluate", 0.01)  # the 16th
+    assert hedger.delay("evaluate") == 0.9
+    assert Hedger(enabled=True, quantile=0.0, min_delay=0.05, min_samples=1).delay("other") is None
+    floored = Hedger(enabled=True, quantile=0.0, min_delay=0.05, min_samples=1)
+    floored.observe("evaluate", 0.001)
+    assert floored.delay("evaluate") == 0.05
+
+
+async def _slow_primary():
+    await asyncio.sleep(0.05)
+    return "primary"
+
+
+async def _fast_secondary():
+    return "hedge"
+
+
+def test_hedges_stay_within_the_budget():
+    hedger = Hedger(enabled=True, quantile=0.0, min_delay=0.001, min_samples=1, budget=0.25, burst=1)
+    hedger.observe("evaluate", 0.001)
+
+    async def run():
+        return [await hedger.run("evaluate", _slow_primary, _fast_secondary) for _ in range(8)]
+
+    results = asyncio.run(run())
+    # a quarter of a token per call, one token per hedge: calls 4 and 8
+    assert [i for i, r in enumerate(results, 1) if r == "hedge"] == [4, 8]
+    assert hedger.hedged == hedger.hedge_wins == 2
+    assert hedger.budget_denied == 6
+
+
+def test_saved_hedges_are_spent_back_to_back_up_to_the_burst():
+    hedger = Hedger(enabled=True, quantile=0.0, min_delay=0.001, min_samples=1, budget=0.5, burst=2)
+    hedger.observe("evaluate", 0.001)
+
+    async def run():
+        for _ in range(10):  # quiet spell: calls without a secondary earn tokens, never hedge
+            await hedger.run("evaluate", _fast_secondary)
+        return [await hedger.run("evaluate", _slow_primary, _fast_secondary) for _ in range(4)]
+
+    assert asyncio.run(run()) == ["hedge", "hedge", "hedge", "primary"]
+
+
+def test_primary_that_loses_still_leaves_a_latency_sample():
+    hedger = Hedger(enabled=True, quantile=0.0, min_delay=0.01, min_samples=1, budget=1.0, burst=1)
+    hedger.observe("evaluate", 0.001)
+
+    assert asyncio.run(hedger.run("evaluate", _slow_primary, _fast_secondary)) == "hedge"
+    samples = list(hedger._samples["evaluate"])
+    assert len(samples) == 2 and samples[1] >= 0.01  # at least the hedge delay
+
+
+def test_identical_concurrent_calls_share_one_provider_request(monkeypatch):
+    provider = StubProvider(delay=0.02)
+    _use(monkeypatch, provider)
+    monkeypatch.setattr(llm_service, "BREAKER", CircuitBreaker())
+    monkeypatch.setattr(llm_service, "LIMITER", ConcurrencyLimiter(8))
+    flight = llm_service.SingleFlight(wait_timeout=5, enabled=True)
+    monkeypatch.setattr(llm_service, "SINGLE_FLIGHT", flight)
+
+    async def run():
+        return await asyncio.gather(*(llm_service.generate_text_async("same prompt") for _ in range(10)))
+
+    assert asyncio.run(run()) == ["ok"] * 10
+    assert provider.calls == 1
+    assert flight.stats() == {"in_flight_keys": 0, "leaders": 1, "coalesced": 9, "wait_timeouts": 0}
+
+
+async def _follow(flight, leader_call):
+    own_calls = []
+
+    async def own():
+        own_calls.append(1)
+        return "own"
+
+    leader = asyncio.ensure_future(flight.run("key", leader_call))
+    await asyncio.sleep(0)  # the leader registers first
+    follower = await flight.run("key", own)
+    try:
+        await leader
+    except RuntimeError:
+        pass
+    return follower, own_calls
+
+
+def test_follower_calls_itself_when_the_leader_is_too_slow():
+    flight = llm_service.SingleFlight(wait_timeout=0.01, enabled=True)
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "leader"
+
+    assert asyncio.run(_follow(flight, slow)) == ("own", [1])
+    assert flight.timeouts == 1
+
+
+def test_follower_calls_itself_when_the_leader_fails():
+    flight = llm_service.SingleFlight(wait_timeout=5, enabled=True)
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    assert asyncio.run(_follow(flight, failing)) == ("own", [1])
+    assert flight.timeouts == 0 and flight.stats()["in_flight_keys"] == 0
@@ -0,0 +1,64 @@
+# tests/test_memory_manager.py
+import asyncio
+import time
+
+import pytest
+
+from backend.core.memory_manager import SessionConflict, SessionStore, SQLiteStore
+
+
+class SlowStore(SessionStore):
+    """A backend whose every round-trip blocks for `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.data = {}
+
+    def get(self, key, default=None):
+        time.sleep(self.delay)
+        return dict(self.data[key]) if key in self.data else default
+
+    def set(self, key, value):
+        time.sleep(self.delay)
+        self.data[key] = dict(value)
+
+
+def test_slow_backend_does_not_stall_the_loop():
+    store = SlowStore(delay=0.2)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await store.set_async("s", {"chapter": 1})
+        state = await store.get_async("s")
+        task.cancel()
+        return state, ticks
+
+    state, ticks = asyncio.run(run())
+    assert state == {"chapter": 1}
+    assert ticks >= 20  # the loop kept running through 0.4 s of store I/O
+
+
+def test_sqlite_async_round_trip_and_conflict(tmp_path):
+    store = SQLiteStore(str(tmp_path / "sessions.db"), ttl=0)
+
+    async def run():
+        await store.set_async("s", {"chapter": 1, "last_story": "tale", "fragments": ["FRAG-1"]})
+        first = await store.get_async("s")
+        second = await store.get_async("s")
+        first["chapter"] = 2
+        await store.set_async("s", first)
+        second["chapter"] = 3
+        with pytest.raises(SessionConflict):
+            await store.set_async("s", second)  # read before the other write landed
+        return await store.get_async("s")
+
+    state = asyncio.run(run())
+    assert state["chapter"] == 2 and state["last_story"] == "tale" and state["fragments"] == ["FRAG-1"]
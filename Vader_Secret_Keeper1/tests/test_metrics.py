@@ -0,0 +1,36 @@
+# tests/test_metrics.py
+import asyncio
+
+from backend.services.metrics import GaugeSet
+
+
+def test_monotonic_fields_render_as_counters():
+    lines = GaugeSet("vsk_x", "X.", lambda: {"hits": 3, "size": 7, "state": "open"}, counters=("hits",)).render()
+    assert "# TYPE vsk_x_hits_total counter" in lines and "vsk_x_hits_total 3" in lines
+    assert "# TYPE vsk_x_size gauge" in lines and "vsk_x_hits" not in lines
+
+
+def test_metrics_endpoint_runs_on_the_event_loop():
+    from backend.app import app
+
+    endpoint = next(r.endpoint for r in app.routes if getattr(r, "path", "") == "/metrics")
+    assert asyncio.iscoroutinefunction(endpoint)  # sync handlers run in the threadpool
+    body = asyncio.run(endpoint()).body.decode()
+    assert "# TYPE vsk_llm_calls_attempts_total counter" in body
+
+
+def test_requests_are_labelled_with_the_route_template():
+    import httpx
+    from backend.app import app
+    from backend.services.metrics import REQUEST_SECONDS
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/api/watch/%20")  # blank id: 400 before any stream opens
+            await client.get("/no/such/page")
+
+    asyncio.run(run())
+    assert ("/api/watch/{session_id}",) in REQUEST_SECONDS.children
+    assert ("other",) in REQUEST_SECONDS.children
+    assert not any(key[0].startswith("/no/") for key in REQUEST_SECONDS.children)
@@ -0,0 +1,72 @@
+# tests/test_preclassifier.py
+import pytest
+
+from backend.core.emotiongendect import CHAPTER_DEFS
+from backend.core.preclassifier import PreClassifier
+
+
+@pytest.fixture
+def pre():
+    return PreClassifier(CHAPTER_DEFS, accept_threshold=1.0, reject_threshold=-0.5, enabled=True,
+                         fallback_threshold=0.5)
+
+
+@pytest.mark.parametrize("chapter, answer", [
+    (1, "I am curious and want to learn and explore"),
+    (1, "rage and fury"),
+    (3, "calm and balance"),
+])
+def test_one_sided_answers_are_not_accepted_locally(pre, chapter, answer):
+    assert pre.classify(chapter, answer) is None  # the LLM decides
+    assert not pre.fallback(chapter, answer)["accept"]
+
+
+@pytest.mark.parametrize("chapter, answer", [
+    (1, "My curiosity feeds my rage"),
+    (2, "Power and control over all"),
+    (3, "Clarity brings me peace"),
+])
+def test_answers_covering_every_group_are_accepted(pre, chapter, answer):
+    assert pre.classify(chapter, answer)["accept"]
+
+
+@pytest.mark.parametrize("answer", ["no", "Me.", "Why?", "ok", "yes", "Fear."])
+def test_short_answers_are_not_garbage(pre, answer):
+    score, detail = pre.score(1, answer)
+    assert not detail.get("garbage")
+    verdict = pre.classify(1, answer)
+    assert verdict is None or "garbage" not in verdict["explanation"]
+
+
+@pytest.mark.parametrize("answer", ["", "???", "aaaa", "asasasas", "qwrtp zxcvb"])
+def test_mash_is_rejected_locally(pre, answer):
+    verdict = pre.classify(1, answer)
+    assert verdict is not None and not verdict["accept"]
+
+
+@pytest.mark.parametrize("chapter, answer", [
+    (1, "No, I seek knowledge and I burn with rage"),
+    (1, "Nothing but rage and curiosity"),
+    (2, "I will never kneel, I command"),
+    (2, "Never surrender. Power."),
+    (1, "I don't know, curiosity and anger"),
+])
+def test_negation_stops_at_clause_breaks(pre, chapter, answer):
+    score, detail = pre.score(chapter, answer)
+    assert detail["negated"] == []
+    verdict = pre.classify(chapter, answer)
+    assert verdict is None or verdict["accept"]
+
+
+@pytest.mark.parametrize("chapter, answer", [
+    (1, "I have no curiosity and no anger"),
+    (2, "not power, not control, never dominance"),
+])
+def test_negated_hits_alone_go_to_the_llm(pre, chapter, answer):
+    score, detail = pre.score(chapter, answer)
+    assert detail["negated"] and score <= pre.reject_threshold
+    assert pre.classify(chapter, answer) is None
+
+
+def test_negation_still_applies_within_a_clause(pre):
+    assert pre.score(1, "I feel no curiosity")[1]["negated"] == ["curiosity"]
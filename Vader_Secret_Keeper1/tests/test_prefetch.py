@@ -0,0 +1,45 @@
+# tests/test_prefetch.py
+import asyncio
+
+from backend.core.emotiongendect import ENGINE
+from backend.core.prefetch import Prefetcher
+
+
+async def _story(chapter):
+    await asyncio.sleep(0)
+    return f"story {chapter}", f"riddle {chapter}"
+
+
+def test_new_sessions_do_not_start_speculative_calls():
+    async def run():
+        before = ENGINE.prefetch.scheduled
+        for i in range(50):
+            await ENGINE.begin_intro(f"test-prefetch-spam-{i}")
+        return ENGINE.prefetch.scheduled - before
+
+    assert asyncio.run(run()) == 0
+
+
+def test_budget_caps_generation_starts():
+    async def run():
+        prefetch = Prefetcher(_story, enabled=True, max_inflight=100, rate=1.0, burst=3)
+        for i in range(10):
+            prefetch.schedule(f"s{i}", 2)
+        await asyncio.sleep(0.01)
+        return prefetch.stats()
+
+    stats = asyncio.run(run())
+    assert stats["scheduled"] == 3 and stats["budget_denied"] == 7
+
+
+def test_sweep_expires_by_age_only():
+    async def run():
+        prefetch = Prefetcher(_story, enabled=True, ttl=60, rate=0)
+        prefetch.schedule("old", 2)
+        prefetch.schedule("new", 2)
+        prefetch._entries["old"].created -= 120
+        prefetch.sweep()
+        return list(prefetch._entries), await prefetch.take("new", 2, wait=True)
+
+    held, taken = asyncio.run(run())
+    assert held == ["new"] and taken == ("story 2", "riddle 2")
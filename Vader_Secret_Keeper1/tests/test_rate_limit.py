@@ -0,0 +1,87 @@
+# tests/test_rate_limit.py
+import pytest
+from starlette.requests import Request
+
+from backend.services.rate_limit import RateLimited, RateLimiter, _networks, client_address
+
+PROXIES = _networks(["10.0.0.0/8"])
+
+
+def _request(peer: str, forwarded: str = "") -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 40000), "headers": headers})
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers():
+    assert client_address(_request("203.0.113.9", "1.2.3.4"), PROXIES) == "203.0.113.9"
+    assert client_address(_request("203.0.113.9", "1.2.3.4"), []) == "203.0.113.9"
+
+
+def test_rightmost_untrusted_hop_is_the_client():
+    # the caller wrote "1.2.3.4"; our proxy 10.0.0.2 appended the address it saw
+    assert client_address(_request("10.0.0.1", "1.2.3.4, 198.51.100.7, 10.0.0.2"), PROXIES) == "198.51.100.7"
+    assert client_address(_request("10.0.0.1", ""), PROXIES) == "10.0.0.1"
+
+
+@pytest.mark.parametrize("peer, real", [("203.0.113.9", ""), ("10.0.0.1", "198.51.100.7")])
+def test_spoofed_forwarded_for_does_not_reset_the_bucket(peer, real):
+    limiter = RateLimiter(enabled=True, session_rate=100, session_burst=100, client_rate=0.001, client_burst=2)
+
+    def answer(i: int) -> None:
+        forwarded = ", ".join(h for h in (f"192.0.2.{i}", real) if h)
+        limiter.check(f"session-{i}", client_address(_request(peer, forwarded), PROXIES))
+
+    answer(1)
+    answer(2)
+    with pytest.raises(RateLimited):
+        answer(3)
+
+
+def test_batch_is_charged_per_item():
+    limiter = RateLimiter(enabled=True, batch_rate=0.001, batch_burst=100)
+    limiter.check_batch("203.0.113.9", 60)
+    with pytest.raises(RateLimited) as e:
+        limiter.check_batch("203.0.113.9", 60)
+    assert e.value.scope == "batch"
+    limiter.check_batch("203.0.113.9", 40)  # what is left still fits
+    limiter.check_batch("198.51.100.7", 100)  # other clients have their own budget
+    assert limiter.stats()["batch_denied"] == 1
+
+
+def test_batch_larger_than_the_burst_costs_a_full_bucket():
+    limiter = RateLimiter(enabled=True, batch_rate=0.001, batch_burst=10)
+    limiter.check_batch("203.0.113.9", 50)
+    with pytest.raises(RateLimited):
+        limiter.check_batch("203.0.113.9", 1)
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/api/chat", {"session_id": "throttled", "message": "I feel rage"}),
+    ("/api/evaluate/batch", {"items": []}),
+])
+def test_routes_throttle_the_client_behind_trusted_proxies(monkeypatch, path, body):
+    import asyncio
+    import httpx
+    from backend import app as app_module
+    from backend.core.memory_manager import MEMORY
+    from backend.routes import throttle
+    from backend.services import rate_limit
+
+    limiter = RateLimiter(enabled=True, session_rate=100, session_burst=100,
+                          client_rate=0.001, client_burst=1, batch_rate=0.001, batch_burst=1)
+    limiter.check("elsewhere", "198.51.100.7")  # spend the real client's budgets
+    limiter.check_batch("198.51.100.7", 1)
+    monkeypatch.setattr(throttle, "RATE_LIMITER", limiter)
+    monkeypatch.setattr(rate_limit, "_TRUSTED_PROXIES", PROXIES)
+    MEMORY.set("throttled", {"chapter": 1})
+
+    async def post(forwarded: str) -> httpx.Response:
+        transport = httpx.ASGITransport(app=app_module.app, client=("10.0.0.1", 40000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=body, headers={"X-Forwarded-For": forwarded})
+
+    for forwarded in ("198.51.100.7", "192.0.2.1, 198.51.100.7"):  # a spoofed left hop changes nothing
+        resp = asyncio.run(post(forwarded))
+        assert resp.status_code == 429
+        assert int(resp.headers["Retry-After"]) >= 1
+    MEMORY.delete("throttled")